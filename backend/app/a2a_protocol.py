@@ -10,10 +10,21 @@ Arquitectura diseñada por desarrollador senior con 30+ años de experiencia.
 """
 from typing import Dict, Any, List, Optional, Literal
 from pydantic import BaseModel, Field
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field, fields
 from datetime import datetime
 from enum import Enum
+import itertools
+import sys
+import time
 import uuid
 
+from app.config import (
+    A2A_MAX_CONVERSATIONS,
+    A2A_CONVERSATION_TTL_SECONDS,
+    A2A_MAX_MESSAGES_PER_CONVERSATION,
+)
+
 
 class MessageType(str, Enum):
     """Tipos de mensajes en el protocolo A2A"""
@@ -184,6 +195,274 @@ class AgentProfile(BaseModel):
     last_active: datetime = Field(default_factory=datetime.utcnow)
 
 
+# ============== RECORDS DEL CAMINO CALIENTE ==============
+#
+# Cada ejecución crea un mensaje y una respuesta por agente (más reintentos,
+# timeouts y reutilizaciones). Los modelos pydantic validan cada campo,
+# generan un UUID4 y un datetime por instancia y guardan un `__dict__` por
+# objeto; en el orquestador esos datos los produce el propio código.
+#
+# Los records son dataclasses con `__slots__` y los mismos nombres de campo,
+# sin validación. La conversión a pydantic (`to_pydantic`) solo se hace en
+# los límites de la API, donde se valida el esquema completo.
+
+# Prefijo aleatorio por proceso: los IDs no se repiten tras un reinicio
+_ID_PREFIX = uuid.uuid4().hex[:12]
+_id_counter = itertools.count(1)
+
+
+def new_record_id() -> str:
+    """ID único sin el coste de `uuid.uuid4()` por mensaje"""
+    return f"{_ID_PREFIX}-{next(_id_counter):x}"
+
+
+def _to_epoch(timestamp: datetime) -> float:
+    """Los modelos pydantic guardan la hora UTC sin zona horaria"""
+    if timestamp.tzinfo is None:
+        return (timestamp - datetime(1970, 1, 1)).total_seconds()
+    return timestamp.timestamp()
+
+
+@dataclass(slots=True, eq=False)
+class A2AMessageRecord:
+    """Mensaje A2A interno (mismos campos que `A2AMessage`)"""
+    
+    message_type: MessageType
+    sender_id: str
+    sender_capability: AgentCapability
+    subject: str
+    payload: Dict[str, Any]
+    priority: Priority = Priority.NORMAL
+    recipient_id: Optional[str] = None
+    recipient_capabilities: Optional[List[AgentCapability]] = None
+    context: Optional[Dict[str, Any]] = None
+    conversation_id: Optional[str] = None
+    parent_message_id: Optional[str] = None
+    requires_response: bool = True
+    timeout_seconds: Optional[int] = 30
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    message_id: str = field(default_factory=new_record_id)
+    # time.time(): `timestamp` la expone como datetime
+    created_at: float = field(default_factory=time.time)
+    
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.utcfromtimestamp(self.created_at)
+    
+    def to_pydantic(self) -> A2AMessage:
+        """Modelo validado para los límites de la API"""
+        return A2AMessage(
+            timestamp=self.timestamp,
+            **{name: getattr(self, name) for name in _MESSAGE_FIELDS},
+        )
+    
+    @classmethod
+    def from_pydantic(cls, message: A2AMessage) -> "A2AMessageRecord":
+        return cls(
+            created_at=_to_epoch(message.timestamp),
+            **{name: getattr(message, name) for name in _MESSAGE_FIELDS},
+        )
+
+
+@dataclass(slots=True, eq=False)
+class A2AResponseRecord:
+    """Respuesta A2A interna (mismos campos que `A2AResponse`)"""
+    
+    original_message_id: str
+    conversation_id: str
+    responder_id: str
+    responder_capability: AgentCapability
+    success: bool
+    result: Any
+    status_code: int = 200
+    reasoning: Optional[str] = None
+    confidence: float = 1.0
+    processing_time_ms: Optional[float] = None
+    tokens_used: Optional[int] = None
+    error_message: Optional[str] = None
+    suggestions: Optional[List[str]] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    response_id: str = field(default_factory=new_record_id)
+    created_at: float = field(default_factory=time.time)
+    
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.utcfromtimestamp(self.created_at)
+    
+    def to_pydantic(self) -> A2AResponse:
+        """Modelo validado para los límites de la API"""
+        return A2AResponse(
+            timestamp=self.timestamp,
+            **{name: getattr(self, name) for name in _RESPONSE_FIELDS},
+        )
+    
+    @classmethod
+    def from_pydantic(cls, response: A2AResponse) -> "A2AResponseRecord":
+        return cls(
+            created_at=_to_epoch(response.timestamp),
+            **{name: getattr(response, name) for name in _RESPONSE_FIELDS},
+        )
+
+
+_MESSAGE_FIELDS = tuple(f.name for f in fields(A2AMessageRecord) if f.name != "created_at")
+_RESPONSE_FIELDS = tuple(f.name for f in fields(A2AResponseRecord) if f.name != "created_at")
+_RECORD_FIELDS = {A2AMessageRecord: _MESSAGE_FIELDS, A2AResponseRecord: _RESPONSE_FIELDS}
+
+
+# Niveles de contenedores (dict/list) que recorre la estimación de tamaño
+_SIZE_DEPTH = 2
+
+
+def _estimate_size(value: Any, depth: int = 0) -> int:
+    """
+    Estimación aproximada (en bytes) de la memoria usada por un valor.
+    
+    Barata a propósito (se calcula una vez por mensaje guardado): los
+    contenedores solo se recorren hasta `_SIZE_DEPTH` niveles y por debajo
+    cuenta su tamaño propio. Lo que queda por debajo suele ser el contexto
+    del request, compartido por todos los mensajes de la ejecución.
+    """
+    if isinstance(value, BaseModel):
+        value = value.__dict__
+    else:
+        record_fields = _RECORD_FIELDS.get(type(value))
+        if record_fields is not None:
+            return sys.getsizeof(value) + sum(
+                _estimate_size(getattr(value, name), depth) for name in record_fields
+            )
+    size = sys.getsizeof(value)
+    if depth >= _SIZE_DEPTH:
+        return size
+    if isinstance(value, dict):
+        size += sum(
+            sys.getsizeof(k) + _estimate_size(v, depth + 1)
+            for k, v in value.items()
+        )
+    elif isinstance(value, (list, tuple, set, deque)):
+        size += sum(_estimate_size(v, depth + 1) for v in value)
+    return size
+
+
+class _Conversation:
+    """Mensajes de una conversación con su tamaño estimado"""
+    
+    __slots__ = ("messages", "sizes", "approx_bytes", "last_access")
+    
+    def __init__(self):
+        self.messages: deque = deque()
+        self.sizes: deque = deque()
+        self.approx_bytes = 0
+        self.last_access = time.monotonic()
+
+
+class ConversationStore:
+    """
+    Almacén acotado de conversaciones A2A.
+    
+    - TTL: las conversaciones sin actividad se descartan
+    - LRU: como máximo `max_conversations` conversaciones
+    - Límite de mensajes por conversación (se descartan los más antiguos)
+    
+    Mantiene contadores de uso de memoria aproximado para las estadísticas.
+    """
+    
+    def __init__(
+        self,
+        max_conversations: int = 1000,
+        ttl_seconds: float = 3600.0,
+        max_messages_per_conversation: int = 200
+    ):
+        self.max_conversations = max(1, max_conversations)
+        self.ttl_seconds = ttl_seconds
+        self.max_messages_per_conversation = max(1, max_messages_per_conversation)
+        self._conversations: "OrderedDict[str, _Conversation]" = OrderedDict()
+        self._total_messages = 0
+        self._total_bytes = 0
+        self.stats = {
+            "expired_conversations": 0,
+            "evicted_conversations": 0,
+            "dropped_messages": 0,
+        }
+    
+    def __contains__(self, conversation_id: str) -> bool:
+        return conversation_id in self._conversations
+    
+    def __len__(self) -> int:
+        return len(self._conversations)
+    
+    def _remove(self, conversation_id: str) -> None:
+        conversation = self._conversations.pop(conversation_id)
+        self._total_messages -= len(conversation.messages)
+        self._total_bytes -= conversation.approx_bytes
+    
+    def prune(self) -> None:
+        """Descarta conversaciones expiradas (las más antiguas están al principio)"""
+        now = time.monotonic()
+        while self._conversations:
+            conversation_id, conversation = next(iter(self._conversations.items()))
+            if now - conversation.last_access <= self.ttl_seconds:
+                break
+            self._remove(conversation_id)
+            self.stats["expired_conversations"] += 1
+    
+    def append(self, conversation_id: str, message: "A2AMessageRecord") -> None:
+        """Agrega un mensaje a una conversación"""
+        self.prune()
+        
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            conversation = _Conversation()
+            self._conversations[conversation_id] = conversation
+            while len(self._conversations) > self.max_conversations:
+                self._remove(next(iter(self._conversations)))
+                self.stats["evicted_conversations"] += 1
+        else:
+            self._conversations.move_to_end(conversation_id)
+        
+        size = _estimate_size(message)
+        conversation.messages.append(message)
+        conversation.sizes.append(size)
+        conversation.approx_bytes += size
+        conversation.last_access = time.monotonic()
+        self._total_messages += 1
+        self._total_bytes += size
+        
+        while len(conversation.messages) > self.max_messages_per_conversation:
+            conversation.messages.popleft()
+            dropped = conversation.sizes.popleft()
+            conversation.approx_bytes -= dropped
+            self._total_messages -= 1
+            self._total_bytes -= dropped
+            self.stats["dropped_messages"] += 1
+    
+    def get(
+        self,
+        conversation_id: str,
+        default: Optional[List["A2AMessageRecord"]] = None
+    ) -> List["A2AMessageRecord"]:
+        """Obtiene los mensajes de una conversación"""
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            return default if default is not None else []
+        if time.monotonic() - conversation.last_access > self.ttl_seconds:
+            self._remove(conversation_id)
+            self.stats["expired_conversations"] += 1
+            return default if default is not None else []
+        return list(conversation.messages)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas y uso de memoria aproximado"""
+        return {
+            **self.stats,
+            "conversations": len(self._conversations),
+            "messages": self._total_messages,
+            "approx_bytes": self._total_bytes,
+            "max_conversations": self.max_conversations,
+            "max_messages_per_conversation": self.max_messages_per_conversation,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
 class A2AProtocol:
     """
     Implementación del protocolo A2A
@@ -197,7 +476,11 @@ class A2AProtocol:
     """
     
     def __init__(self):
-        self.active_conversations: Dict[str, List[A2AMessage]] = {}
+        self.active_conversations = ConversationStore(
+            max_conversations=A2A_MAX_CONVERSATIONS,
+            ttl_seconds=A2A_CONVERSATION_TTL_SECONDS,
+            max_messages_per_conversation=A2A_MAX_MESSAGES_PER_CONVERSATION,
+        )
         self.agent_registry: Dict[str, AgentProfile] = {}
         
     def register_agent(self, profile: AgentProfile) -> bool:
@@ -217,13 +500,13 @@ class A2AProtocol:
         priority: Priority = Priority.NORMAL,
         conversation_id: Optional[str] = None,
         **kwargs
-    ) -> A2AMessage:
-        """Crear un mensaje A2A estructurado"""
+    ) -> A2AMessageRecord:
+        """Crear un mensaje A2A estructurado (record interno, sin validación)"""
         
         if conversation_id is None:
             conversation_id = str(uuid.uuid4())
         
-        message = A2AMessage(
+        message = A2AMessageRecord(
             message_type=message_type,
             priority=priority,
             sender_id=sender_id,
@@ -236,25 +519,28 @@ class A2AProtocol:
             **kwargs
         )
         
-        # Almacenar en conversación activa
-        if conversation_id not in self.active_conversations:
-            self.active_conversations[conversation_id] = []
-        self.active_conversations[conversation_id].append(message)
+        # Almacenar en conversación activa (almacén acotado)
+        self.active_conversations.append(conversation_id, message)
         
         return message
     
     def create_response(
         self,
-        original_message: A2AMessage,
+        original_message: A2AMessageRecord,
         responder_id: str,
         responder_capability: AgentCapability,
         result: Any,
         success: bool = True,
         **kwargs
-    ) -> A2AResponse:
-        """Crear una respuesta A2A estructurada"""
+    ) -> A2AResponseRecord:
+        """Crear una respuesta A2A estructurada (record interno, sin validación)"""
+        
+        # Única restricción de A2AResponse que no garantiza el propio código
+        confidence = kwargs.get("confidence", 1.0)
+        if not 0.0 <= confidence <= 1.0:
+            raise ValueError(f"confidence must be between 0 and 1, got {confidence}")
         
-        response = A2AResponse(
+        response = A2AResponseRecord(
             original_message_id=original_message.message_id,
             conversation_id=original_message.conversation_id,
             responder_id=responder_id,
@@ -291,10 +577,20 @@ class A2AProtocol:
         return capable_agents
     
     def get_conversation_history(self, conversation_id: str) -> List[A2AMessage]:
-        """Obtener historial de una conversación"""
-        return self.active_conversations.get(conversation_id, [])
+        """Obtener historial de una conversación (modelos validados)"""
+        return [
+            message.to_pydantic()
+            for message in self.active_conversations.get(conversation_id, [])
+        ]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas del protocolo"""
+        return {
+            "registered_agents": len(self.agent_registry),
+            "conversations": self.active_conversations.get_stats(),
+        }
     
-    def validate_message(self, message: A2AMessage) -> tuple[bool, Optional[str]]:
+    def validate_message(self, message: A2AMessageRecord) -> tuple[bool, Optional[str]]:
         """Validar un mensaje A2A"""
         
         # Validar sender existe
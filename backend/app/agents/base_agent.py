@@ -9,13 +9,51 @@ from typing import Dict, Any, List, Optional, Callable
 from abc import ABC, abstractmethod
 from datetime import datetime
 import asyncio
+import copy
 import time
 
 from app.a2a_protocol import (
-    A2AMessage, A2AResponse, AgentProfile, AgentCapability,
+    A2AMessageRecord, A2AResponseRecord, AgentProfile, AgentCapability,
     AgentStatus, a2a_protocol, MessageType, Priority
 )
-from app.llm_providers import chat_completion
+from app.llm_providers import chat_completion, chat_completion_stream
+from app.streaming import get_event_channel
+from app.result_digest import format_previous_results, result_digests
+from app.metrics import metrics
+from app.governor import bind_priority, reset_priority
+
+
+# Claves del contexto del editor de nodos que no llegan al prompt de los
+# agentes: cambian en cada ejecución o solo controlan la orquestación. Así
+# una re-ejecución desde el editor produce el mismo prompt (caché LLM y
+# ejecuciones incrementales).
+ORCHESTRATION_CONTEXT_KEYS = frozenset({
+    "generatedAt",            # marca de tiempo de cada ejecución
+    "incremental",            # reutilización de resultados
+    "agentsCluster",          # selección de agentes, paralelismo, cooldown
+    "a2aResponsesCollector",  # timeouts y reintentos
+    "langgraph",              # estrategia de ejecución y modelo
+    "routing",                # selección automática de agentes
+    "dependencies",           # aristas del DAG
+    "synthesis",              # solo afecta a la síntesis final
+})
+
+# Claves de `a2aMessage` que solo afectan a la planificación
+_ORCHESTRATION_MESSAGE_KEYS = frozenset({"priority", "channel"})
+
+
+def agent_prompt_context(context: Any) -> Any:
+    """Contexto que ve el agente (sin las claves de orquestación)"""
+    if not isinstance(context, dict):
+        return context
+    filtered = {key: value for key, value in context.items() if key not in ORCHESTRATION_CONTEXT_KEYS}
+    message_config = filtered.get("a2aMessage")
+    if isinstance(message_config, dict):
+        filtered["a2aMessage"] = {
+            key: value for key, value in message_config.items()
+            if key not in _ORCHESTRATION_MESSAGE_KEYS
+        }
+    return filtered
 
 
 class BaseAgent(ABC):
@@ -34,6 +72,15 @@ class BaseAgent(ABC):
     - Capacidad de delegación a otros agentes
     """
     
+    # Permite servir respuestas desde la caché LLM. Los agentes creativos
+    # (alta temperatura) lo desactivan para que cada ejecución varíe.
+    cache_responses: bool = True
+    
+    # Clave en AGENT_DEFINITIONS y nivel (1-5) del agente; los asigna el
+    # registro de agentes y los usa el planificador DAG del orquestador.
+    agent_key: Optional[str] = None
+    level: int = 1
+    
     def __init__(
         self,
         agent_id: str,
@@ -70,7 +117,7 @@ class BaseAgent(ABC):
         # Estado interno
         self.state: Dict[str, Any] = {}
         self.memory: List[Dict[str, Any]] = []
-        self.active_tasks: Dict[str, A2AMessage] = {}
+        self.active_tasks: Dict[str, A2AMessageRecord] = {}
         
         # Configuración de modelo y API
         self.model = actual_model
@@ -89,6 +136,32 @@ class BaseAgent(ABC):
         # Registrar en el protocolo A2A
         a2a_protocol.register_agent(self.profile)
     
+    def with_overrides(
+        self,
+        model: Optional[str] = None,
+        api_config: Optional[Dict[str, Any]] = None
+    ) -> "BaseAgent":
+        """
+        Crea una instancia ligera para un request a partir de este agente.
+        
+        Comparte la definición inmutable (prompts, descripciones, listas de
+        frameworks) y aplica encima el modelo y la api_config del request.
+        El estado, la memoria y las métricas son propios de la copia.
+        No se vuelve a registrar en el protocolo A2A.
+        """
+        actual_model = model or self.model
+        
+        clone = copy.copy(self)
+        clone.profile = self.profile.model_copy(update={"model_name": actual_model})
+        clone.model = actual_model
+        clone.api_config = api_config
+        clone.state = {}
+        clone.memory = []
+        clone.active_tasks = {}
+        clone._reset_metrics()
+        
+        return clone
+    
     @abstractmethod
     def get_system_prompt(self) -> str:
         """
@@ -112,13 +185,15 @@ class BaseAgent(ABC):
         """
         pass
     
-    async def handle_message(self, message: A2AMessage) -> A2AResponse:
+    async def handle_message(self, message: A2AMessageRecord) -> A2AResponseRecord:
         """
         Maneja un mensaje A2A recibido.
         
         Este es el punto de entrada principal para la comunicación entre agentes.
         """
         start_time = time.time()
+        # Las llamadas LLM del agente heredan la prioridad del mensaje
+        priority_token = bind_priority(message.priority)
         
         try:
             # Actualizar estado
@@ -171,6 +246,7 @@ class BaseAgent(ABC):
             )
             
         finally:
+            reset_priority(priority_token)
             # Limpiar estado
             self.profile.current_load -= 1
             if message.message_id in self.active_tasks:
@@ -181,18 +257,27 @@ class BaseAgent(ABC):
             
             self.profile.last_active = datetime.utcnow()
     
-    async def _handle_request(self, message: A2AMessage) -> Dict[str, Any]:
-        """Maneja una solicitud de procesamiento"""
+    async def _handle_request(self, message: A2AMessageRecord) -> Dict[str, Any]:
+        """
+        Maneja una solicitud de procesamiento.
+        
+        Los digests de los resultados previos referenciados en el mensaje
+        llegan al prompt como `previous_results` dentro del contexto.
+        """
         task = message.payload.get("task", "")
-        context = message.payload.get("context", {})
+        context = agent_prompt_context(message.payload.get("context") or {})
         
         if not task:
             raise ValueError("Task is required in payload")
         
+        previous_results = self.get_previous_results(message)
+        if previous_results and isinstance(context, dict):
+            context = {**context, "previous_results": format_previous_results(previous_results)}
+        
         result = await self.process_task(task, context)
         return result
     
-    async def _handle_query(self, message: A2AMessage) -> Dict[str, Any]:
+    async def _handle_query(self, message: A2AMessageRecord) -> Dict[str, Any]:
         """Maneja una consulta de información"""
         query = message.payload.get("query", "")
         
@@ -203,7 +288,7 @@ class BaseAgent(ABC):
         result = await self.process_task(f"Responde esta consulta: {query}", message.context)
         return result
     
-    async def _handle_command(self, message: A2AMessage) -> Dict[str, Any]:
+    async def _handle_command(self, message: A2AMessageRecord) -> Dict[str, Any]:
         """Maneja un comando directo"""
         command = message.payload.get("command", "")
         params = message.payload.get("params", {})
@@ -220,8 +305,18 @@ class BaseAgent(ABC):
             return self._reset_metrics()
         else:
             raise ValueError(f"Unknown command: {command}")
-    
-    def _create_error_response(self, message: A2AMessage, error: str) -> A2AResponse:
+
+    def get_previous_results(self, message: A2AMessageRecord) -> Dict[str, Dict[str, Any]]:
+        """
+        Resuelve los resultados previos referenciados en el mensaje.
+
+        Returns:
+            Digests acotados por agente ({agent_id: digest})
+        """
+        result_ids = message.payload.get("previous_result_ids") or []
+        return result_digests.get_many(message.conversation_id, result_ids)
+
+    def _create_error_response(self, message: A2AMessageRecord, error: str) -> A2AResponseRecord:
         """Crea una respuesta de error"""
         return a2a_protocol.create_response(
             original_message=message,
@@ -259,14 +354,34 @@ class BaseAgent(ABC):
         temp = temperature if temperature is not None else self.profile.temperature
         max_tok = max_tokens if max_tokens is not None else self.profile.max_tokens
         
-        # Llamar al LLM con configuración del agente
-        response = await chat_completion(
-            messages=full_messages,
-            model=self.model,
-            temperature=temp,
-            max_tokens=max_tok,
-            api_config=self.api_config
-        )
+        channel = get_event_channel()
+        if channel is None or not channel.wants_tokens:
+            # Llamar al LLM con configuración del agente
+            response = await chat_completion(
+                messages=full_messages,
+                model=self.model,
+                temperature=temp,
+                max_tokens=max_tok,
+                api_config=self.api_config,
+                use_cache=self.cache_responses
+            )
+        else:
+            # Request en streaming: reenviar tokens a medida que llegan
+            parts = []
+            async for token in chat_completion_stream(
+                messages=full_messages,
+                model=self.model,
+                temperature=temp,
+                max_tokens=max_tok,
+                api_config=self.api_config,
+                use_cache=self.cache_responses
+            ):
+                parts.append(token)
+                channel.emit("token", {
+                    "agent_id": self.profile.agent_id,
+                    "content": token,
+                })
+            response = "".join(parts)
         
         # Actualizar métricas de tokens (si está disponible)
         if hasattr(response, 'usage'):
@@ -280,7 +395,7 @@ class BaseAgent(ABC):
         task: str,
         context: Optional[Dict[str, Any]] = None,
         priority: Priority = Priority.NORMAL
-    ) -> A2AResponse:
+    ) -> A2AResponseRecord:
         """
         Delega una tarea a otro agente con la capacidad especificada.
         
@@ -320,9 +435,8 @@ class BaseAgent(ABC):
         # Por ahora retornamos un placeholder
         # En la implementación completa, esto iría a través del orquestador
         
-        return A2AResponse(
-            original_message_id=message.message_id,
-            conversation_id=message.conversation_id,
+        return a2a_protocol.create_response(
+            original_message=message,
             responder_id=target_agent.agent_id,
             responder_capability=target_agent.primary_capability,
             success=True,
@@ -333,6 +447,9 @@ class BaseAgent(ABC):
         """Actualiza las métricas del agente"""
         self.metrics["total_tasks"] += 1
         
+        # Histograma del proceso (las instancias por request son efímeras)
+        metrics.observe("agent_handle_message", processing_time_ms, label=self.profile.agent_id)
+        
         if success:
             self.metrics["successful_tasks"] += 1
         else:
@@ -34,6 +34,9 @@ class CreativeAgent(BaseAgent):
     - Experiencias memorables
     """
     
+    # Salidas creativas: cada ejecución debe variar (sin caché LLM)
+    cache_responses = False
+    
     def __init__(self, model: str = None, api_config: Dict[str, Any] = None):
         super().__init__(
             agent_id="creative_director_001",
@@ -0,0 +1,169 @@
+"""
+Agent Registry - ATP
+Registro de agentes: definiciones inmutables reutilizadas entre requests
+
+Cada agente se construye una sola vez (prototipo) y se registra una sola
+vez en el protocolo A2A. En cada request solo se instancian los agentes
+seleccionados, como copias ligeras del prototipo con el modelo y la
+`api_config` del request aplicados encima.
+"""
+from typing import Dict, Any, List, Optional, Type
+
+from app.agents.base_agent import BaseAgent
+from app.agents.reasoning_agent import ReasoningAgent
+from app.agents.planning_agent import PlanningAgent
+from app.agents.research_agent import ResearchAgent
+from app.agents.analysis_agent import AnalysisAgent
+from app.agents.synthesis_agent import SynthesisAgent
+from app.agents.coding_agent import CodingAgent
+from app.agents.data_agent import DataAgent
+from app.agents.writing_agent import WritingAgent
+from app.agents.communication_agent import CommunicationAgent
+from app.agents.decision_agent import DecisionAgent
+from app.agents.problem_solving_agent import ProblemSolvingAgent
+from app.agents.critical_thinking_agent import CriticalThinkingAgent
+from app.agents.legal_agent import LegalAgent
+from app.agents.financial_agent import FinancialAgent
+from app.agents.creative_agent import CreativeAgent
+from app.agents.technical_agent import TechnicalAgent
+from app.agents.educational_agent import EducationalAgent
+from app.agents.marketing_agent import MarketingAgent
+from app.agents.qa_agent import QAAgent
+from app.agents.documentation_agent import DocumentationAgent
+from app.agents.optimization_agent import OptimizationAgent
+from app.agents.security_agent import SecurityAgent
+from app.agents.integration_agent import IntegrationAgent
+from app.agents.review_agent import ReviewAgent
+from app.agents.translation_agent import TranslationAgent
+from app.agents.summary_agent import SummaryAgent
+from app.agents.formatting_agent import FormattingAgent
+from app.agents.validation_agent import ValidationAgent
+from app.agents.coordination_agent import CoordinationAgent
+from app.agents.explanation_agent import ExplanationAgent
+
+
+# Definiciones de los 30 agentes
+AGENT_DEFINITIONS = {
+    "reasoning": {"name": "Reasoning Agent", "level": 1, "description": "Razonamiento lógico multi-paradigma"},
+    "planning": {"name": "Planning Agent", "level": 1, "description": "Planificación estratégica y gestión de proyectos"},
+    "research": {"name": "Research Agent", "level": 1, "description": "Investigación académica rigurosa"},
+    "analysis": {"name": "Analysis Agent", "level": 1, "description": "Descomposición de problemas complejos"},
+    "synthesis": {"name": "Synthesis Agent", "level": 1, "description": "Integración de conocimiento e insights"},
+    "critical_thinking": {"name": "Critical Thinking Agent", "level": 1, "description": "Evaluación crítica y detección de falacias"},
+    "coding": {"name": "Coding Agent", "level": 2, "description": "Desarrollo de software y arquitectura"},
+    "data": {"name": "Data Agent", "level": 2, "description": "Ciencia de datos y análisis cuantitativo"},
+    "writing": {"name": "Writing Agent", "level": 2, "description": "Escritura profesional y contenido"},
+    "communication": {"name": "Communication Agent", "level": 2, "description": "Comunicación efectiva y resolución de conflictos"},
+    "decision": {"name": "Decision Agent", "level": 2, "description": "Análisis de decisiones y teoría de juegos"},
+    "problem_solving": {"name": "Problem Solving Agent", "level": 2, "description": "Solución creativa con TRIZ y Design Thinking"},
+    "legal": {"name": "Legal Agent", "level": 3, "description": "Análisis legal y cumplimiento normativo"},
+    "financial": {"name": "Financial Agent", "level": 3, "description": "Análisis financiero y valoración"},
+    "creative": {"name": "Creative Agent", "level": 3, "description": "Pensamiento creativo e innovación"},
+    "technical": {"name": "Technical Agent", "level": 3, "description": "Arquitectura técnica y sistemas distribuidos"},
+    "educational": {"name": "Educational Agent", "level": 3, "description": "Pedagogía y diseño instruccional"},
+    "marketing": {"name": "Marketing Agent", "level": 3, "description": "Estrategia de marketing y branding"},
+    "qa": {"name": "QA Agent", "level": 4, "description": "Testing y aseguramiento de calidad"},
+    "documentation": {"name": "Documentation Agent", "level": 4, "description": "Documentación técnica y knowledge management"},
+    "optimization": {"name": "Optimization Agent", "level": 4, "description": "Performance y optimización de procesos"},
+    "security": {"name": "Security Agent", "level": 4, "description": "Seguridad de la información y threat analysis"},
+    "integration": {"name": "Integration Agent", "level": 4, "description": "Integraciones y arquitectura de APIs"},
+    "review": {"name": "Review Agent", "level": 4, "description": "Revisión experta y feedback constructivo"},
+    "translation": {"name": "Translation Agent", "level": 5, "description": "Traducción profesional y localización"},
+    "summary": {"name": "Summary Agent", "level": 5, "description": "Síntesis y resumen de información"},
+    "formatting": {"name": "Formatting Agent", "level": 5, "description": "Formato profesional y presentación visual"},
+    "validation": {"name": "Validation Agent", "level": 5, "description": "Validación de datos y verificación"},
+    "coordination": {"name": "Coordination Agent", "level": 5, "description": "Coordinación de tareas y gestión de flujos"},
+    "explanation": {"name": "Explanation Agent", "level": 5, "description": "Explicaciones claras y comprensibles"},
+}
+
+# Clase de cada agente
+AGENT_CLASSES: Dict[str, Type[BaseAgent]] = {
+    "reasoning": ReasoningAgent,
+    "planning": PlanningAgent,
+    "research": ResearchAgent,
+    "analysis": AnalysisAgent,
+    "synthesis": SynthesisAgent,
+    "critical_thinking": CriticalThinkingAgent,
+    "coding": CodingAgent,
+    "data": DataAgent,
+    "writing": WritingAgent,
+    "communication": CommunicationAgent,
+    "decision": DecisionAgent,
+    "problem_solving": ProblemSolvingAgent,
+    "legal": LegalAgent,
+    "financial": FinancialAgent,
+    "creative": CreativeAgent,
+    "technical": TechnicalAgent,
+    "educational": EducationalAgent,
+    "marketing": MarketingAgent,
+    "qa": QAAgent,
+    "documentation": DocumentationAgent,
+    "optimization": OptimizationAgent,
+    "security": SecurityAgent,
+    "integration": IntegrationAgent,
+    "review": ReviewAgent,
+    "translation": TranslationAgent,
+    "summary": SummaryAgent,
+    "formatting": FormattingAgent,
+    "validation": ValidationAgent,
+    "coordination": CoordinationAgent,
+    "explanation": ExplanationAgent,
+}
+
+
+class AgentRegistry:
+    """
+    Registro de prototipos de agentes.
+    
+    - Los prototipos se construyen de forma perezosa, una vez por proceso
+    - `create` retorna una copia ligera con overlay de modelo/api_config
+    - Solo se construyen los agentes realmente seleccionados
+    """
+    
+    def __init__(self, agent_classes: Dict[str, Type[BaseAgent]]):
+        self.agent_classes = agent_classes
+        self._prototypes: Dict[str, BaseAgent] = {}
+        self.stats = {
+            "prototypes_built": 0,
+            "instances_created": 0,
+        }
+    
+    def get_prototype(self, agent_key: str) -> BaseAgent:
+        """Obtiene (o construye) el prototipo inmutable de un agente"""
+        prototype = self._prototypes.get(agent_key)
+        if prototype is None:
+            if agent_key not in self.agent_classes:
+                raise KeyError(f"Agent {agent_key} not found")
+            prototype = self.agent_classes[agent_key]()
+            prototype.agent_key = agent_key
+            prototype.level = AGENT_DEFINITIONS.get(agent_key, {}).get("level", 1)
+            self._prototypes[agent_key] = prototype
+            self.stats["prototypes_built"] += 1
+        return prototype
+    
+    def create(
+        self,
+        agent_key: str,
+        model: Optional[str] = None,
+        api_config: Optional[Dict[str, Any]] = None
+    ) -> BaseAgent:
+        """Crea una instancia por request a partir del prototipo"""
+        self.stats["instances_created"] += 1
+        return self.get_prototype(agent_key).with_overrides(model=model, api_config=api_config)
+    
+    def build(
+        self,
+        agent_keys: List[str],
+        model: Optional[str] = None,
+        api_config: Optional[Dict[str, Any]] = None
+    ) -> List[BaseAgent]:
+        """Crea las instancias de los agentes seleccionados (en orden)"""
+        return [
+            self.create(agent_key, model=model, api_config=api_config)
+            for agent_key in agent_keys
+            if agent_key in self.agent_classes
+        ]
+
+
+# Registro global de agentes
+agent_registry = AgentRegistry(AGENT_CLASSES)
@@ -0,0 +1,287 @@
+"""
+Checkpoints - ATP
+Checkpoints durables de las ejecuciones del orquestador (SQLite)
+
+El grafo de LangGraph se compila con `AsyncSqliteSaver` y cada ejecución
+usa su `conversation_id` como `thread_id`: LangGraph guarda el estado tras
+cada paso y las ramas Send que ya terminaron. Como los modos secuencial y
+DAG ejecutan todos los agentes dentro de un único nodo, cada agente
+completado se guarda además en la tabla `agent_progress`.
+
+Una ejecución interrumpida (reinicio, caída, cliente desconectado) se
+reanuda con `AgentOrchestrator.resume` sin repetir los agentes que ya
+respondieron. Los checkpoints de las ejecuciones completadas o fallidas se
+borran; los de las canceladas que no se reanudan caducan tras
+CHECKPOINT_TTL_SECONDS (tabla `checkpoint_threads`).
+
+Cada ejecución pertenece a la API key que la inició (`checkpoint_owner`):
+solo esa key puede reanudarla o reemplazarla con el mismo ID.
+
+Requiere `langgraph-checkpoint-sqlite` (opcional): sin él, o con
+CHECKPOINT_ENABLED=false, el grafo se compila sin checkpointer.
+"""
+from typing import Dict, Any, Optional, Tuple
+import hashlib
+import time
+
+from app.a2a_protocol import A2AMessage, A2AResponse, A2AMessageRecord, A2AResponseRecord
+from app.config import CHECKPOINT_ENABLED, CHECKPOINT_SQLITE_PATH, CHECKPOINT_TTL_SECONDS
+
+try:
+    import aiosqlite
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+except ImportError:  # dependencia opcional
+    aiosqlite = None
+    JsonPlusSerializer = None
+    AsyncSqliteSaver = None
+
+
+# Tipos propios que pueden aparecer en el estado del grafo
+_ALLOWED_MODULES = [
+    ("app.a2a_protocol", name)
+    for name in (
+        "A2AMessage", "A2AResponse", "A2AMessageRecord", "A2AResponseRecord",
+        "MessageType", "Priority", "AgentCapability",
+    )
+]
+
+# Intervalo mínimo entre barridos de ejecuciones caducadas
+_PRUNE_INTERVAL_SECONDS = 60.0
+
+
+def _build_serde() -> Any:
+    """
+    Serializador con los tipos propios permitidos. `allowed_msgpack_modules`
+    solo existe en versiones recientes de langgraph-checkpoint.
+    """
+    try:
+        return JsonPlusSerializer(allowed_msgpack_modules=_ALLOWED_MODULES)
+    except TypeError:
+        return JsonPlusSerializer()
+
+
+class CheckpointStore:
+    """
+    Checkpointer de LangGraph y progreso por agente sobre un mismo SQLite.
+
+    - `start` / `stop`: abren y cierran la conexión (lifespan de la app)
+    - `saver`: checkpointer para `StateGraph.compile` (None si desactivado)
+    - `save_agent_result` / `load_agent_results`: respuestas de agentes
+      completados de una ejecución
+    - `delete_thread`: borra todo lo guardado de una ejecución
+    - `touch_thread` / `prune`: registro de ejecuciones (con su propietario)
+      y borrado de las abandonadas tras `ttl_seconds`
+    - `thread_owner`: propietario de una ejecución guardada
+    """
+
+    def __init__(self, path: Optional[str], enabled: bool = True, ttl_seconds: float = 86400.0):
+        self.path = path
+        self.enabled = enabled and bool(path)
+        self.ttl_seconds = ttl_seconds
+        self.serde: Optional[Any] = None
+        self.saver: Optional[Any] = None
+        self._conn = None
+        self._last_prune = 0.0
+        self.stats = {
+            "agent_results_saved": 0,
+            "agent_results_loaded": 0,
+            "threads_deleted": 0,
+            "threads_expired": 0,
+            "errors": 0,
+        }
+
+    @property
+    def active(self) -> bool:
+        return self.saver is not None
+
+    async def start(self) -> None:
+        if not self.enabled or self.active:
+            return
+        if AsyncSqliteSaver is None:
+            print("⚠️ Checkpoints desactivados: instala langgraph-checkpoint-sqlite")
+            return
+        try:
+            self._conn = await aiosqlite.connect(self.path)
+            await self._conn.execute("PRAGMA journal_mode=WAL")
+            await self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS agent_progress ("
+                " thread_id TEXT NOT NULL,"
+                " agent_id TEXT NOT NULL,"
+                " type TEXT NOT NULL,"
+                " data BLOB NOT NULL,"
+                " PRIMARY KEY (thread_id, agent_id))"
+            )
+            await self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoint_threads ("
+                " thread_id TEXT PRIMARY KEY,"
+                " updated_at REAL NOT NULL,"
+                " owner TEXT NOT NULL DEFAULT '')"
+            )
+            async with self._conn.execute("PRAGMA table_info(checkpoint_threads)") as cursor:
+                columns = {row[1] for row in await cursor.fetchall()}
+            if "owner" not in columns:
+                await self._conn.execute(
+                    "ALTER TABLE checkpoint_threads ADD COLUMN owner TEXT NOT NULL DEFAULT ''"
+                )
+            await self._conn.commit()
+            self.serde = _build_serde()
+            saver = AsyncSqliteSaver(self._conn, serde=self.serde)
+            await saver.setup()
+            # Ejecuciones sin registrar (bases creadas antes del TTL): caducan desde ahora
+            now = time.time()
+            await self._conn.execute(
+                "INSERT OR IGNORE INTO checkpoint_threads (thread_id, updated_at)"
+                " SELECT DISTINCT thread_id, ? FROM checkpoints"
+                " UNION SELECT DISTINCT thread_id, ? FROM agent_progress",
+                (now, now),
+            )
+            await self._conn.commit()
+            self.saver = saver
+            print(f"💾 Checkpoints SQLite: {self.path}")
+            await self.prune()
+        except Exception as e:
+            print(f"⚠️ No se pudieron abrir los checkpoints ({self.path}): {e}")
+            await self.stop()
+
+    async def stop(self) -> None:
+        self.saver = None
+        self.serde = None
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            await conn.close()
+
+    async def save_agent_result(
+        self,
+        thread_id: str,
+        agent_id: str,
+        message: A2AMessageRecord,
+        response: A2AResponseRecord
+    ) -> None:
+        """Guarda el intercambio A2A de un agente completado"""
+        if not self.active:
+            return
+        try:
+            type_, data = self.serde.dumps_typed((message, response))
+            await self._conn.execute(
+                "INSERT OR REPLACE INTO agent_progress (thread_id, agent_id, type, data)"
+                " VALUES (?, ?, ?, ?)",
+                (thread_id, agent_id, type_, data),
+            )
+            await self._conn.commit()
+            self.stats["agent_results_saved"] += 1
+        except Exception as e:
+            # El checkpoint es best-effort: nunca interrumpe la ejecución
+            self.stats["errors"] += 1
+            print(f"⚠️ No se pudo guardar el progreso de {agent_id}: {e}")
+
+    async def load_agent_results(self, thread_id: str) -> Dict[str, Tuple[A2AMessageRecord, A2AResponseRecord]]:
+        """Intercambios A2A de los agentes ya completados de una ejecución"""
+        if not self.active:
+            return {}
+        async with self._conn.execute(
+            "SELECT agent_id, type, data FROM agent_progress WHERE thread_id = ?",
+            (thread_id,),
+        ) as cursor:
+            rows = await cursor.fetchall()
+        results = {}
+        for agent_id, type_, data in rows:
+            message, response = self.serde.loads_typed((type_, data))
+            # Progreso guardado antes de los records (modelos pydantic)
+            if isinstance(message, A2AMessage):
+                message = A2AMessageRecord.from_pydantic(message)
+            if isinstance(response, A2AResponse):
+                response = A2AResponseRecord.from_pydantic(response)
+            results[agent_id] = (message, response)
+        self.stats["agent_results_loaded"] += len(results)
+        return results
+
+    async def delete_thread(self, thread_id: str) -> None:
+        """Borra los checkpoints y el progreso de una ejecución"""
+        if not self.active:
+            return
+        try:
+            await self._delete(thread_id)
+            self.stats["threads_deleted"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️ No se pudieron borrar los checkpoints de {thread_id}: {e}")
+
+    async def _delete(self, thread_id: str) -> None:
+        await self.saver.adelete_thread(thread_id)
+        await self._conn.execute("DELETE FROM agent_progress WHERE thread_id = ?", (thread_id,))
+        await self._conn.execute("DELETE FROM checkpoint_threads WHERE thread_id = ?", (thread_id,))
+        await self._conn.commit()
+
+    async def thread_owner(self, thread_id: str) -> Optional[str]:
+        """Propietario de la ejecución guardada (None si no hay nada guardado)"""
+        if not self.active:
+            return None
+        async with self._conn.execute(
+            "SELECT owner FROM checkpoint_threads WHERE thread_id = ?", (thread_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row is not None else None
+
+    async def touch_thread(self, thread_id: str, owner: str = "") -> None:
+        """Registra la actividad de una ejecución (y barre las caducadas)"""
+        if not self.active:
+            return
+        try:
+            # El propietario se fija al crear el registro y no cambia
+            await self._conn.execute(
+                "INSERT INTO checkpoint_threads (thread_id, updated_at, owner) VALUES (?, ?, ?)"
+                " ON CONFLICT(thread_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (thread_id, time.time(), owner),
+            )
+            await self._conn.commit()
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️ No se pudo registrar la ejecución {thread_id}: {e}")
+        if time.monotonic() - self._last_prune >= _PRUNE_INTERVAL_SECONDS:
+            await self.prune()
+
+    async def prune(self) -> None:
+        """Borra las ejecuciones sin actividad desde hace más de `ttl_seconds`"""
+        if not self.active:
+            return
+        self._last_prune = time.monotonic()
+        try:
+            async with self._conn.execute(
+                "SELECT thread_id FROM checkpoint_threads WHERE updated_at < ?",
+                (time.time() - self.ttl_seconds,),
+            ) as cursor:
+                expired = [row[0] for row in await cursor.fetchall()]
+            for thread_id in expired:
+                await self._delete(thread_id)
+            self.stats["threads_expired"] += len(expired)
+            if expired:
+                print(f"🧹 {len(expired)} ejecuciones abandonadas borradas de los checkpoints")
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️ No se pudieron barrer los checkpoints caducados: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "active": self.active,
+            "path": self.path,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+def checkpoint_owner(api_config: Optional[Dict[str, Any]]) -> str:
+    """Propietario de una ejecución: huella de la API key ('' = key del servidor)"""
+    api_key = (api_config or {}).get("api_key")
+    if not api_key:
+        return ""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+# Checkpoints globales de las ejecuciones
+checkpoint_store = CheckpointStore(
+    CHECKPOINT_SQLITE_PATH,
+    enabled=CHECKPOINT_ENABLED,
+    ttl_seconds=CHECKPOINT_TTL_SECONDS,
+)
@@ -3,6 +3,7 @@ Configuración del backend ATP con Groq como proveedor predeterminado.
 Siempre se solicitará al menos una API key de Groq.
 """
 import os
+from typing import Dict, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -37,6 +38,124 @@ MODELS = {
 # Default model
 DEFAULT_MODEL = "groq-default"
 
+# Pool de clientes LLM asíncronos (conexiones HTTP keep-alive compartidas)
+LLM_CLIENT_POOL_SIZE = int(os.getenv("LLM_CLIENT_POOL_SIZE", 32))
+LLM_CLIENT_IDLE_SECONDS = float(os.getenv("LLM_CLIENT_IDLE_SECONDS", 300))
+
+# Límite superior de agentes ejecutados en paralelo por request
+MAX_PARALLEL_AGENTS = int(os.getenv("MAX_PARALLEL_AGENTS", 8))
+
+# Plazo por agente (segundos) cuando la petición no fija `a2aResponsesCollector.timeoutMs`
+AGENT_TIMEOUT_SECONDS = int(os.getenv("AGENT_TIMEOUT_SECONDS", 120))
+# Suelo del plazo pedido por el cliente: una llamada LLM no cabe en pocos segundos
+AGENT_TIMEOUT_MIN_SECONDS = int(os.getenv("AGENT_TIMEOUT_MIN_SECONDS", 30))
+
+# Reintentos de agentes fallidos (backoff exponencial con jitter)
+AGENT_MAX_RETRIES = int(os.getenv("AGENT_MAX_RETRIES", 2))
+AGENT_RETRY_BASE_DELAY = float(os.getenv("AGENT_RETRY_BASE_DELAY", 0.5))
+
+# Caché de grafos LangGraph compilados (por forma del grafo)
+GRAPH_CACHE_SIZE = int(os.getenv("GRAPH_CACHE_SIZE", 8))
+
+# Almacén de conversaciones A2A (acotado: TTL + LRU + mensajes por conversación)
+A2A_MAX_CONVERSATIONS = int(os.getenv("A2A_MAX_CONVERSATIONS", 1000))
+A2A_CONVERSATION_TTL_SECONDS = float(os.getenv("A2A_CONVERSATION_TTL_SECONDS", 3600))
+A2A_MAX_MESSAGES_PER_CONVERSATION = int(os.getenv("A2A_MAX_MESSAGES_PER_CONVERSATION", 200))
+
+# Digests de resultados previos (texto máximo por agente y conversaciones retenidas)
+RESULT_DIGEST_MAX_CHARS = int(os.getenv("RESULT_DIGEST_MAX_CHARS", 1500))
+RESULT_DIGEST_MAX_CONVERSATIONS = int(os.getenv("RESULT_DIGEST_MAX_CONVERSATIONS", 256))
+# Texto máximo de todos los digests inyectados en el prompt de un agente
+RESULT_DIGEST_MAX_TOTAL_CHARS = int(os.getenv("RESULT_DIGEST_MAX_TOTAL_CHARS", 6000))
+
+# Enrutado automático de consultas (context.routing.mode = "auto")
+ROUTER_TOP_K = int(os.getenv("ROUTER_TOP_K", 3))
+ROUTER_MIN_SCORE = float(os.getenv("ROUTER_MIN_SCORE", 0.02))
+
+# Intervalo de comprobación de desconexión del cliente (cancela la ejecución)
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", 0.5))
+
+# API de jobs: workers en paralelo, jobs en cola y retención de resultados
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", 100))
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", 3600))
+
+# Límites de cuota por proveedor (por API key): peticiones y tokens por minuto.
+# Cada proveedor se configura con RATE_LIMIT_<PROVIDER>_RPM / _TPM (p. ej.
+# RATE_LIMIT_OPENAI_RPM) según el tier de la cuenta; los valores por defecto
+# son conservadores. None = sin límite (p. ej. modelos locales)
+def _rate_limit(provider: str, rpm: Optional[int], tpm: Optional[int]) -> Optional[Dict[str, int]]:
+    prefix = f"RATE_LIMIT_{provider.upper()}"
+    env_rpm = os.getenv(f"{prefix}_RPM")
+    env_tpm = os.getenv(f"{prefix}_TPM")
+    if env_rpm is None and env_tpm is None and rpm is None:
+        return None
+    return {
+        "rpm": int(env_rpm or rpm or 60),
+        "tpm": int(env_tpm or tpm or 100000),
+    }
+
+
+RATE_LIMITS = {
+    "groq": _rate_limit("groq", int(os.getenv("GROQ_RPM", 30)), int(os.getenv("GROQ_TPM", 12000))),
+    "openai": _rate_limit("openai", 500, 200000),
+    "deepseek": _rate_limit("deepseek", 300, 300000),
+    "together": _rate_limit("together", 600, 180000),
+    "openrouter": _rate_limit("openrouter", 200, 200000),
+    "mistral": _rate_limit("mistral", 60, 500000),
+    "ollama": _rate_limit("ollama", None, None),
+    "default": _rate_limit("default", 60, 100000),
+}
+
+# Llamadas LLM concurrentes por (provider, API key), compartidas por todas
+# las ejecuciones del proceso. None = sin límite
+LLM_CONCURRENCY_LIMITS = {
+    "groq": int(os.getenv("GROQ_MAX_CONCURRENT", 6)),
+    "ollama": int(os.getenv("OLLAMA_MAX_CONCURRENT", 2)),
+    "default": int(os.getenv("LLM_MAX_CONCURRENT_PER_KEY", 16)),
+}
+
+# Máximo de API keys con gobernador y limitador propios; al superarlo se
+# descartan los de las keys inactivas usadas hace más tiempo
+LLM_MAX_TRACKED_KEYS = int(os.getenv("LLM_MAX_TRACKED_KEYS", 1024))
+
+# Huecos de cada key reservados a prioridad NORMAL o superior (chat
+# interactivo); LOW/BACKGROUND solo usan la capacidad restante. 0 = sin reserva
+LLM_RESERVED_INTERACTIVE_SLOTS = int(os.getenv("LLM_RESERVED_INTERACTIVE_SLOTS", 1))
+
+# Segundos de espera en cola tras los que una llamada sube un nivel de
+# prioridad (evita la inanición del trabajo BACKGROUND). 0 = sin envejecimiento
+LLM_PRIORITY_AGING_SECONDS = float(os.getenv("LLM_PRIORITY_AGING_SECONDS", 10))
+
+# Reintentos ante HTTP 429 / errores transitorios del proveedor
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+
+# Caché de respuestas LLM (memoria LRU + SQLite opcional)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MEMORY_SIZE = int(os.getenv("LLM_CACHE_MEMORY_SIZE", 512))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 86400))
+LLM_CACHE_SQLITE_PATH = os.getenv("LLM_CACHE_SQLITE_PATH")  # None = solo memoria
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", 0.8))
+
+# Ejecuciones incrementales: reutilizar resultados de agentes con las
+# mismas entradas (consulta, contexto, modelo, configuración, resultados previos)
+INCREMENTAL_RUNS_ENABLED = os.getenv("INCREMENTAL_RUNS_ENABLED", "true").lower() == "true"
+AGENT_RESULT_CACHE_SIZE = int(os.getenv("AGENT_RESULT_CACHE_SIZE", 1024))
+AGENT_RESULT_CACHE_TTL_SECONDS = float(os.getenv("AGENT_RESULT_CACHE_TTL_SECONDS", 3600))
+
+# Síntesis jerárquica (map-reduce) con `context.synthesis.strategy`:
+# tokens de entrada por llamada y tokens de salida de resúmenes y respuesta
+SYNTHESIS_TOKEN_BUDGET = int(os.getenv("SYNTHESIS_TOKEN_BUDGET", 6000))
+SYNTHESIS_SUMMARY_TOKENS = int(os.getenv("SYNTHESIS_SUMMARY_TOKENS", 700))
+SYNTHESIS_FINAL_TOKENS = int(os.getenv("SYNTHESIS_FINAL_TOKENS", 2000))
+
+# Checkpoints durables de LangGraph (reanudar ejecuciones interrumpidas).
+# Desactivados por defecto: guardan resultados de agentes en disco
+CHECKPOINT_ENABLED = os.getenv("CHECKPOINT_ENABLED", "false").lower() == "true"
+CHECKPOINT_SQLITE_PATH = os.getenv("CHECKPOINT_SQLITE_PATH", "atp_checkpoints.sqlite")
+# Ejecuciones abandonadas (canceladas y nunca reanudadas) se borran tras este plazo
+CHECKPOINT_TTL_SECONDS = float(os.getenv("CHECKPOINT_TTL_SECONDS", 86400))
+
 # Server config
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", 8000))
@@ -0,0 +1,304 @@
+"""
+Concurrency Governor - ATP
+Límite global de llamadas LLM concurrentes por (provider, API key)
+
+Todas las ejecuciones del proceso comparten el límite de cada API key. Las
+llamadas que exceden el límite esperan en una cola con prioridad:
+
+1. Prioridad A2A del mensaje que originó la llamada (CRITICAL ... BACKGROUND).
+   Las llamadas en cola envejecen: cada `aging_seconds` de espera suben un
+   nivel, de modo que el trabajo BACKGROUND nunca se queda sin servicio.
+2. Reparto justo: a igual prioridad, la petición (ejecución del
+   orquestador) con menos llamadas en curso, y después la más antigua.
+
+Los huecos `reserved_slots` quedan reservados para prioridad NORMAL o
+superior: el trabajo LOW/BACKGROUND encolado cede siempre el paso al
+interactivo y solo usa la capacidad sobrante.
+
+La petición y la prioridad actuales se propagan con `ContextVar`: el
+orquestador fija la petición y `BaseAgent.handle_message` la prioridad.
+"""
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar, Token
+import asyncio
+import itertools
+import time
+
+from app.a2a_protocol import Priority
+from app.config import (
+    LLM_CONCURRENCY_LIMITS,
+    LLM_RESERVED_INTERACTIVE_SLOTS,
+    LLM_PRIORITY_AGING_SECONDS,
+    LLM_MAX_TRACKED_KEYS,
+)
+from app.metrics import metrics, provider_metrics
+
+
+# Orden de servicio (menor = antes)
+PRIORITY_RANK = {
+    Priority.CRITICAL: 0,
+    Priority.HIGH: 1,
+    Priority.NORMAL: 2,
+    Priority.LOW: 3,
+    Priority.BACKGROUND: 4,
+}
+_INTERACTIVE_RANK = PRIORITY_RANK[Priority.NORMAL]
+
+
+# Petición (ejecución del orquestador) a la que pertenece la llamada actual
+_current_request_id: ContextVar[Optional[str]] = ContextVar("atp_request_id", default=None)
+
+
+def bind_request_id(request_id: Optional[str]) -> Token:
+    """Asocia las llamadas LLM del contexto actual a una petición"""
+    return _current_request_id.set(request_id)
+
+
+def reset_request_id(token: Token) -> None:
+    _current_request_id.reset(token)
+
+
+# Prioridad A2A del trabajo actual
+_current_priority: ContextVar[Priority] = ContextVar("atp_priority", default=Priority.NORMAL)
+
+
+def bind_priority(priority: Priority) -> Token:
+    """Fija la prioridad de las llamadas LLM del contexto actual"""
+    return _current_priority.set(priority)
+
+
+def reset_priority(token: Token) -> None:
+    _current_priority.reset(token)
+
+
+class _Waiter:
+    """Llamada en cola esperando un hueco"""
+
+    __slots__ = ("request_id", "priority", "rank", "seq", "future", "enqueued_at")
+
+    def __init__(self, request_id: str, priority: Priority, seq: int, future: asyncio.Future):
+        self.request_id = request_id
+        self.priority = priority
+        self.rank = PRIORITY_RANK[priority]
+        self.seq = seq
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class KeyGovernor:
+    """
+    Límite de concurrencia de una combinación (provider, API key).
+
+    - `acquire` concede un hueco o encola la llamada
+    - `release` libera el hueco y lo concede al siguiente (prioridad con
+      envejecimiento, luego reparto justo)
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        limit: int,
+        reserved_slots: int = 0,
+        aging_seconds: float = 10.0
+    ):
+        self.provider = provider
+        self.limit = max(1, limit)
+        # Siempre queda al menos un hueco para LOW/BACKGROUND
+        self.background_limit = max(1, self.limit - max(0, reserved_slots))
+        self.aging_seconds = aging_seconds
+        self.active = 0
+        self._in_flight: Dict[str, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._metrics = provider_metrics(provider)
+        self.stats = {
+            "granted": 0,
+            "queued": 0,
+            "max_queue_depth": 0,
+            "total_wait_ms": 0.0,
+        }
+
+    def _grant(self, request_id: str) -> None:
+        self.active += 1
+        self._in_flight[request_id] = self._in_flight.get(request_id, 0) + 1
+        self.stats["granted"] += 1
+
+    def _effective_rank(self, waiter: _Waiter, now: float) -> int:
+        """Prioridad tras el envejecimiento (protección contra inanición)"""
+        if self.aging_seconds <= 0:
+            return waiter.rank
+        return max(0, waiter.rank - int((now - waiter.enqueued_at) / self.aging_seconds))
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        """
+        Siguiente llamada que puede ocupar un hueco: mayor prioridad efectiva,
+        luego la petición con menos llamadas en curso, luego la más antigua.
+        """
+        now = time.monotonic()
+        in_flight = self._in_flight
+        best = None
+        best_key = None
+        for waiter in self._waiters:
+            rank = self._effective_rank(waiter, now)
+            if rank > _INTERACTIVE_RANK and self.active >= self.background_limit:
+                # Huecos reservados al trabajo interactivo
+                continue
+            key = (rank, in_flight.get(waiter.request_id, 0), waiter.seq)
+            if best_key is None or key < best_key:
+                best, best_key = waiter, key
+        return best
+
+    def _dispatch(self) -> None:
+        while self._waiters and self.active < self.limit:
+            waiter = self._next_waiter()
+            if waiter is None:
+                break
+            self._waiters.remove(waiter)
+            self._metrics.queued.dec()
+            if waiter.future.done():
+                continue
+            self._grant(waiter.request_id)
+            waited_ms = (time.monotonic() - waiter.enqueued_at) * 1000
+            self.stats["total_wait_ms"] += waited_ms
+            metrics.observe("llm_queue_wait", waited_ms, label=self.provider)
+            waiter.future.set_result(None)
+
+    async def acquire(self, request_id: str, priority: Priority = Priority.NORMAL) -> None:
+        """Espera un hueco para la petición `request_id` con la prioridad dada"""
+        limit = self.limit if PRIORITY_RANK[priority] <= _INTERACTIVE_RANK else self.background_limit
+        if self.active < limit and not self._waiters:
+            self._grant(request_id)
+            return
+
+        waiter = _Waiter(request_id, priority, next(self._seq), asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self._metrics.queued.inc()
+        self.stats["queued"] += 1
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self._waiters))
+        # Puede haber hueco para esta prioridad aunque otras esperen
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # El hueco se concedió justo antes de cancelar: devolverlo
+                self.release(request_id)
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self._metrics.queued.dec()
+            raise
+
+    def release(self, request_id: str) -> None:
+        """Libera el hueco de una llamada terminada"""
+        self.active -= 1
+        remaining = self._in_flight.get(request_id, 1) - 1
+        if remaining > 0:
+            self._in_flight[request_id] = remaining
+        else:
+            self._in_flight.pop(request_id, None)
+        self._dispatch()
+
+    @property
+    def idle(self) -> bool:
+        """Sin llamadas en curso ni en cola"""
+        return self.active == 0 and not self._waiters
+
+    def get_stats(self) -> Dict[str, Any]:
+        queue_by_priority: Dict[str, int] = {}
+        for waiter in self._waiters:
+            queue_by_priority[waiter.priority.value] = queue_by_priority.get(waiter.priority.value, 0) + 1
+        return {
+            **self.stats,
+            "limit": self.limit,
+            "background_limit": self.background_limit,
+            "active": self.active,
+            "queue_depth": len(self._waiters),
+            "queue_depth_by_priority": queue_by_priority,
+            "requests_in_flight": len(self._in_flight),
+        }
+
+
+class ConcurrencyGovernor:
+    """
+    Gobernadores por (provider, hash de API key), creados bajo demanda.
+
+    LRU acotado a `max_keys`: al superarlo se descartan los gobernadores
+    inactivos usados hace más tiempo (los que tienen llamadas en curso o en
+    cola se conservan).
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Optional[int]],
+        reserved_slots: int = 0,
+        aging_seconds: float = 10.0,
+        max_keys: int = 1024
+    ):
+        self.limits = limits
+        self.reserved_slots = reserved_slots
+        self.aging_seconds = aging_seconds
+        self.max_keys = max(1, max_keys)
+        self._governors: "OrderedDict[Tuple[str, str], KeyGovernor]" = OrderedDict()
+        self._anonymous = itertools.count()
+
+    def get(self, provider: str, key_hash: str) -> Optional[KeyGovernor]:
+        """Retorna el gobernador o None si el proveedor no tiene límite"""
+        key = (provider, key_hash)
+        governor = self._governors.get(key)
+        if governor is not None:
+            self._governors.move_to_end(key)
+            return governor
+
+        limit = self.limits.get(provider, self.limits.get("default"))
+        if not limit:
+            return None
+        governor = self._governors[key] = KeyGovernor(
+            provider, limit, self.reserved_slots, self.aging_seconds
+        )
+        self._evict(keep=key)
+        return governor
+
+    def _evict(self, keep: Tuple[str, str]) -> None:
+        """
+        Descarta gobernadores inactivos (los más antiguos) por encima del límite.
+        `keep` (el recién creado, aún sin uso) nunca se descarta.
+        """
+        excess = len(self._governors) - self.max_keys
+        if excess <= 0:
+            return
+        idle = [key for key, governor in self._governors.items() if key != keep and governor.idle]
+        for key in idle[:excess]:
+            del self._governors[key]
+
+    @asynccontextmanager
+    async def slot(self, provider: str, key_hash: str) -> AsyncIterator[None]:
+        """Ocupa un hueco de concurrencia durante una llamada LLM"""
+        governor = self.get(provider, key_hash)
+        if governor is None:
+            yield
+            return
+
+        # Llamadas fuera de una ejecución del orquestador: cada una es su propia petición
+        request_id = _current_request_id.get() or f"anonymous-{next(self._anonymous)}"
+        await governor.acquire(request_id, _current_priority.get())
+        try:
+            yield
+        finally:
+            governor.release(request_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            f"{provider}:{key_hash}": governor.get_stats()
+            for (provider, key_hash), governor in self._governors.items()
+        }
+
+
+# Gobernador global de concurrencia LLM
+llm_governor = ConcurrencyGovernor(
+    LLM_CONCURRENCY_LIMITS,
+    reserved_slots=LLM_RESERVED_INTERACTIVE_SLOTS,
+    aging_seconds=LLM_PRIORITY_AGING_SECONDS,
+    max_keys=LLM_MAX_TRACKED_KEYS,
+)
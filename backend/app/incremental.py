@@ -0,0 +1,150 @@
+"""
+Incremental Runs - ATP
+Reutilización de resultados de agentes cuyas entradas no cambiaron
+
+Al iterar sobre un pipeline en el editor de nodos (cambiar un ajuste,
+añadir un agente) la mayoría de agentes reciben exactamente las mismas
+entradas que en la ejecución anterior. Cada agente se identifica con una
+huella (fingerprint) de sus entradas:
+
+- la consulta
+- el contexto tal como llega al prompt (`agent_prompt_context`: sin
+  `generatedAt` ni las claves que solo controlan la orquestación)
+- el modelo, la API, la huella de la API key y la configuración del
+  agente (system prompt, temperatura, max_tokens)
+- los resultados de los agentes de los que depende
+
+Si la huella ya tiene un resultado exitoso, se reutiliza sin llamar al
+LLM; solo se ejecutan los agentes nuevos o cuyas entradas cambiaron.
+Opt-out por ejecución con `context.incremental = false` y por agente con
+`cache_responses = False` (agentes creativos).
+"""
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+import hashlib
+import json
+import time
+
+from app.a2a_protocol import A2AResponseRecord
+from app.agents.base_agent import agent_prompt_context
+from app.config import (
+    INCREMENTAL_RUNS_ENABLED,
+    AGENT_RESULT_CACHE_SIZE,
+    AGENT_RESULT_CACHE_TTL_SECONDS,
+)
+
+
+def _agent_config(agent: Any) -> Dict[str, Any]:
+    """Configuración del agente que determina su salida (la API key, como huella)"""
+    api_config = getattr(agent, "api_config", None) or {}
+    api_key = api_config.get("api_key")
+    return {
+        "agent_id": agent.profile.agent_id,
+        "class": type(agent).__name__,
+        "model": agent.model,
+        "temperature": agent.profile.temperature,
+        "max_tokens": agent.profile.max_tokens,
+        "system_prompt": hashlib.sha256(agent.get_system_prompt().encode("utf-8")).hexdigest(),
+        "api_type": api_config.get("type"),
+        "base_url": api_config.get("base_url"),
+        # Los resultados no se comparten entre usuarios
+        "api_key": hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16] if api_key else None,
+    }
+
+
+def fingerprint_agent_inputs(
+    query: str,
+    context: Any,
+    agent: Any,
+    previous_results: Dict[str, Any]
+) -> str:
+    """Hash SHA-256 de todas las entradas de un agente"""
+    raw = json.dumps(
+        {
+            "query": " ".join(query.split()),
+            "context": agent_prompt_context(context),
+            "agent": _agent_config(agent),
+            "upstream": previous_results,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AgentResultCache:
+    """
+    Respuestas exitosas de agentes indexadas por la huella de sus entradas.
+
+    LRU acotado en memoria con TTL, compartido por todo el proceso.
+    """
+
+    def __init__(self, enabled: bool = True, max_size: int = 1024, ttl_seconds: float = 3600.0):
+        self.enabled = enabled
+        self.max_size = max(1, max_size)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    def is_enabled_for(self, context: Any, agent: Any = None) -> bool:
+        """
+        Reutilización activa para una ejecución (`context.incremental`) y
+        un agente (`cache_responses`)
+        """
+        if not self.enabled:
+            return False
+        if agent is not None and not getattr(agent, "cache_responses", True):
+            return False
+        if isinstance(context, dict) and context.get("incremental") is False:
+            return False
+        return True
+
+    def get(self, fingerprint: str) -> Optional[A2AResponseRecord]:
+        entry = self._entries.get(fingerprint)
+        if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+            if entry is not None:
+                del self._entries[fingerprint]
+            self.stats["misses"] += 1
+            return None
+        self._entries.move_to_end(fingerprint)
+        self.stats["hits"] += 1
+        return entry[1]
+
+    def put(self, fingerprint: str, response: A2AResponseRecord) -> None:
+        """Guarda una respuesta exitosa"""
+        if not response.success:
+            return
+        self._entries[fingerprint] = (time.monotonic(), response)
+        self._entries.move_to_end(fingerprint)
+        self.stats["stores"] += 1
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+        }
+
+
+# Caché global de resultados de agentes
+agent_result_cache = AgentResultCache(
+    enabled=INCREMENTAL_RUNS_ENABLED,
+    max_size=AGENT_RESULT_CACHE_SIZE,
+    ttl_seconds=AGENT_RESULT_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,281 @@
+"""
+Jobs - ATP
+Ejecuciones asíncronas del orquestador (API de jobs)
+
+`POST /api/jobs` encola una ejecución y devuelve su ID al instante; un pool
+acotado de workers en el proceso ejecuta los jobs. El progreso y los
+resultados parciales llegan por el canal de eventos del orquestador
+(`agent_started` / `agent_retry` / `agent_completed`) y se consultan con
+`GET /api/jobs/{id}`. Los jobs terminados se conservan durante un TTL.
+"""
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+from collections import OrderedDict
+from datetime import datetime
+from enum import Enum
+import asyncio
+import time
+import uuid
+
+from app.config import JOB_WORKERS, JOB_QUEUE_SIZE, JOB_RESULT_TTL_SECONDS
+from app.streaming import EventChannel, bind_event_channel, reset_event_channel
+
+
+JobRunner = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED_STATUSES = {JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+
+class QueueFullError(Exception):
+    """La cola de jobs está llena"""
+
+
+class Job:
+    """Estado de un job: progreso, resultados parciales y resultado final"""
+
+    def __init__(self, runner: JobRunner, metadata: Optional[Dict[str, Any]] = None):
+        self.job_id = str(uuid.uuid4())
+        self.runner = runner
+        self.metadata = metadata or {}
+        self.status = JobStatus.QUEUED
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.finished_monotonic: Optional[float] = None
+        self.agents_running: List[str] = []
+        self.partial_results: Dict[str, Any] = {}
+        self.agents_failed: Dict[str, Optional[str]] = {}
+        self.agents_timed_out: List[str] = []
+        self.agent_retries: Dict[str, int] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+        self.cancel_requested = False
+
+    def finish(self, status: JobStatus, error: Optional[str] = None) -> None:
+        self.status = status
+        self.error = error
+        self.finished_at = datetime.utcnow()
+        self.finished_monotonic = time.monotonic()
+        self.agents_running = []
+        self.task = None
+        # El runner retiene el request completo; ya no hace falta
+        self.runner = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status.value,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "metadata": self.metadata,
+            "progress": {
+                "agents_running": list(self.agents_running),
+                "agents_completed": list(self.partial_results),
+                "agents_failed": dict(self.agents_failed),
+                "agents_timed_out": list(self.agents_timed_out),
+                "agent_retries": dict(self.agent_retries),
+            },
+            "partial_results": dict(self.partial_results),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class _JobEventChannel(EventChannel):
+    """Canal de eventos que vuelca el progreso del orquestador en el job"""
+
+    # El job solo guarda resultados por agente: llamadas LLM sin streaming
+    wants_tokens = False
+
+    def __init__(self, job: Job):
+        super().__init__()
+        self.job = job
+
+    def emit(self, event: str, data: Dict[str, Any]) -> None:
+        job = self.job
+        agent_id = data.get("agent_id")
+        if event == "agent_started":
+            if agent_id not in job.agents_running:
+                job.agents_running.append(agent_id)
+        elif event == "agent_retry":
+            job.agent_retries[agent_id] = data.get("attempt", 0)
+        elif event == "agent_completed":
+            if agent_id in job.agents_running:
+                job.agents_running.remove(agent_id)
+            if data.get("success"):
+                job.partial_results[agent_id] = data.get("result")
+            elif data.get("timed_out"):
+                job.agents_timed_out.append(agent_id)
+            else:
+                job.agents_failed[agent_id] = data.get("error")
+
+
+class JobManager:
+    """
+    Pool de workers acotado que ejecuta jobs encolados.
+
+    - Cola acotada (`queue_size`): si está llena, `submit` lanza QueueFullError
+    - `workers` jobs en paralelo como máximo
+    - Jobs terminados se eliminan tras `result_ttl_seconds`
+    """
+
+    def __init__(self, workers: int = 4, queue_size: int = 100, result_ttl_seconds: float = 3600.0):
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.result_ttl_seconds = result_ttl_seconds
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "rejected": 0,
+            "expired": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Arranca los workers y la limpieza periódica (lifespan de la app)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(index), name=f"atp-job-worker-{index}")
+            for index in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._janitor(), name="atp-job-janitor"))
+        print(f"🧵 Job workers iniciados: {self.workers} (cola: {self.queue_size})")
+
+    async def stop(self) -> None:
+        """Cancela workers y jobs en curso"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def submit(self, runner: JobRunner, metadata: Optional[Dict[str, Any]] = None) -> Job:
+        """Encola un job; lanza QueueFullError si la cola está llena"""
+        if self._queue is None:
+            raise RuntimeError("JobManager is not running")
+        job = Job(runner, metadata)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise QueueFullError(f"Job queue is full ({self.queue_size} pending)")
+        self._jobs[job.job_id] = job
+        self.stats["submitted"] += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancela un job encolado o en curso (no-op si ya terminó)"""
+        job = self._jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job
+        job.cancel_requested = True
+        if job.status == JobStatus.QUEUED:
+            # El worker lo descarta al sacarlo de la cola
+            job.finish(JobStatus.CANCELLED)
+            self.stats["cancelled"] += 1
+        elif job.task is not None:
+            job.task.cancel()
+        return job
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == JobStatus.QUEUED:
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.utcnow()
+
+        # La tarea del job hereda el canal activo al crearse
+        token = bind_event_channel(_JobEventChannel(job))
+        try:
+            job.task = asyncio.create_task(job.runner())
+        finally:
+            reset_event_channel(token)
+
+        try:
+            result = await job.task
+        except asyncio.CancelledError:
+            if not job.cancel_requested:
+                # Cancelación del propio worker (apagado)
+                job.finish(JobStatus.CANCELLED, "Job cancelled on shutdown")
+                self.stats["cancelled"] += 1
+                raise
+            job.finish(JobStatus.CANCELLED)
+            self.stats["cancelled"] += 1
+            print(f"🛑 Job {job.job_id} cancelado")
+        except Exception as e:
+            job.finish(JobStatus.FAILED, str(e))
+            self.stats["failed"] += 1
+            print(f"❌ Job {job.job_id} falló: {e}")
+        else:
+            job.result = result
+            if result.get("success", True):
+                job.finish(JobStatus.COMPLETED)
+                self.stats["completed"] += 1
+            else:
+                job.finish(JobStatus.FAILED, result.get("error"))
+                self.stats["failed"] += 1
+
+    async def _janitor(self) -> None:
+        interval = max(1.0, min(60.0, self.result_ttl_seconds / 2))
+        while True:
+            await asyncio.sleep(interval)
+            self.prune()
+
+    def prune(self) -> int:
+        """Elimina los jobs terminados cuyo TTL venció"""
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_monotonic is not None
+            and now - job.finished_monotonic > self.result_ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        self.stats["expired"] += len(expired)
+        return len(expired)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": sum(1 for job in self._jobs.values() if job.status == JobStatus.RUNNING),
+            "stored": len(self._jobs),
+        }
+
+
+# Gestor global de jobs
+job_manager = JobManager(
+    workers=JOB_WORKERS,
+    queue_size=JOB_QUEUE_SIZE,
+    result_ttl_seconds=JOB_RESULT_TTL_SECONDS,
+)
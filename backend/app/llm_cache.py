@@ -0,0 +1,209 @@
+"""
+LLM Response Cache - ATP
+Caché de respuestas direccionada por contenido
+
+La clave es un hash de los mensajes, el modelo, el endpoint, la huella de
+la API key (las respuestas no se comparten entre usuarios), la temperatura
+y max_tokens. Dos niveles:
+- Memoria: LRU acotado, por proceso
+- SQLite (opcional): persistente en disco, con TTL
+
+Las respuestas cacheadas vuelven en milisegundos y sin coste de tokens.
+"""
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+
+from app.metrics import LLM_CACHE_MEMORY_HITS, LLM_CACHE_SQLITE_HITS, LLM_CACHE_MISSES
+from app.config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MEMORY_SIZE,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_SQLITE_PATH,
+    LLM_CACHE_MAX_TEMPERATURE,
+)
+
+
+def make_cache_key(
+    messages: List[Dict[str, str]],
+    model: str,
+    base_url: str,
+    api_key_hash: str,
+    temperature: float,
+    max_tokens: int
+) -> str:
+    """
+    Hash SHA-256 de la petición. Del contenido solo se recortan los espacios
+    exteriores: saltos de línea e indentación cambian el sentido de prompts
+    con código o markdown.
+    """
+    normalized = [
+        {"role": message.get("role", ""), "content": str(message.get("content", "")).strip()}
+        for message in messages
+    ]
+    raw = json.dumps(
+        [normalized, model, base_url, api_key_hash, round(float(temperature), 3), int(max_tokens)],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _SQLiteTier:
+    """Nivel persistente en SQLite (accesos síncronos, ejecutados en un hilo)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " content TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = asyncio.Lock()
+
+    def _get(self, key: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT content, expires_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        content, expires_at = row
+        if expires_at < time.time():
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._conn.commit()
+            return None
+        return content
+
+    def _set(self, key: str, content: str, ttl_seconds: float) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, content, expires_at) VALUES (?, ?, ?)",
+            (key, content, time.time() + ttl_seconds),
+        )
+        self._conn.commit()
+
+    async def get(self, key: str) -> Optional[str]:
+        async with self._lock:
+            return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, content: str, ttl_seconds: float) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._set, key, content, ttl_seconds)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class LLMResponseCache:
+    """
+    Caché de respuestas LLM con nivel en memoria (LRU) y SQLite opcional.
+
+    Las llamadas con temperatura mayor que `max_temperature` no se cachean
+    (salidas creativas deben variar entre ejecuciones).
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        memory_size: int = 512,
+        ttl_seconds: float = 86400.0,
+        sqlite_path: Optional[str] = None,
+        max_temperature: float = 0.8
+    ):
+        self.enabled = enabled
+        self.memory_size = max(1, memory_size)
+        self.ttl_seconds = ttl_seconds
+        self.max_temperature = max_temperature
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._sqlite: Optional[_SQLiteTier] = None
+        if enabled and sqlite_path:
+            try:
+                self._sqlite = _SQLiteTier(sqlite_path)
+            except sqlite3.Error as e:
+                print(f"⚠️ No se pudo abrir la caché SQLite ({sqlite_path}): {e}")
+        self.stats = {
+            "memory_hits": 0,
+            "sqlite_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "bypassed": 0,
+        }
+
+    def is_cacheable(self, temperature: float, use_cache: bool = True) -> bool:
+        """Indica si una llamada con estos parámetros puede usar la caché"""
+        cacheable = self.enabled and use_cache and temperature <= self.max_temperature
+        if not cacheable:
+            self.stats["bypassed"] += 1
+        return cacheable
+
+    async def get(self, key: str) -> Optional[str]:
+        """Busca una respuesta (memoria primero, luego SQLite)"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            content, expires_at = entry
+            if expires_at >= time.time():
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                LLM_CACHE_MEMORY_HITS.inc()
+                return content
+            del self._memory[key]
+
+        if self._sqlite is not None:
+            content = await self._sqlite.get(key)
+            if content is not None:
+                self._remember(key, content)
+                self.stats["sqlite_hits"] += 1
+                LLM_CACHE_SQLITE_HITS.inc()
+                return content
+
+        self.stats["misses"] += 1
+        LLM_CACHE_MISSES.inc()
+        return None
+
+    async def set(self, key: str, content: str) -> None:
+        """Guarda una respuesta en ambos niveles"""
+        if not content:
+            return
+        self._remember(key, content)
+        self.stats["stores"] += 1
+        if self._sqlite is not None:
+            await self._sqlite.set(key, content, self.ttl_seconds)
+
+    def _remember(self, key: str, content: str) -> None:
+        self._memory[key] = (content, time.time() + self.ttl_seconds)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def close(self) -> None:
+        if self._sqlite is not None:
+            self._sqlite.close()
+            self._sqlite = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.stats["memory_hits"] + self.stats["sqlite_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_size": self.memory_size,
+            "sqlite_enabled": self._sqlite is not None,
+        }
+
+
+# Caché global de respuestas
+llm_cache = LLMResponseCache(
+    enabled=LLM_CACHE_ENABLED,
+    memory_size=LLM_CACHE_MEMORY_SIZE,
+    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+    sqlite_path=LLM_CACHE_SQLITE_PATH,
+    max_temperature=LLM_CACHE_MAX_TEMPERATURE,
+)
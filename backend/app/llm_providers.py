@@ -1,11 +1,41 @@
 """
 Proveedores de LLM para ATP v1.0.1
 Usa OpenAI SDK directamente - compatible con múltiples proveedores
+
+Las llamadas usan `AsyncOpenAI` a través de un pool de clientes compartido,
+de modo que una respuesta lenta no bloquea el event loop y las conexiones
+HTTP keep-alive se reutilizan entre agentes y requests.
 """
 import os
-from openai import OpenAI
-from typing import Optional, Dict, Any, List
-from app.config import MODELS, GROQ_API_KEY
+import time
+import hashlib
+from collections import OrderedDict
+from contextlib import AsyncExitStack, asynccontextmanager
+import asyncio
+from openai import (
+    OpenAI,
+    AsyncOpenAI,
+    RateLimitError,
+    APIConnectionError,
+    InternalServerError,
+)
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+from app.config import (
+    MODELS,
+    GROQ_API_KEY,
+    LLM_CLIENT_POOL_SIZE,
+    LLM_CLIENT_IDLE_SECONDS,
+    LLM_MAX_RETRIES,
+)
+from app.llm_cache import llm_cache, make_cache_key
+from app.metrics import metrics, provider_metrics
+from app.governor import llm_governor
+from app.rate_limiter import (
+    ProviderRateLimiter,
+    rate_limiters,
+    estimate_tokens,
+    get_retry_after,
+)
 
 # Configuración de proveedores con sus endpoints y modelos por defecto
 PROVIDERS = {
@@ -40,10 +70,17 @@ PROVIDERS = {
 }
 
 
-def get_openai_client(api_config: Dict[str, Any] = None) -> tuple[OpenAI, str]:
+# Etiqueta de los proveedores fuera de PROVIDERS
+CUSTOM_PROVIDER = "custom"
+
+
+def _resolve_provider(api_config: Dict[str, Any] = None) -> Tuple[str, str, str, str]:
     """
-    Obtiene un cliente OpenAI configurado y el modelo a usar.
-    Retorna (client, model_name)
+    Resuelve el proveedor a usar.
+    Retorna (provider, api_key, base_url, default_model)
+    
+    Los tipos desconocidos se etiquetan como CUSTOM_PROVIDER: el tipo lo
+    envía el cliente y no debe crear etiquetas de métricas ni límites nuevos.
     """
     if api_config and api_config.get("api_key"):
         api_type = api_config.get("type", "openai")
@@ -52,42 +89,355 @@ def get_openai_client(api_config: Dict[str, Any] = None) -> tuple[OpenAI, str]:
         
         provider_config = PROVIDERS.get(api_type, PROVIDERS["openai"])
         base_url = custom_base_url or provider_config["base_url"]
-        model = provider_config["model"]
-        
-        client = OpenAI(api_key=api_key, base_url=base_url)
-        return client, model
+        provider = api_type if api_type in PROVIDERS else CUSTOM_PROVIDER
+        return provider, api_key, base_url, provider_config["model"]
     
     # Fallback a variables de entorno (solo Groq)
     if GROQ_API_KEY:
-        client = OpenAI(api_key=GROQ_API_KEY, base_url="https://api.groq.com/openai/v1")
-        return client, "llama-3.3-70b-versatile"
+        return "groq", GROQ_API_KEY, PROVIDERS["groq"]["base_url"], "llama-3.3-70b-versatile"
     else:
         raise ValueError("No API key configured. Please add your API key in Settings.")
 
 
+def get_openai_client(api_config: Dict[str, Any] = None) -> tuple[OpenAI, str]:
+    """
+    Obtiene un cliente OpenAI (síncrono) configurado y el modelo a usar.
+    Retorna (client, model_name)
+    """
+    _, api_key, base_url, model = _resolve_provider(api_config)
+    client = OpenAI(api_key=api_key, base_url=base_url)
+    return client, model
+
+
+def _hash_api_key(api_key: str) -> str:
+    """Hash corto de la API key para usarla como clave sin guardarla en claro"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class _PooledClient:
+    """Entrada del pool: cliente asíncrono más datos de uso"""
+    
+    __slots__ = ("client", "last_used", "in_use", "retired")
+    
+    def __init__(self, client: AsyncOpenAI):
+        self.client = client
+        self.last_used = time.monotonic()
+        self.in_use = 0
+        self.retired = False
+
+
+class AsyncClientPool:
+    """
+    Pool de clientes `AsyncOpenAI` compartidos por todo el proceso.
+    
+    - Clave: (provider, base_url, hash de la API key)
+    - Tamaño acotado con desalojo LRU
+    - Desalojo de clientes inactivos tras `idle_seconds`
+    
+    Un cliente desalojado mientras tiene llamadas en curso se marca como
+    retirado y se cierra cuando termina su última llamada.
+    """
+    
+    def __init__(self, max_size: int = 32, idle_seconds: float = 300.0):
+        self.max_size = max(1, max_size)
+        self.idle_seconds = idle_seconds
+        self._clients: "OrderedDict[Tuple[str, str, str], _PooledClient]" = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+        }
+    
+    def _evict(self, key: Tuple[str, str, str], to_close: List[AsyncOpenAI]) -> None:
+        """Saca una entrada del pool; se cierra ahora o al liberarse"""
+        entry = self._clients.pop(key)
+        entry.retired = True
+        self.stats["evictions"] += 1
+        if entry.in_use == 0:
+            to_close.append(entry.client)
+    
+    def _acquire(
+        self,
+        provider: str,
+        base_url: str,
+        api_key: str,
+        to_close: List[AsyncOpenAI]
+    ) -> _PooledClient:
+        """Obtiene (o crea) la entrada del pool para la configuración dada"""
+        now = time.monotonic()
+        
+        # Desalojar clientes inactivos
+        idle_keys = [
+            key for key, entry in self._clients.items()
+            if entry.in_use == 0 and now - entry.last_used > self.idle_seconds
+        ]
+        for key in idle_keys:
+            self._evict(key, to_close)
+        
+        key = (provider, base_url, _hash_api_key(api_key))
+        entry = self._clients.get(key)
+        if entry is not None:
+            self._clients.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+        
+        self.stats["misses"] += 1
+        # Los reintentos los gestiona _completion junto al rate limiter
+        entry = _PooledClient(AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0))
+        self._clients[key] = entry
+        
+        # Respetar el tamaño máximo (LRU)
+        while len(self._clients) > self.max_size:
+            oldest_key = next(iter(self._clients))
+            self._evict(oldest_key, to_close)
+        
+        return entry
+    
+    @asynccontextmanager
+    async def lease(self, provider: str, base_url: str, api_key: str) -> AsyncIterator[AsyncOpenAI]:
+        """Presta un cliente del pool durante una llamada"""
+        to_close: List[AsyncOpenAI] = []
+        entry = self._acquire(provider, base_url, api_key, to_close)
+        for client in to_close:
+            await client.close()
+        
+        entry.in_use += 1
+        try:
+            yield entry.client
+        finally:
+            entry.in_use -= 1
+            entry.last_used = time.monotonic()
+            if entry.retired and entry.in_use == 0:
+                await entry.client.close()
+    
+    async def aclose(self) -> None:
+        """Cierra todos los clientes del pool"""
+        entries = list(self._clients.values())
+        self._clients.clear()
+        for entry in entries:
+            entry.retired = True
+            if entry.in_use == 0:
+                await entry.client.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas del pool"""
+        return {
+            **self.stats,
+            "size": len(self._clients),
+            "max_size": self.max_size,
+            "in_use": sum(entry.in_use for entry in self._clients.values()),
+        }
+
+
+# Pool global de clientes asíncronos
+client_pool = AsyncClientPool(
+    max_size=LLM_CLIENT_POOL_SIZE,
+    idle_seconds=LLM_CLIENT_IDLE_SECONDS,
+)
+
+
+@asynccontextmanager
+async def _completion(
+    provider: str,
+    base_url: str,
+    api_key: str,
+    key_hash: str,
+    limiter: Optional[ProviderRateLimiter],
+    estimated_tokens: int,
+    **params
+) -> AsyncIterator[Any]:
+    """
+    Crea una completion respetando el rate limiter del proveedor.
+    
+    Produce la respuesta (o el stream) con el hueco del governor y el
+    cliente del pool tomados; ambos se liberan al salir del bloque.
+    
+    - Espera cuota (RPM/TPM) antes de cada intento, ya con el hueco: el
+      orden en que se reparte la cuota es el de la cola con prioridad del
+      governor, no el de llegada
+    - Sincroniza el limitador con las cabeceras x-ratelimit-*
+    - Ante HTTP 429 bloquea el limitador (Retry-After) y reintenta
+    - Reintenta errores transitorios con backoff exponencial
+    
+    Las esperas entre intentos (429 y backoff) se hacen sin el hueco ni el
+    cliente, para que otras llamadas de la misma key puedan usarlos.
+    """
+    attempt = 0
+    while True:
+        delay = 0.0
+        async with AsyncExitStack() as stack:
+            # Hueco de concurrencia compartido por todo el proceso para esta key
+            await stack.enter_async_context(llm_governor.slot(provider, key_hash))
+            if limiter is not None:
+                await limiter.acquire(estimated_tokens)
+            client = await stack.enter_async_context(client_pool.lease(provider, base_url, api_key))
+            try:
+                raw = await client.chat.completions.with_raw_response.create(**params)
+            except RateLimitError as e:
+                provider_metrics(provider).rate_limited.inc()
+                if limiter is None or attempt >= LLM_MAX_RETRIES:
+                    raise
+                # El limitador queda bloqueado para el resto de llamadas de la key
+                delay = limiter.on_rate_limited(get_retry_after(e.response.headers), attempt)
+                print(f"⏳ Rate limit (429) en {provider}, reintento en {delay:.1f}s")
+            except (APIConnectionError, InternalServerError) as e:
+                if attempt >= LLM_MAX_RETRIES:
+                    raise
+                delay = min(2 ** attempt, 30)
+                print(f"⚠️ Error transitorio en {provider} ({type(e).__name__}), reintento en {delay}s")
+            else:
+                if limiter is not None:
+                    limiter.update_from_headers(raw.headers)
+                yield raw.parse()
+                return
+        
+        attempt += 1
+        if delay:
+            await asyncio.sleep(delay)
+
+
 async def chat_completion(
     messages: List[Dict[str, str]], 
     model: str = None,
     api_config: Dict[str, Any] = None,
     temperature: float = 0.7,
-    max_tokens: int = 4096
+    max_tokens: int = 4096,
+    use_cache: bool = True
 ) -> str:
     """
     Ejecuta una llamada de chat completion y retorna el contenido.
+    
+    Las respuestas se sirven desde la caché si la petición normalizada ya
+    se resolvió antes (`use_cache=False` para desactivarlo por llamada).
     """
-    client, default_model = get_openai_client(api_config)
+    provider, api_key, base_url, default_model = _resolve_provider(api_config)
     
     # Usar el modelo proporcionado o el default
     actual_model = model or default_model
     
-    response = client.chat.completions.create(
-        model=actual_model,
-        messages=messages,
-        temperature=temperature,
-        max_tokens=max_tokens,
-    )
+    key_hash = _hash_api_key(api_key)
+    cache_key = None
+    if llm_cache.is_cacheable(temperature, use_cache):
+        cache_key = make_cache_key(messages, actual_model, base_url, key_hash, temperature, max_tokens)
+        cached = await llm_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    limiter = rate_limiters.get(provider, key_hash)
+    estimated = estimate_tokens(messages, max_tokens)
+    provider_stats = provider_metrics(provider)
+    
+    provider_stats.in_flight.inc()
+    try:
+        with metrics.time("llm_call", label=provider):
+            async with _completion(
+                provider, base_url, api_key, key_hash, limiter, estimated,
+                model=actual_model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            ) as response:
+                pass
+    except asyncio.CancelledError:
+        # Request abandonado: la conexión HTTP con el proveedor se cierra
+        provider_stats.calls_cancelled.inc()
+        raise
+    except Exception:
+        provider_stats.calls_error.inc()
+        raise
+    finally:
+        provider_stats.in_flight.dec()
+    provider_stats.calls_success.inc()
+    
+    if response.usage is not None:
+        provider_stats.prompt_tokens.inc(response.usage.prompt_tokens or 0)
+        provider_stats.completion_tokens.inc(response.usage.completion_tokens or 0)
+        if limiter is not None:
+            limiter.record_usage(estimated, response.usage.total_tokens)
+    
+    content = response.choices[0].message.content
+    if cache_key is not None:
+        await llm_cache.set(cache_key, content)
+    
+    return content
+
+
+async def chat_completion_stream(
+    messages: List[Dict[str, str]], 
+    model: str = None,
+    api_config: Dict[str, Any] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 4096,
+    use_cache: bool = True
+) -> AsyncIterator[str]:
+    """
+    Ejecuta una llamada de chat completion en modo streaming.
+    Produce los fragmentos de contenido a medida que llegan.
+    Un acierto de caché se entrega como un único fragmento.
+    """
+    provider, api_key, base_url, default_model = _resolve_provider(api_config)
+    
+    # Usar el modelo proporcionado o el default
+    actual_model = model or default_model
+    
+    key_hash = _hash_api_key(api_key)
+    cache_key = None
+    if llm_cache.is_cacheable(temperature, use_cache):
+        cache_key = make_cache_key(messages, actual_model, base_url, key_hash, temperature, max_tokens)
+        cached = await llm_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    
+    limiter = rate_limiters.get(provider, key_hash)
+    estimated = estimate_tokens(messages, max_tokens)
+    provider_stats = provider_metrics(provider)
+    parts: List[str] = []
+    
+    provider_stats.in_flight.inc()
+    try:
+        start = time.perf_counter()
+        # El hueco y el cliente se mantienen mientras se consume el stream
+        async with _completion(
+            provider, base_url, api_key, key_hash, limiter, estimated,
+            model=actual_model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        ) as stream:
+            async with stream:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    content = chunk.choices[0].delta.content
+                    if content:
+                        parts.append(content)
+                        yield content
+        # Duración total del stream (incluye el consumo de los fragmentos)
+        metrics.observe("llm_call", (time.perf_counter() - start) * 1000, label=provider)
+    except asyncio.CancelledError:
+        # Request abandonado: la conexión HTTP con el proveedor se cierra
+        provider_stats.calls_cancelled.inc()
+        raise
+    except Exception:
+        provider_stats.calls_error.inc()
+        raise
+    finally:
+        provider_stats.in_flight.dec()
+    provider_stats.calls_success.inc()
+    
+    # Sin `usage` en streaming: estimar el uso real por caracteres
+    output = "".join(parts)
+    prompt_tokens = estimate_tokens(messages, 0)
+    completion_tokens = len(output) // 4
+    provider_stats.prompt_tokens.inc(prompt_tokens)
+    provider_stats.completion_tokens.inc(completion_tokens)
+    if limiter is not None:
+        limiter.record_usage(estimated, prompt_tokens + completion_tokens)
     
-    return response.choices[0].message.content
+    if cache_key is not None:
+        await llm_cache.set(cache_key, output)
 
 
 async def test_connection(api_config: Dict[str, Any] = None) -> bool:
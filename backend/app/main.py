@@ -3,66 +3,36 @@ ATP Backend - FastAPI Server v0.6.6
 Servidor principal para el sistema de agentes ATP con LangGraph y Protocolo A2A
 Sistema de 30 Agentes Especializados - Professional UI/UX
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from contextlib import asynccontextmanager
+import asyncio
 import sys
 import os
+import uuid
 
 # Añadir path del proyecto para imports
 sys.path.insert(0, '/app')
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.config import CORS_ORIGINS, MODELS, HOST, PORT
-from app.models import ChatRequest, ChatResponse, HealthResponse, AgentInfo
+from app.config import CORS_ORIGINS, MODELS, HOST, PORT, DISCONNECT_POLL_SECONDS
+from app.models import ChatRequest, ChatResponse, ResumeRequest, HealthResponse, AgentInfo
 from app.api_models import fetch_available_models, get_model_description
+from app.llm_providers import client_pool
+from app.llm_cache import llm_cache
+from app.metrics import metrics
+from app.jobs import job_manager, QueueFullError
+from app.governor import llm_governor
+from app.checkpoints import checkpoint_owner, checkpoint_store
+from app.a2a_protocol import Priority, a2a_protocol
+from app.streaming import EventChannel, bind_event_channel, format_sse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 
 # Importar nuevo sistema de agentes con LangGraph
-from app.orchestrator import AgentOrchestrator
-from app.agents import (
-    ReasoningAgent, PlanningAgent, ResearchAgent, AnalysisAgent, SynthesisAgent,
-    CriticalThinkingAgent, CodingAgent, DataAgent, WritingAgent, CommunicationAgent,
-    DecisionAgent, ProblemSolvingAgent, LegalAgent, FinancialAgent, CreativeAgent,
-    TechnicalAgent, EducationalAgent, MarketingAgent, QAAgent, DocumentationAgent,
-    OptimizationAgent, SecurityAgent, IntegrationAgent, ReviewAgent, TranslationAgent,
-    SummaryAgent, FormattingAgent, ValidationAgent, CoordinationAgent, ExplanationAgent
-)
-
-# Definiciones de los 30 agentes
-AGENT_DEFINITIONS = {
-    "reasoning": {"name": "Reasoning Agent", "level": 1, "description": "Razonamiento lógico multi-paradigma"},
-    "planning": {"name": "Planning Agent", "level": 1, "description": "Planificación estratégica y gestión de proyectos"},
-    "research": {"name": "Research Agent", "level": 1, "description": "Investigación académica rigurosa"},
-    "analysis": {"name": "Analysis Agent", "level": 1, "description": "Descomposición de problemas complejos"},
-    "synthesis": {"name": "Synthesis Agent", "level": 1, "description": "Integración de conocimiento e insights"},
-    "critical_thinking": {"name": "Critical Thinking Agent", "level": 1, "description": "Evaluación crítica y detección de falacias"},
-    "coding": {"name": "Coding Agent", "level": 2, "description": "Desarrollo de software y arquitectura"},
-    "data": {"name": "Data Agent", "level": 2, "description": "Ciencia de datos y análisis cuantitativo"},
-    "writing": {"name": "Writing Agent", "level": 2, "description": "Escritura profesional y contenido"},
-    "communication": {"name": "Communication Agent", "level": 2, "description": "Comunicación efectiva y resolución de conflictos"},
-    "decision": {"name": "Decision Agent", "level": 2, "description": "Análisis de decisiones y teoría de juegos"},
-    "problem_solving": {"name": "Problem Solving Agent", "level": 2, "description": "Solución creativa con TRIZ y Design Thinking"},
-    "legal": {"name": "Legal Agent", "level": 3, "description": "Análisis legal y cumplimiento normativo"},
-    "financial": {"name": "Financial Agent", "level": 3, "description": "Análisis financiero y valoración"},
-    "creative": {"name": "Creative Agent", "level": 3, "description": "Pensamiento creativo e innovación"},
-    "technical": {"name": "Technical Agent", "level": 3, "description": "Arquitectura técnica y sistemas distribuidos"},
-    "educational": {"name": "Educational Agent", "level": 3, "description": "Pedagogía y diseño instruccional"},
-    "marketing": {"name": "Marketing Agent", "level": 3, "description": "Estrategia de marketing y branding"},
-    "qa": {"name": "QA Agent", "level": 4, "description": "Testing y aseguramiento de calidad"},
-    "documentation": {"name": "Documentation Agent", "level": 4, "description": "Documentación técnica y knowledge management"},
-    "optimization": {"name": "Optimization Agent", "level": 4, "description": "Performance y optimización de procesos"},
-    "security": {"name": "Security Agent", "level": 4, "description": "Seguridad de la información y threat analysis"},
-    "integration": {"name": "Integration Agent", "level": 4, "description": "Integraciones y arquitectura de APIs"},
-    "review": {"name": "Review Agent", "level": 4, "description": "Revisión experta y feedback constructivo"},
-    "translation": {"name": "Translation Agent", "level": 5, "description": "Traducción profesional y localización"},
-    "summary": {"name": "Summary Agent", "level": 5, "description": "Síntesis y resumen de información"},
-    "formatting": {"name": "Formatting Agent", "level": 5, "description": "Formato profesional y presentación visual"},
-    "validation": {"name": "Validation Agent", "level": 5, "description": "Validación de datos y verificación"},
-    "coordination": {"name": "Coordination Agent", "level": 5, "description": "Coordinación de tareas y gestión de flujos"},
-    "explanation": {"name": "Explanation Agent", "level": 5, "description": "Explicaciones claras y comprensibles"},
-}
+from app.orchestrator import AgentOrchestrator, get_orchestration_stats
+from app.agents.registry import AGENT_DEFINITIONS, agent_registry
 
 
 @asynccontextmanager
@@ -73,8 +43,14 @@ async def lifespan(app: FastAPI):
     print(f"🤖 30 Agentes Especializados con LangGraph y Protocolo A2A")
     print(f"🧠 Sistema de Orquestación con StateGraph")
     print(f"🎨 UI/UX Profesional - Grid 2 columnas, Estados mejorados")
+    await checkpoint_store.start()
+    await job_manager.start()
     
     yield
+    await job_manager.stop()
+    await checkpoint_store.stop()
+    await client_pool.aclose()
+    llm_cache.close()
     print("👋 Agentic Task Platform cerrando...")
 
 
@@ -135,6 +111,38 @@ async def get_agent(agent_id: str):
     }
 
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """
+    Histogramas de latencia del proceso (p50/p95/p99)
+    
+    - graph_node: analyze_query, execute_agent(s), synthesize
+    - agent_handle_message: por agente
+    - llm_call: por proveedor
+    - request_total: por resultado (success / error / cancelled)
+    - llm_queue_wait: espera en el gobernador de concurrencia, por proveedor
+    
+    `orchestration` reúne las cachés compartidas por las ejecuciones
+    (grafos compilados, resultados de agentes, digests, checkpoints...) y
+    `a2a` el almacén de conversaciones A2A con su memoria aproximada.
+    """
+    return {
+        **metrics.get_stats(),
+        "llm_governor": llm_governor.get_stats(),
+        "orchestration": get_orchestration_stats(),
+        "a2a": a2a_protocol.get_stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Métricas en formato de exposición de Prometheus"""
+    return PlainTextResponse(
+        metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 @app.get("/api/models")
 async def get_models():
     """Get available models"""
@@ -186,84 +194,156 @@ async def fetch_models(request: FetchModelsRequest):
         }
 
 
+def _validate_chat_request(request: ChatRequest) -> None:
+    """Valida un ChatRequest; lanza HTTPException si no es válido"""
+    if not request.message.strip():
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+    _validate_agents(request.agents)
+
+
+def _validate_agents(agents: List[str]) -> None:
+    """Valida la selección de agentes; lanza HTTPException si no es válida"""
+    if not agents:
+        raise HTTPException(status_code=400, detail="At least one agent must be selected")
+    
+    # Validate agents
+    invalid_agents = [a for a in agents if a not in AGENT_DEFINITIONS]
+    if invalid_agents:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Invalid agents: {invalid_agents}"
+        )
+
+
+def _request_context(request: ChatRequest) -> Dict[str, Any]:
+    """Normaliza el contexto del request (el editor de nodos envía un dict)"""
+    if isinstance(request.context, dict):
+        return request.context
+    if request.context:
+        return {"user_context": request.context}
+    return {}
+
+
+def _job_context(request: ChatRequest) -> Dict[str, Any]:
+    """
+    Contexto de un job: sin prioridad explícita en `a2aMessage.priority`, los
+    jobs corren como BACKGROUND y solo usan la capacidad LLM sobrante.
+    """
+    context = dict(_request_context(request))
+    message_config = context.get("a2aMessage")
+    if not isinstance(message_config, dict):
+        message_config = {}
+    if not message_config.get("priority"):
+        context["a2aMessage"] = {**message_config, "priority": Priority.BACKGROUND.value}
+    return context
+
+
+def _request_api_config(request: ChatRequest) -> Optional[Dict[str, Any]]:
+    """Convierte la ApiConfig del frontend al formato de llm_providers"""
+    if request.apiConfig is None:
+        return None
+    return {
+        "type": request.apiConfig.type,
+        "api_key": request.apiConfig.apiKey,
+        "base_url": request.apiConfig.baseUrl,
+    }
+
+
+def _build_selected_agents(request: ChatRequest) -> List[Any]:
+    """Construye solo las instancias de los agentes seleccionados en el request"""
+    return agent_registry.build(
+        request.agents,
+        model=request.model,
+        api_config=_request_api_config(request),
+    )
+
+
+class ClientDisconnected(Exception):
+    """El cliente cerró la conexión antes de recibir la respuesta"""
+
+
+async def _run_until_disconnected(http_request: Request, coro: Any) -> Any:
+    """
+    Ejecuta `coro` cancelándola si el cliente se desconecta.
+    
+    La cancelación se propaga por el orquestador hasta las llamadas LLM
+    pendientes, que cierran su conexión con el proveedor.
+    """
+    task = asyncio.create_task(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                print("🔌 Cliente desconectado: cancelando ejecución")
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+def _agents_used(request: ChatRequest, selected_agents: List[Any], result: Dict[str, Any]) -> List[str]:
+    """Claves de los agentes ejecutados (el subconjunto elegido si hubo enrutado)"""
+    routing = result.get("routing")
+    if not routing:
+        return request.agents
+    selected = set(routing["selected"])
+    return [agent.agent_key for agent in selected_agents if agent.profile.agent_id in selected]
+
+
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
     """
     Main chat endpoint - processes user messages with selected agents using LangGraph Orchestrator
+    
+    Si el cliente se desconecta, la ejecución se cancela. Con un
+    `conversation_id` propio, una ejecución interrumpida se puede reanudar
+    con POST /api/chat/{conversation_id}/resume (misma API key). Un
+    `conversation_id` con checkpoint de otra API key responde 403.
     """
     try:
         # Validate request
-        if not request.message.strip():
-            raise HTTPException(status_code=400, detail="Message cannot be empty")
-        
-        if not request.agents:
-            raise HTTPException(status_code=400, detail="At least one agent must be selected")
-        
-        # Validate agents
-        invalid_agents = [a for a in request.agents if a not in AGENT_DEFINITIONS]
-        if invalid_agents:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Invalid agents: {invalid_agents}"
-            )
+        _validate_chat_request(request)
         
         # Create orchestrator with selected agents
         orchestrator = AgentOrchestrator()
-        
-        # Map agent IDs to agent instances with model configuration
-        agent_map = {
-            "reasoning": ReasoningAgent(model=request.model, api_config=request.apiConfig),
-            "planning": PlanningAgent(model=request.model, api_config=request.apiConfig),
-            "research": ResearchAgent(model=request.model, api_config=request.apiConfig),
-            "analysis": AnalysisAgent(model=request.model, api_config=request.apiConfig),
-            "synthesis": SynthesisAgent(model=request.model, api_config=request.apiConfig),
-            "critical_thinking": CriticalThinkingAgent(model=request.model, api_config=request.apiConfig),
-            "coding": CodingAgent(model=request.model, api_config=request.apiConfig),
-            "data": DataAgent(model=request.model, api_config=request.apiConfig),
-            "writing": WritingAgent(model=request.model, api_config=request.apiConfig),
-            "communication": CommunicationAgent(model=request.model, api_config=request.apiConfig),
-            "decision": DecisionAgent(model=request.model, api_config=request.apiConfig),
-            "problem_solving": ProblemSolvingAgent(model=request.model, api_config=request.apiConfig),
-            "legal": LegalAgent(model=request.model, api_config=request.apiConfig),
-            "financial": FinancialAgent(model=request.model, api_config=request.apiConfig),
-            "creative": CreativeAgent(model=request.model, api_config=request.apiConfig),
-            "technical": TechnicalAgent(model=request.model, api_config=request.apiConfig),
-            "educational": EducationalAgent(model=request.model, api_config=request.apiConfig),
-            "marketing": MarketingAgent(model=request.model, api_config=request.apiConfig),
-            "qa": QAAgent(model=request.model, api_config=request.apiConfig),
-            "documentation": DocumentationAgent(model=request.model, api_config=request.apiConfig),
-            "optimization": OptimizationAgent(model=request.model, api_config=request.apiConfig),
-            "security": SecurityAgent(model=request.model, api_config=request.apiConfig),
-            "integration": IntegrationAgent(model=request.model, api_config=request.apiConfig),
-            "review": ReviewAgent(model=request.model, api_config=request.apiConfig),
-            "translation": TranslationAgent(model=request.model, api_config=request.apiConfig),
-            "summary": SummaryAgent(model=request.model, api_config=request.apiConfig),
-            "formatting": FormattingAgent(model=request.model, api_config=request.apiConfig),
-            "validation": ValidationAgent(model=request.model, api_config=request.apiConfig),
-            "coordination": CoordinationAgent(model=request.model, api_config=request.apiConfig),
-            "explanation": ExplanationAgent(model=request.model, api_config=request.apiConfig),
-        }
-        
-        # Get selected agent instances
-        selected_agents = [agent_map[agent_id] for agent_id in request.agents if agent_id in agent_map]
+        selected_agents = _build_selected_agents(request)
         
         # Execute task with orchestrator
-        result = await orchestrator.execute(
+        result = await _run_until_disconnected(http_request, orchestrator.execute(
             task=request.message,
             agents=selected_agents,
-            context=request.context or {}
-        )
+            context=_request_context(request),
+            conversation_id=request.conversation_id,
+            owner=checkpoint_owner(_request_api_config(request)),
+        ))
         
         return ChatResponse(
-            success=True,
-            result=result.get("final_result", ""),
-            agents_used=request.agents,
+            success=result.get("success", False),
+            result=result.get("final_result") or "",
+            agents_used=_agents_used(request, selected_agents, result),
             model_used=request.model,
-            error=None,
+            error=result.get("error"),
+            routing=result.get("routing"),
+            conversation_id=result.get("conversation_id"),
         )
         
     except HTTPException:
         raise
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except ClientDisconnected:
+        # Nadie leerá la respuesta
+        return ChatResponse(
+            success=False,
+            result="",
+            agents_used=request.agents,
+            model_used=request.model,
+            error="Client disconnected",
+            conversation_id=request.conversation_id,
+        )
     except Exception as e:
         import traceback
         error_traceback = traceback.format_exc()
@@ -278,6 +358,192 @@ async def chat(request: ChatRequest):
         )
 
 
+@app.post("/api/chat/{conversation_id}/resume", response_model=ChatResponse)
+async def resume_chat(conversation_id: str, request: ResumeRequest, http_request: Request):
+    """
+    Reanuda una ejecución interrumpida desde su último checkpoint
+    
+    Los agentes que ya respondieron no se vuelven a ejecutar. El body lleva
+    los agentes, el modelo y la apiConfig de la ejecución original (las API
+    keys no se guardan en los checkpoints, solo su huella: otra key recibe 404).
+    """
+    _validate_agents(request.agents)
+    
+    orchestrator = AgentOrchestrator()
+    selected_agents = _build_selected_agents(request)
+    
+    try:
+        result = await _run_until_disconnected(
+            http_request, orchestrator.resume(
+                conversation_id, selected_agents, checkpoint_owner(_request_api_config(request))
+            )
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ClientDisconnected:
+        return ChatResponse(
+            success=False,
+            result="",
+            agents_used=request.agents,
+            model_used=request.model,
+            error="Client disconnected",
+            conversation_id=conversation_id,
+        )
+    
+    return ChatResponse(
+        success=result.get("success", False),
+        result=result.get("final_result") or "",
+        agents_used=_agents_used(request, selected_agents, result),
+        model_used=request.model,
+        error=result.get("error"),
+        routing=result.get("routing"),
+        conversation_id=conversation_id,
+    )
+
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming chat endpoint (Server-Sent Events)
+    
+    Eventos emitidos:
+    - run_started: ID de la ejecución ({conversation_id}), para reanudarla
+    - agent_started / agent_completed: progreso de cada agente
+    - token: fragmento generado por un agente ({agent_id, content})
+    - agent_retry: el agente se reintenta ({agent_id, attempt, max_retries,
+      error}); el cliente descarta los `token` ya recibidos de ese agente
+    - final: resultado sintetizado
+    - error: error durante la ejecución
+    """
+    _validate_chat_request(request)
+    
+    orchestrator = AgentOrchestrator()
+    selected_agents = _build_selected_agents(request)
+    channel = EventChannel()
+    
+    async def run() -> None:
+        bind_event_channel(channel)
+        try:
+            result = await orchestrator.execute(
+                task=request.message,
+                agents=selected_agents,
+                context=_request_context(request),
+                conversation_id=request.conversation_id,
+                owner=checkpoint_owner(_request_api_config(request)),
+            )
+            if result.get("success"):
+                channel.emit("final", {
+                    "success": True,
+                    "result": result.get("final_result", ""),
+                    "agents_used": _agents_used(request, selected_agents, result),
+                    "model_used": request.model,
+                    "routing": result.get("routing"),
+                    "agents_reused": result.get("agents_reused", []),
+                    "conversation_id": result.get("conversation_id"),
+                    "processing_time_ms": result.get("processing_time_ms"),
+                })
+            else:
+                channel.emit("error", {"error": result.get("error")})
+        except Exception as e:
+            print(f"❌ ERROR EN /api/chat/stream: {str(e)}")
+            channel.emit("error", {"error": str(e)})
+        finally:
+            channel.close()
+    
+    async def event_stream():
+        task = asyncio.create_task(run())
+        try:
+            async for event, data in channel.events():
+                yield format_sse(event, data)
+        finally:
+            # Cliente desconectado: cancelar la ejecución y esperar a que
+            # termine de liberar sus recursos (como `_run_until_disconnected`)
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/jobs", status_code=202)
+async def create_job(request: ChatRequest):
+    """
+    Encola una ejecución del orquestador y retorna el ID del job
+    
+    Para ejecuciones largas: el resultado se consulta con GET /api/jobs/{id}
+    sin mantener abierta la conexión HTTP. Sin `a2aMessage.priority` en el
+    contexto, el job corre con prioridad BACKGROUND. Si el proceso se
+    reinicia, el `conversation_id` devuelto permite reanudar la ejecución.
+    """
+    _validate_chat_request(request)
+    
+    orchestrator = AgentOrchestrator()
+    selected_agents = _build_selected_agents(request)
+    context = _job_context(request)
+    conversation_id = request.conversation_id or str(uuid.uuid4())
+    
+    async def run() -> Dict[str, Any]:
+        result = await orchestrator.execute(
+            task=request.message,
+            agents=selected_agents,
+            context=context,
+            conversation_id=conversation_id,
+            owner=checkpoint_owner(_request_api_config(request)),
+        )
+        return {
+            "success": result.get("success", False),
+            "result": result.get("final_result") or "",
+            "agents_used": _agents_used(request, selected_agents, result),
+            "agents_timed_out": result.get("agents_timed_out", []),
+            "agents_reused": result.get("agents_reused", []),
+            "agents_failed": result.get("agents_failed", {}),
+            "model_used": request.model,
+            "conversation_id": result.get("conversation_id"),
+            "processing_time_ms": result.get("processing_time_ms"),
+            "routing": result.get("routing"),
+            "error": result.get("error"),
+        }
+    
+    try:
+        job = job_manager.submit(run, metadata={
+            "agents": request.agents,
+            "model": request.model,
+            "conversation_id": conversation_id,
+        })
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    
+    return {"job_id": job.job_id, "status": job.status.value, "conversation_id": conversation_id}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Estado, progreso, resultados parciales y resultado final de un job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancela un job encolado o en curso"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return {
+        "job_id": job.job_id,
+        "status": job.status.value,
+        "cancel_requested": job.cancel_requested,
+    }
+
+
 @app.post("/api/quick-chat")
 async def quick_chat(message: str, model: str = "gpt-4"):
     """
@@ -287,12 +553,7 @@ async def quick_chat(message: str, model: str = "gpt-4"):
     
     orchestrator = AgentOrchestrator()
     
-    agent_map = {
-        "reasoning": ReasoningAgent(),
-        "synthesis": SynthesisAgent(),
-    }
-    
-    selected_agents = [agent_map[agent_id] for agent_id in default_agents]
+    selected_agents = agent_registry.build(default_agents)
     
     result = await orchestrator.execute(
         task=message,
@@ -311,6 +572,7 @@ async def quick_chat(message: str, model: str = "gpt-4"):
 # El sistema ATP v0.6.1 usa 30 agentes especializados con LangGraph
 # Los endpoints principales son:
 # - /api/chat: Chat con agentes seleccionados
+# - /api/chat/stream: Chat con tokens en streaming (SSE)
 # - /api/quick-chat: Chat rápido con agentes por defecto
 # - /api/agents: Listar todos los agentes
 # - /api/models: Listar modelos disponibles
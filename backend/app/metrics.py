@@ -0,0 +1,382 @@
+"""
+Metrics - ATP
+Registro de métricas del proceso: histogramas, contadores y gauges
+
+Cada histograma usa buckets fijos con crecimiento geométrico (~10%), de
+modo que registrar una observación es O(log n) y sin asignaciones, y los
+percentiles (p50/p95/p99) se estiman con un error relativo acotado por el
+ancho del bucket. Los histogramas se identifican por nombre y etiqueta
+(p. ej. `agent_handle_message` / `security_specialist_001`).
+
+Contadores y gauges siguen el modelo de Prometheus: cada combinación de
+etiquetas es un hijo creado una vez (`labels(...)`) que el código caliente
+guarda y actualiza con una suma, sin locks (el event loop es de un solo
+hilo). `render_prometheus` produce el formato de texto de exposición.
+"""
+from typing import Dict, Any, List, Optional, Tuple, Iterator
+from bisect import bisect_left
+from contextlib import contextmanager
+import time
+
+
+# Límites (ms) exportados a Prometheus como `le`; se incluyen de forma exacta
+# entre los buckets finos para que los conteos acumulados sean exactos
+EXPORT_BOUNDS_MS = (
+    5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0,
+    5000.0, 10000.0, 30000.0, 60000.0, 120000.0, 300000.0, 600000.0,
+)
+
+
+def _latency_bounds(start_ms: float = 0.1, end_ms: float = 600_000.0, growth: float = 1.1) -> List[float]:
+    """Límites superiores de los buckets (ms), de `start_ms` a `end_ms`"""
+    bounds = set(EXPORT_BOUNDS_MS)
+    bound = start_ms
+    while bound < end_ms:
+        bounds.add(round(bound, 4))
+        bound *= growth
+    bounds.add(end_ms)
+    return sorted(bounds)
+
+
+LATENCY_BOUNDS_MS = _latency_bounds()
+_EXPORT_INDEXES = [LATENCY_BOUNDS_MS.index(bound) for bound in EXPORT_BOUNDS_MS]
+
+
+class Histogram:
+    """Histograma de latencias con buckets fijos"""
+
+    __slots__ = ("bounds", "counts", "count", "total", "min", "max")
+
+    def __init__(self, bounds: List[float] = LATENCY_BOUNDS_MS):
+        self.bounds = bounds
+        # Último bucket: desbordamiento (> bounds[-1])
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        """Registra una observación en milisegundos"""
+        self.counts[bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms < self.min:
+            self.min = value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def percentile(self, q: float) -> float:
+        """Estima el percentil `q` (0-1) interpolando dentro del bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if not bucket_count or cumulative + bucket_count < rank:
+                cumulative += bucket_count
+                continue
+            lower = self.bounds[index - 1] if index > 0 else 0.0
+            upper = self.bounds[index] if index < len(self.bounds) else self.max
+            fraction = (rank - cumulative) / bucket_count
+            estimate = lower + (upper - lower) * fraction
+            return min(max(estimate, self.min), self.max)
+        return self.max
+
+    def export_buckets(self) -> List[Tuple[float, int]]:
+        """Conteos acumulados en los límites de EXPORT_BOUNDS_MS"""
+        buckets = []
+        cumulative = 0
+        start = 0
+        for bound, index in zip(EXPORT_BOUNDS_MS, _EXPORT_INDEXES):
+            cumulative += sum(self.counts[start:index + 1])
+            start = index + 1
+            buckets.append((bound, cumulative))
+        return buckets
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "min_ms": round(self.min, 3) if self.count else 0.0,
+            "max_ms": round(self.max, 3),
+            "p50_ms": round(self.percentile(0.50), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+        }
+
+
+class _CounterChild:
+    """Valor de un contador para una combinación de etiquetas"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild:
+    """Valor de un gauge para una combinación de etiquetas"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _LabeledMetric:
+    """Métrica con etiquetas: un hijo por combinación de valores"""
+
+    kind = "untyped"
+    child_class = _CounterChild
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        if not labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values: str) -> Any:
+        """Obtiene (o crea) el hijo; guardarlo evita la búsqueda por llamada"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self.child_class()
+        return child
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def children(self) -> Iterator[Tuple[Tuple[str, ...], Any]]:
+        return iter(list(self._children.items()))
+
+
+class Counter(_LabeledMetric):
+    kind = "counter"
+    child_class = _CounterChild
+
+
+class Gauge(_LabeledMetric):
+    kind = "gauge"
+    child_class = _GaugeChild
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+_LE_INF = 'le="+Inf"'
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """
+    Registro global de métricas.
+
+    - Histogramas de latencia (nombre -> etiqueta -> histograma)
+    - Contadores y gauges con etiquetas (formato Prometheus)
+
+    Uso:
+        with metrics.time("synthesize"):
+            ...
+        metrics.observe("agent_handle_message", elapsed_ms, label=agent_id)
+        REQUESTS.labels("success").inc()
+    """
+
+    def __init__(self):
+        self._histograms: Dict[str, Dict[str, Histogram]] = {}
+        self._histogram_info: Dict[str, Tuple[str, str]] = {}
+        self._metrics: Dict[str, _LabeledMetric] = {}
+        self.started_at = time.time()
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def _register(self, metric: _LabeledMetric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def describe_histogram(self, name: str, help_text: str, label_name: str) -> None:
+        """Texto de ayuda y nombre de la etiqueta de un histograma (Prometheus)"""
+        self._histogram_info[name] = (help_text, label_name)
+
+    def histogram(self, name: str, label: Optional[str] = None) -> Histogram:
+        """Obtiene (o crea) el histograma de `name` / `label`"""
+        children = self._histograms.get(name)
+        if children is None:
+            children = self._histograms[name] = {}
+        key = label or "all"
+        histogram = children.get(key)
+        if histogram is None:
+            histogram = children[key] = Histogram()
+        return histogram
+
+    def observe(self, name: str, value_ms: float, label: Optional[str] = None) -> None:
+        self.histogram(name, label).observe(value_ms)
+
+    @contextmanager
+    def time(self, name: str, label: Optional[str] = None) -> Iterator[None]:
+        """Mide la duración del bloque (también dentro de corrutinas)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000, label)
+
+    def items(self) -> Iterator[Tuple[str, str, Histogram]]:
+        for name, children in self._histograms.items():
+            for label, histogram in children.items():
+                yield name, label, histogram
+
+    def reset(self) -> None:
+        """Vacía los histogramas (contadores y gauges se conservan)"""
+        self._histograms.clear()
+        self.started_at = time.time()
+
+    def render_prometheus(self, prefix: str = "atp_") -> str:
+        """Formato de texto de exposición de Prometheus (versión 0.0.4)"""
+        lines: List[str] = []
+
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for values, child in metric.children():
+                lines.append(f"{metric.name}{_format_labels(metric.labelnames, values)} {child.value:g}")
+
+        for name, children in list(self._histograms.items()):
+            help_text, label_name = self._histogram_info.get(name, (name, "label"))
+            metric_name = f"{prefix}{name}_seconds"
+            lines.append(f"# HELP {metric_name} {help_text}")
+            lines.append(f"# TYPE {metric_name} histogram")
+            for label, histogram in list(children.items()):
+                names, values = (label_name,), (label,)
+                for bound, cumulative in histogram.export_buckets():
+                    le = f'le="{bound / 1000:g}"'
+                    lines.append(f"{metric_name}_bucket{_format_labels(names, values, le)} {cumulative}")
+                lines.append(f"{metric_name}_bucket{_format_labels(names, values, _LE_INF)} {histogram.count}")
+                lines.append(f"{metric_name}_sum{_format_labels(names, values)} {histogram.total / 1000:g}")
+                lines.append(f"{metric_name}_count{_format_labels(names, values)} {histogram.count}")
+
+        lines.append(f"# HELP {prefix}uptime_seconds Segundos desde el arranque del proceso")
+        lines.append(f"# TYPE {prefix}uptime_seconds gauge")
+        lines.append(f"{prefix}uptime_seconds {time.time() - self.started_at:.1f}")
+        return "\n".join(lines) + "\n"
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "histograms": {
+                name: {label: histogram.snapshot() for label, histogram in children.items()}
+                for name, children in self._histograms.items()
+            },
+            "counters": {
+                name: {
+                    ",".join(values) or "all": child.value
+                    for values, child in metric.children()
+                }
+                for name, metric in self._metrics.items()
+            },
+        }
+
+
+# Registro global de métricas
+metrics = MetricsRegistry()
+
+metrics.describe_histogram("graph_node", "Duración de cada nodo del grafo LangGraph", "node")
+metrics.describe_histogram("agent_handle_message", "Duración de handle_message por agente", "agent")
+metrics.describe_histogram("llm_call", "Duración de las llamadas LLM por proveedor", "provider")
+metrics.describe_histogram("llm_queue_wait", "Espera en cola del gobernador de concurrencia", "provider")
+metrics.describe_histogram("request_total", "Duración total de cada ejecución del orquestador", "outcome")
+
+# Instrumentos del proceso
+REQUESTS = metrics.counter(
+    "atp_requests_total", "Ejecuciones del orquestador por resultado", ("outcome",)
+)
+REQUESTS_IN_FLIGHT = metrics.gauge(
+    "atp_requests_in_flight", "Ejecuciones del orquestador en curso"
+)
+AGENT_EXECUTIONS = metrics.counter(
+    "atp_agent_executions_total", "Ejecuciones de agentes por resultado", ("agent", "outcome")
+)
+LLM_CALLS = metrics.counter(
+    "atp_llm_calls_total", "Llamadas LLM por proveedor y resultado", ("provider", "outcome")
+)
+LLM_TOKENS = metrics.counter(
+    "atp_llm_tokens_total", "Tokens consumidos por proveedor (prompt / completion)", ("provider", "kind")
+)
+LLM_RATE_LIMITED = metrics.counter(
+    "atp_llm_rate_limited_total", "Respuestas HTTP 429 por proveedor", ("provider",)
+)
+LLM_IN_FLIGHT = metrics.gauge(
+    "atp_llm_in_flight", "Llamadas LLM en curso por proveedor (incluye las que esperan en cola)", ("provider",)
+)
+LLM_QUEUE_DEPTH = metrics.gauge(
+    "atp_llm_queue_depth", "Llamadas LLM en cola esperando hueco por proveedor", ("provider",)
+)
+LLM_CACHE_LOOKUPS = metrics.counter(
+    "atp_llm_cache_lookups_total", "Búsquedas en la caché LLM por resultado", ("result",)
+)
+
+REQUESTS_SUCCESS = REQUESTS.labels("success")
+REQUESTS_ERROR = REQUESTS.labels("error")
+REQUESTS_CANCELLED = REQUESTS.labels("cancelled")
+LLM_CACHE_MEMORY_HITS = LLM_CACHE_LOOKUPS.labels("memory_hit")
+LLM_CACHE_SQLITE_HITS = LLM_CACHE_LOOKUPS.labels("sqlite_hit")
+LLM_CACHE_MISSES = LLM_CACHE_LOOKUPS.labels("miss")
+
+
+class ProviderMetrics:
+    """Hijos pre-creados de las métricas de un proveedor LLM"""
+
+    __slots__ = ("calls_success", "calls_error", "calls_cancelled", "prompt_tokens",
+                 "completion_tokens", "rate_limited", "in_flight", "queued")
+
+    def __init__(self, provider: str):
+        self.calls_success = LLM_CALLS.labels(provider, "success")
+        self.calls_error = LLM_CALLS.labels(provider, "error")
+        self.calls_cancelled = LLM_CALLS.labels(provider, "cancelled")
+        self.prompt_tokens = LLM_TOKENS.labels(provider, "prompt")
+        self.completion_tokens = LLM_TOKENS.labels(provider, "completion")
+        self.rate_limited = LLM_RATE_LIMITED.labels(provider)
+        self.in_flight = LLM_IN_FLIGHT.labels(provider)
+        self.queued = LLM_QUEUE_DEPTH.labels(provider)
+
+
+_provider_metrics: Dict[str, ProviderMetrics] = {}
+
+
+def provider_metrics(provider: str) -> ProviderMetrics:
+    """Métricas de un proveedor (creadas en su primera llamada)"""
+    children = _provider_metrics.get(provider)
+    if children is None:
+        children = _provider_metrics[provider] = ProviderMetrics(provider)
+    return children
@@ -2,7 +2,7 @@
 Modelos Pydantic para el API
 """
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Dict, Any, Union
 from enum import Enum
 
 
@@ -27,7 +27,16 @@ class ChatRequest(BaseModel):
     message: str
     agents: List[str]
     model: str = "deepseek"
-    context: Optional[str] = None
+    context: Optional[Union[Dict[str, Any], str]] = None
+    apiConfig: Optional[ApiConfig] = None
+    # ID de la ejecución (opcional); permite reanudarla si se interrumpe
+    conversation_id: Optional[str] = None
+
+
+class ResumeRequest(BaseModel):
+    """Agentes y modelo de la ejecución original que se reanuda"""
+    agents: List[str]
+    model: str = "deepseek"
     apiConfig: Optional[ApiConfig] = None
 
 
@@ -37,6 +46,8 @@ class ChatResponse(BaseModel):
     agents_used: List[str]
     model_used: str
     error: Optional[str] = None
+    routing: Optional[Dict[str, Any]] = None
+    conversation_id: Optional[str] = None
 
 
 class AgentInfo(BaseModel):
@@ -14,14 +14,22 @@ Arquitectura:
 
 Diseñado para escalabilidad y mantenibilidad.
 """
-from typing import Dict, Any, List, Optional, TypedDict
+from typing import Dict, Any, List, Optional, Tuple, TypedDict, Callable, Union, Annotated
+from collections import OrderedDict
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send
 from datetime import datetime
+import asyncio
+import math
+import operator
+import random
+import time
 import uuid
 
 from app.a2a_protocol import (
-    A2AMessage,
-    A2AResponse,
+    A2AMessageRecord,
+    A2AResponseRecord,
     AgentCapability,
     AgentProfile,
     MessageType,
@@ -29,6 +37,38 @@ from app.a2a_protocol import (
     a2a_protocol,
     AgentStatus,
 )
+from app.config import (
+    MAX_PARALLEL_AGENTS,
+    ROUTER_TOP_K,
+    ROUTER_MIN_SCORE,
+    GRAPH_CACHE_SIZE,
+    AGENT_TIMEOUT_SECONDS,
+    AGENT_TIMEOUT_MIN_SECONDS,
+    AGENT_MAX_RETRIES,
+    AGENT_RETRY_BASE_DELAY,
+)
+from app.streaming import emit_event
+from app.result_digest import build_digest, extract_result_text, result_digests
+from app.query_router import query_router
+from app.governor import bind_request_id, reset_request_id, bind_priority, reset_priority
+from app.checkpoints import checkpoint_store
+from app.incremental import agent_result_cache, fingerprint_agent_inputs
+from app.synthesis import synthesis_engine
+from app.metrics import (
+    metrics,
+    AGENT_EXECUTIONS,
+    REQUESTS_CANCELLED,
+    REQUESTS_ERROR,
+    REQUESTS_IN_FLIGHT,
+    REQUESTS_SUCCESS,
+)
+
+
+def merge_dicts(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    """Reducer de LangGraph: combina las actualizaciones de ramas paralelas"""
+    if not right:
+        return left
+    return {**left, **right}
 
 
 class AgentState(TypedDict):
@@ -37,25 +77,33 @@ class AgentState(TypedDict):
     
     Todos los agentes se comunican SOLO a través de A2A Protocol.
     El estado mantiene el historial de mensajes A2A y coordina el flujo.
+    
+    Los campos con reducer (`Annotated`) acumulan las actualizaciones
+    parciales que devuelven los nodos, incluidas las ramas paralelas.
     """
     # Input original del usuario
     user_query: str
     context: Dict[str, Any]
     
     # Comunicación A2A (capa aislada)
-    a2a_messages: List[A2AMessage]
-    a2a_responses: List[A2AResponse]
+    a2a_messages: Annotated[List[A2AMessageRecord], operator.add]
+    a2a_responses: Annotated[List[A2AResponseRecord], operator.add]
     
     # Control de flujo LangGraph
     current_step: str
     next_agent: Optional[str]
     agents_to_execute: List[str]
-    agents_completed: List[str]
+    agents_completed: Annotated[List[str], operator.add]
+    agents_timed_out: Annotated[List[str], operator.add]
+    agents_failed: Annotated[Dict[str, str], merge_dicts]
     
     # Resultados
-    intermediate_results: Dict[str, Any]
+    intermediate_results: Annotated[Dict[str, Any], merge_dicts]
     final_result: Optional[str]
     
+    # Enrutado automático (subconjunto elegido y puntuaciones)
+    routing: Optional[Dict[str, Any]]
+    
     # Metadata
     conversation_id: str
     start_time: datetime
@@ -63,6 +111,101 @@ class AgentState(TypedDict):
     error: Optional[str]
 
 
+class AgentBranchState(TypedDict):
+    """Entrada de una rama paralela (Send) que ejecuta un único agente"""
+    agent_id: str
+    user_query: str
+    context: Dict[str, Any]
+    conversation_id: str
+    intermediate_results: Dict[str, Any]
+
+
+class CompiledGraphCache:
+    """
+    Caché de grafos LangGraph compilados, compartida por todo el proceso.
+    
+    Los grafos se indexan por su forma (estructura de nodos y aristas), no
+    por la instancia del orquestador: los nodos obtienen el orquestador del
+    `config` de cada ejecución. Tamaño acotado con desalojo LRU.
+    """
+    
+    def __init__(self, max_size: int = 8):
+        self.max_size = max(1, max_size)
+        self._graphs: "OrderedDict[Tuple[Any, ...], Any]" = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "compile_time_ms_total": 0.0,
+            "time_saved_ms": 0.0,
+        }
+    
+    def get_or_compile(self, key: Tuple[Any, ...], builder: Callable[[], Any]) -> Any:
+        """Retorna el grafo compilado para `key`, compilándolo si no existe"""
+        graph = self._graphs.get(key)
+        if graph is not None:
+            self._graphs.move_to_end(key)
+            self.stats["hits"] += 1
+            # Tiempo ahorrado estimado: compilación media evitada
+            self.stats["time_saved_ms"] += (
+                self.stats["compile_time_ms_total"] / self.stats["misses"]
+            )
+            return graph
+        
+        start = time.perf_counter()
+        graph = builder()
+        self.stats["compile_time_ms_total"] += (time.perf_counter() - start) * 1000
+        self.stats["misses"] += 1
+        
+        self._graphs[key] = graph
+        while len(self._graphs) > self.max_size:
+            self._graphs.popitem(last=False)
+            self.stats["evictions"] += 1
+        
+        return graph
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de la caché"""
+        return {**self.stats, "size": len(self._graphs), "max_size": self.max_size}
+
+
+# Caché global de grafos compilados
+graph_cache = CompiledGraphCache(max_size=GRAPH_CACHE_SIZE)
+
+
+def _orchestrator_from(config: RunnableConfig) -> "AgentOrchestrator":
+    """Obtiene el orquestador de la ejecución actual desde el config"""
+    return config["configurable"]["orchestrator"]
+
+
+async def _analyze_query_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+    with metrics.time("graph_node", label="analyze_query"):
+        return await _orchestrator_from(config)._analyze_query(state)
+
+
+def _dispatch_agents_edge(state: AgentState, config: RunnableConfig) -> Union[str, List[Send]]:
+    return _orchestrator_from(config)._dispatch_agents(state)
+
+
+async def _execute_agents_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+    with metrics.time("graph_node", label="execute_agents"):
+        return await _orchestrator_from(config)._execute_agents(state)
+
+
+async def _execute_agent_node(state: AgentBranchState, config: RunnableConfig) -> Dict[str, Any]:
+    with metrics.time("graph_node", label="execute_agent"):
+        return await _orchestrator_from(config)._execute_agent_branch(state)
+
+
+async def _synthesize_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+    with metrics.time("graph_node", label="synthesize"):
+        return await _orchestrator_from(config)._synthesize_results(state)
+
+
+async def _finalize_node(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+    return await _orchestrator_from(config)._finalize_result(state)
+
+
 class AgentOrchestrator:
     """
     Orquestador Central usando LangGraph + A2A Protocol
@@ -94,14 +237,25 @@ class AgentOrchestrator:
         # Grafo de LangGraph (se construye dinámicamente)
         self.graph = None
         
+        # Límite de concurrencia de las ramas paralelas de la ejecución actual
+        self._branch_semaphore: Optional[asyncio.Semaphore] = None
+        
+        # Agentes ya completados de una ejecución reanudada (ver `resume`)
+        self._resumed_results: Dict[str, Tuple[A2AMessageRecord, A2AResponseRecord]] = {}
+        
         # Estadísticas
         self.stats = {
             "total_queries": 0,
             "successful_queries": 0,
             "failed_queries": 0,
+            "cancelled_queries": 0,
+            "resumed_queries": 0,
+            "resumed_agents": 0,
+            "reused_agents": 0,
             "total_a2a_messages": 0,
             "average_response_time_ms": 0.0
         }
+        self._total_response_time_ms = 0.0
     
     def _register_orchestrator_agent(self) -> None:
         """Asegura que el orquestador exista dentro del registro A2A."""
@@ -141,47 +295,66 @@ class AgentOrchestrator:
         # Construir grafo con los agentes registrados
         self.graph = self._build_graph()
     
+    # Forma del grafo: cambia si cambia la estructura de nodos/aristas
+    GRAPH_SHAPE = ("analyze_query", "dispatch:send|batch", "synthesize", "finalize")
+    
     def _build_graph(self) -> StateGraph:
         """
-        Construye el grafo de LangGraph con los agentes registrados
+        Obtiene el grafo de LangGraph compilado (desde la caché global)
         
         El grafo define:
         1. analyze_query: Analiza la consulta y determina agentes necesarios
-        2. execute_agents: Ejecuta agentes usando A2A Protocol
+        2. dispatch: map-reduce con la API Send (una rama `execute_agent`
+           por agente) o un único nodo `execute_agents` (secuencial / DAG)
         3. synthesize: Combina resultados de todos los agentes
         4. finalize: Prepara respuesta final
+        
+        El número de pasos es constante sin importar cuántos agentes haya.
+        Con checkpoints activos el grafo se compila con el checkpointer SQLite.
         """
+        checkpointer = checkpoint_store.saver
+        return graph_cache.get_or_compile(
+            (self.GRAPH_SHAPE, checkpointer),
+            lambda: self._compile_graph(checkpointer)
+        )
+    
+    @staticmethod
+    def _compile_graph(checkpointer: Any = None) -> StateGraph:
+        """Construye y compila el grafo (independiente de la instancia)"""
         workflow = StateGraph(AgentState)
         
         # Nodos del grafo
-        workflow.add_node("analyze_query", self._analyze_query)
-        workflow.add_node("execute_agents", self._execute_agents)
-        workflow.add_node("synthesize", self._synthesize_results)
-        workflow.add_node("finalize", self._finalize_result)
+        workflow.add_node("analyze_query", _analyze_query_node)
+        workflow.add_node("execute_agent", _execute_agent_node)
+        workflow.add_node("execute_agents", _execute_agents_node)
+        workflow.add_node("synthesize", _synthesize_node)
+        workflow.add_node("finalize", _finalize_node)
         
         # Punto de entrada
         workflow.set_entry_point("analyze_query")
         
-        # Flujo lineal con decisión condicional
-        workflow.add_edge("analyze_query", "execute_agents")
+        # Fan-out: ramas paralelas (Send) o ejecución en un solo nodo
         workflow.add_conditional_edges(
-            "execute_agents",
-            self._should_continue,
-            {
-                "continue": "execute_agents",  # Ejecutar más agentes
-                "synthesize": "synthesize"      # Todos completados
-            }
+            "analyze_query",
+            _dispatch_agents_edge,
+            ["execute_agent", "execute_agents", "synthesize"]
         )
+        
+        # Fan-in: todas las ramas convergen en la síntesis
+        workflow.add_edge("execute_agent", "synthesize")
+        workflow.add_edge("execute_agents", "synthesize")
         workflow.add_edge("synthesize", "finalize")
         workflow.add_edge("finalize", END)
         
-        return workflow.compile()
+        return workflow.compile(checkpointer=checkpointer)
     
     async def execute(
         self,
         task: str,
         agents: List[Any],
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        conversation_id: Optional[str] = None,
+        owner: str = ""
     ) -> Dict[str, Any]:
         """
         Ejecuta una tarea con los agentes seleccionados
@@ -190,60 +363,173 @@ class AgentOrchestrator:
             task: Tarea a ejecutar
             agents: Lista de agentes a usar
             context: Contexto adicional
+            conversation_id: ID de la ejecución (se genera si no se indica);
+                con checkpoints activos permite reanudarla con `resume`.
+                Una ejecución nueva descarta el checkpoint previo con el
+                mismo ID (sus resultados no se mezclan con los nuevos)
+            owner: propietario de la ejecución (`checkpoint_owner`)
             
         Returns:
             Resultado de la ejecución con metadata
+        
+        Raises:
+            PermissionError: si `conversation_id` tiene un checkpoint de
+                otro propietario
         """
+        if conversation_id is None:
+            conversation_id = str(uuid.uuid4())
+        else:
+            previous_owner = await checkpoint_store.thread_owner(conversation_id)
+            if previous_owner is not None:
+                if previous_owner != owner:
+                    raise PermissionError(f"Conversation {conversation_id} belongs to another API key")
+                print(f"🗑️ Checkpoint previo de {conversation_id} descartado: nueva ejecución")
+                await checkpoint_store.delete_thread(conversation_id)
+        initial_state: AgentState = {
+            "user_query": task,
+            "context": context or {},
+            "a2a_messages": [],
+            "a2a_responses": [],
+            "current_step": "init",
+            "next_agent": None,
+            "agents_to_execute": [agent.profile.agent_id for agent in agents],
+            "agents_completed": [],
+            "agents_timed_out": [],
+            "agents_failed": {},
+            "intermediate_results": {},
+            "final_result": None,
+            "conversation_id": conversation_id,
+            "start_time": datetime.utcnow(),
+            "routing": None,
+            "is_complete": False,
+            "error": None
+        }
+        return await self._run_graph(conversation_id, agents, initial_state, initial_state["context"], owner)
+    
+    async def resume(self, conversation_id: str, agents: List[Any], owner: str = "") -> Dict[str, Any]:
+        """
+        Reanuda una ejecución interrumpida desde su último checkpoint.
+        
+        Los agentes que ya respondieron no se vuelven a ejecutar: sus
+        respuestas se recuperan de `agent_progress`. `agents` debe contener
+        las instancias de los agentes de la ejecución original. Solo el
+        propietario (`owner`) puede reanudarla.
+        
+        Raises:
+            RuntimeError: si los checkpoints están desactivados
+            LookupError: si no hay checkpoint para `conversation_id` o es de
+                otro propietario
+        """
+        if not checkpoint_store.active:
+            raise RuntimeError("Checkpointing is disabled")
+        if await checkpoint_store.thread_owner(conversation_id) != owner:
+            raise LookupError(f"No checkpoint for conversation {conversation_id}")
+        
+        self.register_agents(agents)
+        snapshot = await self.graph.aget_state(self._graph_config(conversation_id))
+        if not snapshot.values:
+            raise LookupError(f"No checkpoint for conversation {conversation_id}")
+        
+        self._resumed_results = await checkpoint_store.load_agent_results(conversation_id)
+        self.stats["resumed_queries"] += 1
+        print(f"♻️ Reanudando {conversation_id} en {list(snapshot.next) or 'fin'} "
+              f"({len(self._resumed_results)} agentes ya completados)")
+        return await self._run_graph(conversation_id, agents, None, snapshot.values["context"], owner)
+    
+    def _graph_config(self, conversation_id: str) -> Dict[str, Any]:
+        """Config de LangGraph: orquestador y `thread_id` del checkpoint"""
+        return {"configurable": {"orchestrator": self, "thread_id": conversation_id}}
+    
+    async def _run_graph(
+        self,
+        conversation_id: str,
+        agents: List[Any],
+        graph_input: Optional[AgentState],
+        context: Dict[str, Any],
+        owner: str = ""
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta el grafo desde `graph_input` (None = continuar desde el
+        último checkpoint) y registra métricas y estadísticas.
+        """
+        start_time = datetime.utcnow()
+        REQUESTS_IN_FLIGHT.inc()
+        # Las llamadas LLM de esta ejecución comparten cuota justa en el gobernador
+        request_token = bind_request_id(conversation_id)
         try:
             # Registrar agentes
             self.register_agents(agents)
-            
-            # Preparar estado inicial
-            conversation_id = str(uuid.uuid4())
-            start_time = datetime.utcnow()
-            
-            initial_state: AgentState = {
-                "user_query": task,
-                "context": context or {},
-                "a2a_messages": [],
-                "a2a_responses": [],
-                "current_step": "init",
-                "next_agent": None,
-                "agents_to_execute": [agent.profile.agent_id for agent in agents],
-                "agents_completed": [],
-                "intermediate_results": {},
-                "final_result": None,
-                "conversation_id": conversation_id,
-                "start_time": start_time,
-                "is_complete": False,
-                "error": None
-            }
+            await checkpoint_store.touch_thread(conversation_id, owner)
             
             # Ejecutar grafo de LangGraph
-            final_state = await self.graph.ainvoke(initial_state)
+            emit_event("run_started", {"conversation_id": conversation_id})
+            self._branch_semaphore = asyncio.Semaphore(self._get_max_parallel(context))
+            final_state = await self.graph.ainvoke(
+                graph_input,
+                config=self._graph_config(conversation_id)
+            )
             
             # Calcular tiempo de procesamiento
             processing_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+            metrics.observe("request_total", processing_time, label="success")
+            REQUESTS_SUCCESS.inc()
+            
+            # Completada: ya no hay nada que reanudar
+            await checkpoint_store.delete_thread(conversation_id)
             
             # Actualizar estadísticas
             self.stats["total_queries"] += 1
             self.stats["successful_queries"] += 1
             self.stats["total_a2a_messages"] += len(final_state["a2a_messages"])
+            self._total_response_time_ms += processing_time
+            self.stats["average_response_time_ms"] = (
+                self._total_response_time_ms / self.stats["successful_queries"]
+            )
             
             return {
                 "success": True,
                 "final_result": final_state["final_result"],
                 "conversation_id": conversation_id,
                 "agents_used": final_state["agents_completed"],
+                "agents_timed_out": final_state["agents_timed_out"],
+                "agents_failed": final_state["agents_failed"],
                 "processing_time_ms": processing_time,
                 "a2a_messages_count": len(final_state["a2a_messages"]),
                 "a2a_responses_count": len(final_state["a2a_responses"]),
-                "intermediate_results": final_state["intermediate_results"]
+                "intermediate_results": final_state["intermediate_results"],
+                "agents_reused": [
+                    response.responder_id for response in final_state["a2a_responses"]
+                    if response.metadata.get("reused")
+                ],
+                "routing": final_state.get("routing")
             }
+        
+        except asyncio.CancelledError:
+            # Cliente desconectado o job cancelado: la cancelación se propaga
+            # a los nodos del grafo y a las llamadas LLM pendientes
+            self.stats["total_queries"] += 1
+            self.stats["cancelled_queries"] += 1
+            metrics.observe(
+                "request_total",
+                (datetime.utcnow() - start_time).total_seconds() * 1000,
+                label="cancelled"
+            )
+            REQUESTS_CANCELLED.inc()
+            print(f"🛑 Ejecución {conversation_id} cancelada")
+            raise
             
         except Exception as e:
             self.stats["total_queries"] += 1
             self.stats["failed_queries"] += 1
+            metrics.observe(
+                "request_total",
+                (datetime.utcnow() - start_time).total_seconds() * 1000,
+                label="error"
+            )
+            REQUESTS_ERROR.inc()
+            
+            # Fallida: reanudarla repetiría el mismo error
+            await checkpoint_store.delete_thread(conversation_id)
             
             # Log detallado del error
             import traceback
@@ -254,14 +540,22 @@ class AgentOrchestrator:
             return {
                 "success": False,
                 "error": str(e),
-                "final_result": None
+                "final_result": None,
+                "conversation_id": conversation_id
             }
+        finally:
+            self._resumed_results = {}
+            reset_request_id(request_token)
+            REQUESTS_IN_FLIGHT.dec()
+            result_digests.discard(conversation_id)
     
-    async def _analyze_query(self, state: AgentState) -> AgentState:
+    async def _analyze_query(self, state: AgentState) -> Dict[str, Any]:
         """
         Analiza la consulta del usuario y prepara el contexto
         
-        Crea el mensaje A2A inicial que se enviará a los agentes.
+        Crea el mensaje A2A inicial que se enviará a los agentes. En modo
+        `context.routing.mode = "auto"` reduce los agentes a ejecutar a los
+        más relevantes para la consulta (ver `_route_agents`).
         """
         # Crear mensaje A2A inicial para broadcast a todos los agentes
         initial_message = self.protocol.create_message(
@@ -274,38 +568,301 @@ class AgentOrchestrator:
                 "task_type": "analysis"
             },
             message_type=MessageType.BROADCAST,
-            priority=Priority.NORMAL,
+            priority=self._get_priority(state["context"]),
             conversation_id=state["conversation_id"]
         )
         
-        state.setdefault("a2a_messages", []).append(initial_message)
-        state["current_step"] = "analyzed"
+        updates = {
+            "a2a_messages": [initial_message],
+            "current_step": "analyzed",
+        }
+        updates.update(self._route_agents(state))
         
-        return state
+        return updates
     
-    async def _execute_agents(self, state: AgentState) -> AgentState:
+    def _route_agents(self, state: AgentState) -> Dict[str, Any]:
         """
-        Ejecuta agentes usando A2A Protocol como capa de comunicación
+        Enrutado opt-in: `context.routing = {"mode": "auto", "top_k": 3}`.
         
-        Cada agente recibe un mensaje A2A y responde con A2AResponse.
+        Puntúa la consulta contra el perfil de cada agente con el
+        enrutador local (sin LLM) y conserva solo los `top_k` relevantes.
         """
-        # Obtener agentes pendientes
-        pending_agents = [
-            agent_id for agent_id in state["agents_to_execute"]
-            if agent_id not in state["agents_completed"]
+        context = state["context"]
+        routing_config = context.get("routing") if isinstance(context, dict) else None
+        if not isinstance(routing_config, dict) or routing_config.get("mode") != "auto":
+            return {}
+        
+        top_k, min_score = self._get_routing_limits(routing_config)
+        candidates = [
+            self.agents[agent_id] for agent_id in state["agents_to_execute"]
+            if agent_id in self.agents
         ]
+        if not candidates:
+            return {}
+        
+        selected, scores = query_router.route(
+            state["user_query"], candidates, top_k=top_k, min_score=min_score
+        )
+        print(f"🧭 Enrutado automático: {len(selected)}/{len(candidates)} agentes "
+              f"({', '.join(selected)})")
         
+        return {
+            "agents_to_execute": selected,
+            "routing": {
+                "mode": "auto",
+                "top_k": top_k,
+                "selected": selected,
+                "scores": scores,
+            },
+        }
+    
+    def _dispatch_agents(self, state: AgentState) -> Union[str, List[Send]]:
+        """
+        Decide cómo se ejecutan los agentes pendientes.
+        
+        - Modo concurrente (`context.agentsCluster.maxParallel` > 1): una
+          rama paralela por agente vía Send (map-reduce de LangGraph),
+          acotadas por ese valor.
+        - Modo DAG (`langgraph.strategy = "dag"` o `dependencies`) y modo
+          secuencial (por defecto): un único nodo `execute_agents`.
+        """
+        pending_agents = self._pending_agents(state)
         if not pending_agents:
-            state["current_step"] = "all_agents_completed"
-            return state
+            return "synthesize"
+        
+        if self._is_dag_mode(state["context"]):
+            return "execute_agents"
+        
+        max_parallel = self._get_max_parallel(state["context"])
+        if max_parallel > 1 and len(pending_agents) > 1:
+            return [
+                Send("execute_agent", {
+                    "agent_id": agent_id,
+                    "user_query": state["user_query"],
+                    "context": state["context"],
+                    "conversation_id": state["conversation_id"],
+                    "intermediate_results": state["intermediate_results"],
+                })
+                for agent_id in pending_agents
+            ]
+        
+        return "execute_agents"
+    
+    async def _execute_agent_branch(self, branch: AgentBranchState) -> Dict[str, Any]:
+        """
+        Rama paralela: ejecuta un agente y devuelve solo su actualización.
+        
+        Los reducers de AgentState combinan las ramas en el fan-in.
+        """
+        agent_id = branch["agent_id"]
+        updates = self._new_updates()
+        
+        async with self._branch_semaphore:
+            agent_message, agent_response = await self._run_agent(
+                branch, agent_id, branch["intermediate_results"]
+            )
+        self._record_agent_result(updates, agent_id, agent_message, agent_response)
+        
+        return updates
+    
+    async def _execute_agents(self, state: AgentState) -> Dict[str, Any]:
+        """
+        Ejecuta agentes usando A2A Protocol como capa de comunicación
         
-        # Ejecutar el siguiente agente
-        agent_id = pending_agents[0]
+        Cada agente recibe un mensaje A2A y responde con A2AResponse.
+        
+        Modo secuencial: los agentes se ejecutan en orden dentro de este
+        nodo y cada uno recibe solo los resultados ya disponibles de sus
+        dependencias declaradas (mismas aristas que el modo DAG), de modo
+        que su huella incremental no cambia por agentes que no consume.
+        Modo DAG: ver `_execute_agents_dag`.
+        """
+        pending_agents = self._pending_agents(state)
+        updates = self._new_updates()
+        
+        if self._is_dag_mode(state["context"]):
+            max_parallel = self._get_max_parallel(state["context"], default=MAX_PARALLEL_AGENTS)
+            await self._execute_agents_dag(state, updates, pending_agents, max_parallel)
+        else:
+            for agent_id in pending_agents:
+                available = {**state["intermediate_results"], **updates["intermediate_results"]}
+                upstream_ids = self._dependency_edges(
+                    state["context"], [*available, agent_id]
+                )[agent_id]
+                previous_results = {
+                    upstream_id: available[upstream_id] for upstream_id in upstream_ids
+                }
+                agent_message, agent_response = await self._run_agent(
+                    state, agent_id, previous_results
+                )
+                self._record_agent_result(updates, agent_id, agent_message, agent_response)
+        
+        updates["current_step"] = "all_agents_completed"
+        return updates
+    
+    @staticmethod
+    def _new_updates() -> Dict[str, Any]:
+        """Actualización parcial vacía para los campos con reducer"""
+        return {
+            "a2a_messages": [],
+            "a2a_responses": [],
+            "agents_completed": [],
+            "agents_timed_out": [],
+            "agents_failed": {},
+            "intermediate_results": {},
+        }
+    
+    async def _execute_agents_dag(
+        self,
+        state: AgentState,
+        updates: Dict[str, Any],
+        pending_agents: List[str],
+        max_parallel: int
+    ) -> None:
+        """
+        Ejecuta los agentes pendientes respetando un grafo de dependencias.
+        
+        Por defecto cada agente depende de los agentes seleccionados de
+        niveles inferiores (niveles 1-5 de AGENT_DEFINITIONS), de modo que
+        cada nivel forma una ola paralela. Las aristas explícitas de
+        `context.dependencies` reemplazan a las del nivel para ese agente,
+        y el agente arranca en cuanto sus entradas existen.
+        
+        Cada agente recibe solo los resultados de sus dependencias
+        directas (los de sus ancestros ya están resumidos en ellos). Los
+        resultados se acumulan en `updates`.
+        """
+        dependencies = self._resolve_dependencies(state["context"], pending_agents)
+        
+        semaphore = asyncio.Semaphore(max_parallel)
+        finished = {agent_id: asyncio.Event() for agent_id in pending_agents}
+        
+        async def run_node(agent_id: str) -> None:
+            try:
+                for upstream_id in dependencies[agent_id]:
+                    await finished[upstream_id].wait()
+                
+                available = {**state["intermediate_results"], **updates["intermediate_results"]}
+                previous_results = {
+                    upstream_id: available[upstream_id]
+                    for upstream_id in dependencies[agent_id]
+                    if upstream_id in available
+                }
+                async with semaphore:
+                    agent_message, agent_response = await self._run_agent(
+                        state, agent_id, previous_results
+                    )
+                # Registrar en cuanto termina para desbloquear a sus dependientes
+                self._record_agent_result(updates, agent_id, agent_message, agent_response)
+            finally:
+                finished[agent_id].set()
+        
+        await asyncio.gather(*(run_node(agent_id) for agent_id in pending_agents))
+    
+    def _resolve_dependencies(
+        self,
+        context: Dict[str, Any],
+        agent_ids: List[str]
+    ) -> Dict[str, List[str]]:
+        """
+        Construye las aristas agente -> dependencias (solo entre `agent_ids`).
+        
+        `context.dependencies` acepta claves de AGENT_DEFINITIONS ("summary")
+        o agent_id de perfil. Lanza ValueError si hay ciclos.
+        """
+        dependencies = self._dependency_edges(context, agent_ids)
+        
+        # Validar que no hay ciclos (Kahn)
+        remaining = {agent_id: set(deps) for agent_id, deps in dependencies.items()}
+        while remaining:
+            ready = [agent_id for agent_id, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Dependency cycle between agents: {sorted(remaining)}")
+            for agent_id in ready:
+                del remaining[agent_id]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        
+        return dependencies
+    
+    def _dependency_edges(
+        self,
+        context: Dict[str, Any],
+        agent_ids: List[str]
+    ) -> Dict[str, List[str]]:
+        """
+        Aristas declaradas (`context.dependencies`) o, si no hay, por nivel:
+        cada agente depende de los de niveles inferiores entre `agent_ids`
+        """
+        # Resolver claves del registro a agent_id de perfil
+        key_to_id = {}
+        for agent_id in agent_ids:
+            key_to_id[agent_id] = agent_id
+            agent_key = getattr(self.agents.get(agent_id), "agent_key", None)
+            if agent_key:
+                key_to_id[agent_key] = agent_id
+        
+        levels = {
+            agent_id: getattr(self.agents.get(agent_id), "level", 1)
+            for agent_id in agent_ids
+        }
+        explicit = context.get("dependencies") if isinstance(context, dict) else None
+        explicit = explicit or {}
+        
+        dependencies: Dict[str, List[str]] = {}
+        for agent_id in agent_ids:
+            agent_key = getattr(self.agents.get(agent_id), "agent_key", None)
+            declared = explicit.get(agent_id, explicit.get(agent_key)) if explicit else None
+            if declared is not None:
+                dependencies[agent_id] = [
+                    key_to_id[upstream] for upstream in declared
+                    if upstream in key_to_id and key_to_id[upstream] != agent_id
+                ]
+            else:
+                dependencies[agent_id] = [
+                    upstream_id for upstream_id in agent_ids
+                    if levels[upstream_id] < levels[agent_id]
+                ]
+        return dependencies
+    
+    @staticmethod
+    def _is_dag_mode(context: Dict[str, Any]) -> bool:
+        """Modo DAG: `langgraph.strategy = "dag"` o aristas explícitas"""
+        if not isinstance(context, dict):
+            return False
+        langgraph_config = context.get("langgraph") or {}
+        return langgraph_config.get("strategy") == "dag" or bool(context.get("dependencies"))
+    
+    async def _run_agent(
+        self,
+        state: Union[AgentState, AgentBranchState],
+        agent_id: str,
+        previous_results: Dict[str, Any]
+    ) -> Tuple[Optional[A2AMessageRecord], Any]:
+        """
+        Ejecuta un agente mediante el protocolo A2A.
+        
+        El mensaje solo lleva los IDs de los resultados previos; su digest
+        se resuelve con `BaseAgent.get_previous_results`.
+        
+        Los fallos se reintentan hasta el límite de `autoRetry`. Si las
+        entradas del agente no cambiaron desde una ejecución anterior, se
+        reutiliza su resultado (ver `app.incremental`).
+        
+        Retorna (mensaje, respuesta). Si la ejecución falla, la respuesta
+        es el texto del error.
+        """
         agent = self.agents.get(agent_id)
         
         if not agent:
-            state["error"] = f"Agent {agent_id} not found"
-            return state
+            return None, f"Agent {agent_id} not found"
+        
+        resumed = self._resumed_results.pop(agent_id, None)
+        if resumed is not None:
+            # Ejecución reanudada: el agente ya respondió antes de la interrupción
+            self.stats["resumed_agents"] += 1
+            self._emit_agent_completed(agent_id, resumed[1])
+            return resumed
         
         try:
             # Crear mensaje A2A para este agente específico
@@ -317,94 +874,368 @@ class AgentOrchestrator:
                     "task": state["user_query"],
                     "query": state["user_query"],
                     "context": state["context"],
-                    "previous_results": state["intermediate_results"]
+                    "previous_result_ids": list(previous_results)
                 },
                 message_type=MessageType.REQUEST,
                 recipient_id=agent_id,
-                priority=Priority.NORMAL,
+                priority=self._get_priority(state["context"]),
                 conversation_id=state["conversation_id"],
                 context={
                     "user_context": state["context"],
-                    "previous_results": state["intermediate_results"],
+                    "previous_result_ids": list(previous_results),
                 },
+                timeout_seconds=self._get_agent_timeout(state["context"]),
             )
             
             # Ejecutar agente mediante protocolo A2A
-            agent_response = await agent.handle_message(agent_message)
+            emit_event("agent_started", {"agent_id": agent_id})
+            
+            # Ejecución incremental: mismas entradas -> mismo resultado
+            fingerprint = None
+            agent_response = None
+            if agent_result_cache.is_enabled_for(state["context"], agent):
+                fingerprint = fingerprint_agent_inputs(
+                    state["user_query"], state["context"], agent, previous_results
+                )
+                agent_response = self._reuse_result(agent, agent_message, fingerprint)
             
-            # Almacenar intercambio A2A
-            state.setdefault("a2a_messages", []).append(agent_message)
-            state.setdefault("a2a_responses", []).append(agent_response)
+            if agent_response is None:
+                agent_response = await self._call_agent_with_retries(
+                    agent, agent_message, self._get_max_retries(state["context"])
+                )
+                if fingerprint is not None:
+                    agent_result_cache.put(fingerprint, agent_response)
             
             if agent_response.success:
-                # Extraer el contenido del resultado (puede ser dict o string)
-                result_content = agent_response.result
-                if isinstance(result_content, dict):
-                    # Si es dict, convertir a string legible
-                    result_content = str(result_content)
-                
-                state["intermediate_results"][agent_id] = result_content
-                state["agents_completed"].append(agent_id)
-                state["current_step"] = f"executed_{agent_id}"
-                print(f"✅ Agente {agent_id} completado exitosamente")
-            else:
-                error_detail = agent_response.error_message or "Unknown agent error"
-                state["error"] = f"Agent {agent_id} failed: {error_detail}"
-                print(f"❌ Agente {agent_id} falló: {error_detail}")
+                await checkpoint_store.save_agent_result(
+                    state["conversation_id"], agent_id, agent_message, agent_response
+                )
+            self._emit_agent_completed(agent_id, agent_response)
+            return agent_message, agent_response
         
+        except asyncio.CancelledError:
+            AGENT_EXECUTIONS.labels(agent_id, "cancelled").inc()
+            raise
         except Exception as e:
-            state["error"] = f"Error executing {agent_id}: {str(e)}"
+            return None, f"Error executing {agent_id}: {str(e)}"
+    
+    def _reuse_result(
+        self,
+        agent: Any,
+        agent_message: A2AMessageRecord,
+        fingerprint: str
+    ) -> Optional[A2AResponseRecord]:
+        """Respuesta reutilizada si las entradas del agente no cambiaron"""
+        cached = agent_result_cache.get(fingerprint)
+        if cached is None:
+            return None
+        self.stats["reused_agents"] += 1
+        print(f"⏩ Agente {agent.profile.agent_id}: entradas sin cambios, resultado reutilizado")
+        return self.protocol.create_response(
+            original_message=agent_message,
+            responder_id=agent.profile.agent_id,
+            responder_capability=agent.profile.primary_capability,
+            result=cached.result,
+            success=True,
+            reasoning=cached.reasoning,
+            confidence=cached.confidence,
+            processing_time_ms=0.0,
+            metadata={"reused": True, "reused_response_id": cached.response_id},
+        )
+    
+    async def _call_agent_with_retries(
+        self,
+        agent: Any,
+        agent_message: A2AMessageRecord,
+        max_retries: int
+    ) -> A2AResponseRecord:
+        """
+        Ejecuta el agente reintentando los fallos con backoff exponencial
+        con jitter; los plazos vencidos no se reintentan.
+        
+        Antes de cada reintento emite `agent_retry`: los tokens que el
+        intento fallido ya envió por streaming dejan de ser válidos.
+        """
+        attempt = 0
+        while True:
+            agent_response = await self._call_agent(agent, agent_message)
+            if (agent_response.success
+                    or agent_response.status_code == 504
+                    or attempt >= max_retries):
+                break
+            attempt += 1
+            delay = AGENT_RETRY_BASE_DELAY * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+            print(f"🔁 Reintentando {agent.profile.agent_id} ({attempt}/{max_retries}) en {delay:.1f}s: "
+                  f"{agent_response.error_message}")
+            emit_event("agent_retry", {
+                "agent_id": agent.profile.agent_id,
+                "attempt": attempt,
+                "max_retries": max_retries,
+                "error": agent_response.error_message,
+            })
+            await asyncio.sleep(delay)
+        agent_response.metadata["attempts"] = attempt + 1
+        return agent_response
+    
+    @staticmethod
+    def _emit_agent_completed(agent_id: str, agent_response: A2AResponseRecord) -> None:
+        emit_event("agent_completed", {
+            "agent_id": agent_id,
+            "success": agent_response.success,
+            "error": agent_response.error_message,
+            "timed_out": agent_response.status_code == 504,
+            "reused": bool(agent_response.metadata.get("reused")),
+            "result": (
+                extract_result_text(agent_response.result)
+                if agent_response.success else None
+            ),
+        })
+    
+    async def _call_agent(self, agent: Any, agent_message: A2AMessageRecord) -> A2AResponseRecord:
+        """Un intento de ejecución del agente, con plazo máximo"""
+        try:
+            return await asyncio.wait_for(
+                agent.handle_message(agent_message),
+                timeout=agent_message.timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            return self._create_timeout_response(agent, agent_message)
+    
+    def _record_agent_result(
+        self,
+        updates: Dict[str, Any],
+        agent_id: str,
+        agent_message: Optional[A2AMessageRecord],
+        agent_response: Any
+    ) -> None:
+        """Almacena el intercambio A2A de un agente en la actualización parcial"""
+        if not isinstance(agent_response, A2AResponseRecord):
+            AGENT_EXECUTIONS.labels(agent_id, "error").inc()
+            updates["agents_failed"][agent_id] = agent_response
+            print(f"❌ Agente {agent_id} falló: {agent_response}")
+            return
+        
+        # Almacenar intercambio A2A
+        updates["a2a_messages"].append(agent_message)
+        updates["a2a_responses"].append(agent_response)
+        
+        if agent_response.success:
+            # Extraer el texto principal del resultado (puede ser dict o string)
+            result_content = extract_result_text(agent_response.result)
+            agent = self.agents.get(agent_id)
+            result_digests.put(agent_message.conversation_id, build_digest(
+                agent_id,
+                agent_response.result,
+                agent_name=agent.profile.name if agent else None,
+            ))
+            
+            updates["intermediate_results"][agent_id] = result_content
+            updates["agents_completed"].append(agent_id)
+            AGENT_EXECUTIONS.labels(
+                agent_id, "reused" if agent_response.metadata.get("reused") else "success"
+            ).inc()
+            print(f"✅ Agente {agent_id} completado exitosamente")
+        elif agent_response.status_code == 504:
+            # Plazo vencido: se sigue con el resto y se marca en la síntesis
+            updates["agents_timed_out"].append(agent_id)
+            AGENT_EXECUTIONS.labels(agent_id, "timeout").inc()
+            print(f"⏱️ Agente {agent_id} sin respuesta en {agent_message.timeout_seconds}s")
+        else:
+            # Fallo aislado: se registra y el resto de agentes continúa
+            error_detail = agent_response.error_message or "Unknown agent error"
+            updates["agents_failed"][agent_id] = error_detail
+            AGENT_EXECUTIONS.labels(agent_id, "error").inc()
+            print(f"❌ Agente {agent_id} falló: {error_detail}")
+    
+    def _create_timeout_response(self, agent: Any, message: A2AMessageRecord) -> A2AResponseRecord:
+        """Respuesta A2A para un agente que no respondió dentro de su plazo"""
+        error = f"Agent {agent.profile.agent_id} timed out after {message.timeout_seconds}s"
+        return self.protocol.create_response(
+            original_message=message,
+            responder_id=agent.profile.agent_id,
+            responder_capability=agent.profile.primary_capability,
+            result={"error": error},
+            success=False,
+            status_code=504,
+            error_message=error,
+            metadata={"timed_out": True},
+        )
+    
+    @staticmethod
+    def _get_max_retries(context: Dict[str, Any]) -> int:
+        """
+        Reintentos por agente según `a2aResponsesCollector.autoRetry`.
+        
+        True (o sin configurar) -> AGENT_MAX_RETRIES; False -> 0;
+        un entero -> ese número (acotado por AGENT_MAX_RETRIES).
+        """
+        collector_config = context.get("a2aResponsesCollector") if isinstance(context, dict) else None
+        auto_retry = (collector_config or {}).get("autoRetry", True)
+        if auto_retry is None or auto_retry is True:
+            return AGENT_MAX_RETRIES
+        if auto_retry is False:
+            return 0
+        try:
+            return max(0, min(int(auto_retry), AGENT_MAX_RETRIES))
+        except (TypeError, ValueError):
+            return AGENT_MAX_RETRIES
+    
+    @staticmethod
+    def _get_agent_timeout(context: Dict[str, Any]) -> int:
+        """
+        Plazo por agente en segundos.
+        
+        `a2aResponsesCollector.timeoutMs` (milisegundos) es el plazo del
+        colector de respuestas del editor de nodos. Se respeta tanto si
+        amplía como si acorta AGENT_TIMEOUT_SECONDS, pero nunca baja de
+        AGENT_TIMEOUT_MIN_SECONDS: el valor por defecto del editor (8000)
+        es muy corto para una llamada LLM.
+        """
+        collector_config = context.get("a2aResponsesCollector") if isinstance(context, dict) else None
+        timeout_ms = (collector_config or {}).get("timeoutMs")
+        try:
+            if timeout_ms and float(timeout_ms) > 0:
+                return max(AGENT_TIMEOUT_MIN_SECONDS, math.ceil(float(timeout_ms) / 1000))
+        except (TypeError, ValueError):
+            pass
+        return AGENT_TIMEOUT_SECONDS
+    
+    @staticmethod
+    def _get_priority(context: Dict[str, Any]) -> Priority:
+        """
+        Prioridad A2A de la ejecución según `a2aMessage.priority` del editor
+        de nodos (NORMAL si falta o no es válida).
+        """
+        message_config = context.get("a2aMessage") if isinstance(context, dict) else None
+        if not isinstance(message_config, dict):
+            return Priority.NORMAL
+        try:
+            return Priority(message_config.get("priority") or Priority.NORMAL)
+        except ValueError:
+            return Priority.NORMAL
+    
+    @staticmethod
+    def _get_routing_limits(routing_config: Dict[str, Any]) -> Tuple[int, float]:
+        """
+        `top_k` (>= 1) y `min_score` (0..1) del enrutado automático.
         
-        return state
+        Valores ausentes o no numéricos -> ROUTER_TOP_K / ROUTER_MIN_SCORE.
+        """
+        try:
+            top_k = max(1, int(routing_config.get("top_k")))
+        except (TypeError, ValueError, OverflowError):
+            top_k = ROUTER_TOP_K
+        try:
+            min_score = float(routing_config.get("min_score"))
+        except (TypeError, ValueError):
+            min_score = ROUTER_MIN_SCORE
+        if not math.isfinite(min_score):
+            min_score = ROUTER_MIN_SCORE
+        return top_k, max(0.0, min(min_score, 1.0))
     
-    def _should_continue(self, state: AgentState) -> str:
+    @staticmethod
+    def _get_max_parallel(context: Dict[str, Any], default: int = 1) -> int:
         """
-        Decide si continuar ejecutando agentes o pasar a síntesis
+        Obtiene el límite de concurrencia enviado por el editor de nodos.
+        
+        Lee `agentsCluster.maxParallel`; `langgraph.allowParallel = False`
+        fuerza ejecución secuencial. Sin configuración: `default`.
         """
-        pending = [
+        if not isinstance(context, dict):
+            return default
+        
+        langgraph_config = context.get("langgraph") or {}
+        if langgraph_config.get("allowParallel") is False:
+            return 1
+        
+        cluster_config = context.get("agentsCluster") or {}
+        try:
+            max_parallel = int(cluster_config.get("maxParallel") or default)
+        except (TypeError, ValueError):
+            return default
+        
+        return max(1, min(max_parallel, MAX_PARALLEL_AGENTS))
+    
+    @staticmethod
+    def _pending_agents(state: AgentState) -> List[str]:
+        """Agentes que aún no completaron, fallaron ni agotaron su plazo"""
+        finished = (
+            set(state["agents_completed"])
+            | set(state["agents_timed_out"])
+            | set(state["agents_failed"])
+        )
+        return [
             agent_id for agent_id in state["agents_to_execute"]
-            if agent_id not in state["agents_completed"]
+            if agent_id not in finished
         ]
-        
-        if pending and not state.get("error"):
-            return "continue"
-        return "synthesize"
     
-    async def _synthesize_results(self, state: AgentState) -> AgentState:
+    async def _synthesize_results(self, state: AgentState) -> Dict[str, Any]:
         """
         Sintetiza los resultados de todos los agentes
         
-        Combina las respuestas A2A de todos los agentes en un resultado coherente.
+        Combina las respuestas A2A de todos los agentes en un resultado
+        coherente: concatenación o, con `context.synthesis.strategy`,
+        síntesis map-reduce con el LLM (ver `app.synthesis`).
         """
-        results = []
-        
+        sections = []
+        model = None
+        api_config = None
         for agent_id, result in state["intermediate_results"].items():
             agent = self.agents.get(agent_id)
             if agent:
-                results.append(f"**{agent.profile.name}:**\n{result}\n")
+                sections.append((agent.profile.name, result))
+                model, api_config = model or agent.model, api_config or agent.api_config
         
         # Combinar resultados
-        if results:
-            state["final_result"] = "\n".join(results)
+        if sections:
+            # Las llamadas de síntesis heredan la prioridad de la ejecución
+            priority_token = bind_priority(self._get_priority(state["context"]))
+            try:
+                final_result = await synthesis_engine.synthesize(
+                    state["user_query"], sections, state["context"], model, api_config
+                )
+            finally:
+                reset_priority(priority_token)
         else:
-            state["final_result"] = "No se pudieron obtener resultados de los agentes."
+            final_result = "No se pudieron obtener resultados de los agentes."
+        
+        # Marcar agentes sin respuesta dentro de su plazo
+        timed_out = [
+            self.agents[agent_id].profile.name if agent_id in self.agents else agent_id
+            for agent_id in state["agents_timed_out"]
+        ]
+        if timed_out:
+            final_result += f"\n\n⏱️ **Sin respuesta a tiempo:** {', '.join(timed_out)}"
         
-        state["current_step"] = "synthesized"
+        # Marcar agentes que fallaron tras agotar sus reintentos
+        failed = [
+            f"{self.agents[agent_id].profile.name if agent_id in self.agents else agent_id} ({error})"
+            for agent_id, error in state["agents_failed"].items()
+        ]
+        if failed:
+            final_result += f"\n\n⚠️ **Agentes con error:** {'; '.join(failed)}"
         
-        return state
+        return {
+            "final_result": final_result,
+            "current_step": "synthesized",
+        }
     
-    async def _finalize_result(self, state: AgentState) -> AgentState:
+    async def _finalize_result(self, state: AgentState) -> Dict[str, Any]:
         """
         Finaliza el procesamiento y marca como completo
         """
-        state["is_complete"] = True
-        state["current_step"] = "finalized"
-        
-        return state
+        return {
+            "is_complete": True,
+            "current_step": "finalized",
+        }
     
     def get_stats(self) -> Dict[str, Any]:
         """Obtiene estadísticas del orchestrator"""
-        return self.stats.copy()
+        return {
+            **self.stats,
+            **get_orchestration_stats(),
+            "a2a": self.protocol.get_stats(),
+        }
     
     def get_agent_status(self, agent_id: str) -> Optional[Dict[str, Any]]:
         """Obtiene el estado de un agente específico"""
@@ -425,5 +1256,22 @@ class AgentOrchestrator:
         }
 
 
+def get_orchestration_stats() -> Dict[str, Any]:
+    """
+    Estadísticas de los componentes compartidos por todas las ejecuciones.
+    
+    Cada request crea su propio AgentOrchestrator, así que las cachés y
+    almacenes de proceso se reportan a nivel de módulo (ver /api/metrics).
+    """
+    return {
+        "graph_cache": graph_cache.get_stats(),
+        "result_digests": result_digests.get_stats(),
+        "query_router": query_router.get_stats(),
+        "checkpoints": checkpoint_store.get_stats(),
+        "agent_result_cache": agent_result_cache.get_stats(),
+        "synthesis": synthesis_engine.get_stats(),
+    }
+
+
 # Instancia global del orchestrator
 orchestrator = AgentOrchestrator()
@@ -0,0 +1,194 @@
+"""
+Query Router - ATP
+Enrutador local de consultas: elige el subconjunto mínimo de agentes
+
+Modo opt-in (`context.routing.mode = "auto"`). Puntúa la consulta contra el
+perfil de cada agente (nombre, especialización, capacidades, dominio,
+descripción y backstory) con TF-IDF sobre un vectorizador de hashing.
+Todo es local y sin red: enrutar 30 agentes cuesta menos de un milisegundo,
+frente a una llamada LLM completa por cada agente descartado.
+"""
+from typing import Dict, Any, List, Tuple
+import math
+import re
+import unicodedata
+import zlib
+
+from app.config import ROUTER_TOP_K, ROUTER_MIN_SCORE
+
+
+# Dimensión del vectorizador de hashing
+HASH_BUCKETS = 1 << 18
+
+# Longitud del prefijo usado como raíz aproximada ("optimizacion" -> "optim")
+STEM_LENGTH = 5
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = {
+    # español
+    "que", "los", "las", "del", "con", "para", "por", "una", "uno", "unos",
+    "unas", "como", "mas", "pero", "sus", "este", "esta", "esto", "estos",
+    "estas", "ese", "esa", "eso", "son", "ser", "sin", "sobre", "entre",
+    "cual", "cuales", "hay", "muy", "tambien", "donde", "cuando", "desde",
+    "todo", "todos", "toda", "todas", "mis", "tus", "soy", "mi", "tu", "yo",
+    "me", "te", "se", "le", "lo", "la", "el", "en", "de", "y", "o", "a",
+    "puedes", "quiero", "necesito", "hacer", "dame", "favor",
+    # inglés
+    "the", "and", "for", "with", "that", "this", "from", "are", "was",
+    "you", "your", "can", "how", "what", "which", "into", "about", "have",
+    "has", "not", "but", "all", "its", "our", "their", "please", "need",
+}
+
+# Peso de cada campo del perfil en el documento del agente
+_FIELD_WEIGHTS = (
+    ("name", 3),
+    ("specialization", 3),
+    ("capabilities", 3),
+    ("domain_knowledge", 2),
+    ("description", 2),
+    ("backstory", 1),
+)
+
+
+def _normalize(text: str) -> str:
+    """Minúsculas y sin acentos"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens (palabras y raíces aproximadas) de un texto"""
+    features = []
+    for word in _TOKEN_RE.findall(_normalize(text)):
+        if len(word) < 3 or word in _STOPWORDS:
+            continue
+        features.append(word)
+        if len(word) > STEM_LENGTH:
+            features.append("~" + word[:STEM_LENGTH])
+    return features
+
+
+def _hash_features(features: List[str], weight: int = 1) -> Dict[int, float]:
+    """Frecuencias de términos sobre el espacio de hashing"""
+    counts: Dict[int, float] = {}
+    for feature in features:
+        bucket = zlib.crc32(feature.encode("utf-8")) % HASH_BUCKETS
+        counts[bucket] = counts.get(bucket, 0.0) + weight
+    return counts
+
+
+def _profile_fields(profile: Any) -> Dict[str, str]:
+    capabilities = [profile.primary_capability, *profile.secondary_capabilities]
+    return {
+        "name": profile.name,
+        "specialization": profile.specialization,
+        "capabilities": " ".join(
+            getattr(capability, "value", str(capability)).replace("_", " ")
+            for capability in capabilities
+        ),
+        "domain_knowledge": " ".join(profile.domain_knowledge),
+        "description": profile.description,
+        "backstory": profile.backstory,
+    }
+
+
+class QueryRouter:
+    """
+    Clasificador TF-IDF local de consultas a agentes.
+
+    Los vectores de término de cada perfil se calculan una sola vez por
+    agente; el IDF se calcula sobre los agentes candidatos de cada request.
+    """
+
+    def __init__(self):
+        self._profile_terms: Dict[str, Dict[int, float]] = {}
+        self.stats = {
+            "routed_queries": 0,
+            "candidates": 0,
+            "selected": 0,
+        }
+
+    def _terms_for(self, profile: Any) -> Dict[int, float]:
+        terms = self._profile_terms.get(profile.agent_id)
+        if terms is None:
+            terms = {}
+            fields = _profile_fields(profile)
+            for field, weight in _FIELD_WEIGHTS:
+                for bucket, count in _hash_features(tokenize(fields[field]), weight).items():
+                    terms[bucket] = terms.get(bucket, 0.0) + count
+            self._profile_terms[profile.agent_id] = terms
+        return terms
+
+    def score(self, query: str, agents: List[Any]) -> Dict[str, float]:
+        """Similitud coseno (TF-IDF) entre la consulta y cada agente"""
+        documents = {agent.profile.agent_id: self._terms_for(agent.profile) for agent in agents}
+
+        # IDF suavizado sobre los candidatos
+        total = len(documents)
+        document_frequency: Dict[int, int] = {}
+        for terms in documents.values():
+            for bucket in terms:
+                document_frequency[bucket] = document_frequency.get(bucket, 0) + 1
+
+        def idf(bucket: int) -> float:
+            return math.log((1 + total) / (1 + document_frequency.get(bucket, 0))) + 1
+
+        query_vector = {
+            bucket: (1 + math.log(count)) * idf(bucket)
+            for bucket, count in _hash_features(tokenize(query)).items()
+        }
+        query_norm = math.sqrt(sum(value * value for value in query_vector.values()))
+
+        scores: Dict[str, float] = {}
+        for agent_id, terms in documents.items():
+            dot = 0.0
+            norm = 0.0
+            for bucket, count in terms.items():
+                weight = (1 + math.log(count)) * idf(bucket)
+                norm += weight * weight
+                if bucket in query_vector:
+                    dot += weight * query_vector[bucket]
+            scores[agent_id] = dot / (query_norm * math.sqrt(norm)) if dot else 0.0
+        return scores
+
+    def route(
+        self,
+        query: str,
+        agents: List[Any],
+        top_k: int = ROUTER_TOP_K,
+        min_score: float = ROUTER_MIN_SCORE
+    ) -> Tuple[List[str], Dict[str, float]]:
+        """
+        Elige los `top_k` agentes más relevantes para la consulta.
+
+        Los agentes por debajo de `min_score` se descartan, pero siempre se
+        conserva al menos el mejor. Los empates respetan el orden original.
+
+        Returns:
+            (IDs seleccionados en el orden original, puntuaciones por agente)
+        """
+        scores = self.score(query, agents)
+        order = {agent.profile.agent_id: index for index, agent in enumerate(agents)}
+        ranked = sorted(scores, key=lambda agent_id: (-scores[agent_id], order[agent_id]))
+
+        chosen = {
+            agent_id for agent_id in ranked[:max(1, top_k)]
+            if scores[agent_id] >= min_score
+        } or set(ranked[:1])
+        selected = [agent.profile.agent_id for agent in agents if agent.profile.agent_id in chosen]
+
+        self.stats["routed_queries"] += 1
+        self.stats["candidates"] += len(agents)
+        self.stats["selected"] += len(selected)
+        return selected, {agent_id: round(score, 4) for agent_id, score in scores.items()}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "cached_profiles": len(self._profile_terms),
+        }
+
+
+# Enrutador global
+query_router = QueryRouter()
@@ -0,0 +1,256 @@
+"""
+Rate Limiter - ATP
+Limitador adaptativo por proveedor y API key (token bucket)
+
+Cada combinación (provider, API key) tiene dos buckets: peticiones por
+minuto (RPM) y tokens por minuto (TPM). Las llamadas esperan su turno en
+orden FIFO en lugar de fallar, y los buckets se ajustan con las cabeceras
+`x-ratelimit-*` y `Retry-After` que devuelve el proveedor.
+"""
+from typing import Dict, Any, Optional, Tuple, Mapping
+from collections import OrderedDict
+import asyncio
+import re
+import time
+
+from app.config import RATE_LIMITS, LLM_MAX_TRACKED_KEYS
+
+
+# Aproximación de caracteres por token para estimaciones sin tokenizer
+CHARS_PER_TOKEN = 4
+
+
+class TokenBucket:
+    """Token bucket clásico: capacidad fija y recarga continua"""
+
+    __slots__ = ("capacity", "refill_per_second", "tokens", "updated")
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+            self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Segundos hasta que haya `amount` tokens disponibles"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float) -> None:
+        """Consume tokens (puede quedar negativo al reconciliar uso real)"""
+        self.tokens -= amount
+
+    def sync(self, remaining: float, now: float) -> None:
+        """Ajusta los tokens disponibles a lo que informa el proveedor"""
+        self._refill(now)
+        self.tokens = min(self.tokens, remaining)
+
+
+def _parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Convierte una duración de cabecera a segundos.
+    Acepta "12", "1.5", "250ms", "7.66s", "2m59.56s", "1h2m".
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value):
+        matched = True
+        amount = float(amount)
+        if unit == "ms":
+            total += amount / 1000
+        elif unit == "s":
+            total += amount
+        elif unit == "m":
+            total += amount * 60
+        elif unit == "h":
+            total += amount * 3600
+    return total if matched else None
+
+
+def get_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Lee Retry-After / retry-after-ms de las cabeceras de una respuesta"""
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    return _parse_duration(headers.get("retry-after"))
+
+
+def estimate_tokens(messages: Any, max_tokens: int) -> int:
+    """
+    Estimación de tokens de una llamada (~4 caracteres por token).
+    La parte de completion se acota para no reservar `max_tokens` completo;
+    el uso real se reconcilia al terminar la llamada.
+    """
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in messages)
+    return prompt_chars // CHARS_PER_TOKEN + min(max_tokens, 1024)
+
+
+class ProviderRateLimiter:
+    """
+    Limitador de una combinación (provider, API key).
+
+    - `acquire` espera hasta que hay cuota de peticiones y tokens
+    - `record_usage` reconcilia la estimación con el uso real
+    - `update_from_headers` sincroniza con las cabeceras del proveedor
+    - `on_rate_limited` bloquea el limitador tras un HTTP 429
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm, rpm / 60.0)
+        self.tokens = TokenBucket(tpm, tpm / 60.0)
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self.stats = {
+            "requests": 0,
+            "rate_limited": 0,
+            "waits": 0,
+            "total_wait_ms": 0.0,
+        }
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """Espera (en orden de llegada) hasta que la llamada cabe en la cuota"""
+        async with self._lock:
+            waited = 0.0
+            while True:
+                now = time.monotonic()
+                wait = max(
+                    self.blocked_until - now,
+                    self.requests.wait_time(1, now),
+                    self.tokens.wait_time(estimated_tokens, now),
+                )
+                if wait <= 0:
+                    break
+                waited += wait
+                await asyncio.sleep(wait)
+
+            self.requests.consume(1)
+            self.tokens.consume(min(estimated_tokens, self.tokens.capacity))
+            self.stats["requests"] += 1
+            if waited > 0:
+                self.stats["waits"] += 1
+                self.stats["total_wait_ms"] += waited * 1000
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Ajusta el bucket de tokens con el uso real de la llamada"""
+        if actual_tokens is None:
+            return
+        estimated = min(estimated_tokens, self.tokens.capacity)
+        self.tokens.consume(actual_tokens - estimated)
+
+    def update_from_headers(self, headers: Optional[Mapping[str, str]]) -> None:
+        """Sincroniza los buckets con las cabeceras x-ratelimit-* del proveedor"""
+        if not headers:
+            return
+        now = time.monotonic()
+        for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                continue
+            bucket.sync(remaining, now)
+            if remaining <= 0:
+                reset = _parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if reset:
+                    self.blocked_until = max(self.blocked_until, now + reset)
+
+    def on_rate_limited(self, retry_after: Optional[float], attempt: int) -> float:
+        """
+        Registra un HTTP 429 y bloquea el limitador.
+        Sin Retry-After usa backoff exponencial. Retorna la espera aplicada.
+        """
+        self.stats["rate_limited"] += 1
+        delay = retry_after if retry_after is not None else min(2 ** attempt, 30)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        return delay
+
+    @property
+    def idle(self) -> bool:
+        """Sin llamadas esperando cuota ni bloqueo por 429 vigente"""
+        return not self._lock.locked() and self.blocked_until <= time.monotonic()
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            **self.stats,
+            "rpm": self.requests.capacity,
+            "tpm": self.tokens.capacity,
+            "available_requests": round(self.requests.tokens, 2),
+            "available_tokens": round(self.tokens.tokens, 2),
+            "blocked_for_ms": max(0.0, (self.blocked_until - now) * 1000),
+        }
+
+
+class RateLimiterRegistry:
+    """
+    Limitadores por (provider, hash de API key), creados bajo demanda.
+
+    LRU acotado a `max_keys`: al superarlo se descartan los limitadores
+    inactivos usados hace más tiempo.
+    """
+
+    def __init__(self, limits: Dict[str, Dict[str, int]], max_keys: int = 1024):
+        self.limits = limits
+        self.max_keys = max(1, max_keys)
+        self._limiters: "OrderedDict[Tuple[str, str], ProviderRateLimiter]" = OrderedDict()
+
+    def get(self, provider: str, key_hash: str) -> Optional[ProviderRateLimiter]:
+        """Retorna el limitador o None si el proveedor no tiene límites"""
+        key = (provider, key_hash)
+        limiter = self._limiters.get(key)
+        if limiter is not None:
+            self._limiters.move_to_end(key)
+            return limiter
+
+        limits = self.limits.get(provider, self.limits.get("default"))
+        if not limits:
+            return None
+        limiter = self._limiters[key] = ProviderRateLimiter(rpm=limits["rpm"], tpm=limits["tpm"])
+        self._evict(keep=key)
+        return limiter
+
+    def _evict(self, keep: Tuple[str, str]) -> None:
+        """
+        Descarta limitadores inactivos (los más antiguos) por encima del límite.
+        `keep` (el recién creado, aún sin uso) nunca se descarta.
+        """
+        excess = len(self._limiters) - self.max_keys
+        if excess <= 0:
+            return
+        idle = [key for key, limiter in self._limiters.items() if key != keep and limiter.idle]
+        for key in idle[:excess]:
+            del self._limiters[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            f"{provider}:{key_hash}": limiter.get_stats()
+            for (provider, key_hash), limiter in self._limiters.items()
+        }
+
+
+# Registro global de limitadores
+rate_limiters = RateLimiterRegistry(RATE_LIMITS, max_keys=LLM_MAX_TRACKED_KEYS)
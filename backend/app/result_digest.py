@@ -0,0 +1,210 @@
+"""
+Result Digest - ATP
+Resúmenes compactos de los resultados de los agentes
+
+Cada agente completado produce un digest estructurado y acotado en tamaño
+que se guarda una sola vez por conversación. Los mensajes A2A de los
+agentes posteriores solo llevan los IDs de los resultados previos, de modo
+que la memoria por mensaje y los tokens de prompt no crecen con la
+longitud del pipeline.
+"""
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+
+from app.config import (
+    RESULT_DIGEST_MAX_CHARS,
+    RESULT_DIGEST_MAX_CONVERSATIONS,
+    RESULT_DIGEST_MAX_TOTAL_CHARS,
+)
+
+# Por debajo de este espacio restante un digest se descarta en lugar de recortarse
+_MIN_DIGEST_CHARS = 200
+# Cabecera "[agente (resumen)]" y separadores de cada bloque
+_BLOCK_OVERHEAD_CHARS = len("[ (resumen)]\n") + 2
+# Reserva para el separador inicial y la nota de digests omitidos
+_OMITTED_NOTE_CHARS = 64
+
+
+# Claves que contienen el texto principal en los resultados de los agentes
+# (orden de preferencia). Si no hay ninguna, se usa el string más largo.
+MAIN_TEXT_KEYS = (
+    "response",
+    "result",
+    "content",
+    "analysis",
+    "summary",
+    "synthesis",
+    "research",
+    "plan",
+    "review",
+    "explanation",
+    "evaluation",
+    "strategy",
+    "solutions",
+    "code",
+    "architecture",
+    "documentation",
+    "translation",
+    "formatted_content",
+    "creative_output",
+    "communication",
+    "coordination_plan",
+    "integration_design",
+    "optimization_plan",
+    "qa_plan",
+    "security_analysis",
+    "validation_result",
+)
+
+# Claves de metadata que no aportan al texto del resultado
+_METADATA_KEYS = {"agent", "agent_id", "confidence", "timestamp", "model"}
+
+
+def extract_result_text(result: Any) -> str:
+    """
+    Extrae el texto principal de un resultado de agente.
+
+    Los resultados dict se reducen a su campo de texto principal en lugar
+    de volcar el dict completo con `str()`.
+    """
+    if result is None:
+        return ""
+    if isinstance(result, str):
+        return result
+    if isinstance(result, dict):
+        for key in MAIN_TEXT_KEYS:
+            value = result.get(key)
+            if isinstance(value, str) and value.strip():
+                return value
+        candidates = [
+            value for key, value in result.items()
+            if key not in _METADATA_KEYS and isinstance(value, str)
+        ]
+        if candidates:
+            return max(candidates, key=len)
+    return str(result)
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    """Recorta el texto en un límite de palabra"""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0] or text[:max_chars]
+    return cut.rstrip() + "…"
+
+
+def build_digest(
+    agent_id: str,
+    result: Any,
+    agent_name: Optional[str] = None,
+    max_chars: int = RESULT_DIGEST_MAX_CHARS
+) -> Dict[str, Any]:
+    """
+    Construye el digest de un resultado.
+
+    Returns:
+        {"agent_id", "agent", "summary", "chars", "truncated", "fields"}
+    """
+    text = extract_result_text(result)
+    summary = _truncate(text, max_chars)
+    digest = {
+        "agent_id": agent_id,
+        "agent": agent_name or agent_id,
+        "summary": summary,
+        "chars": len(text),
+        "truncated": len(summary) < len(text),
+        "fields": [],
+    }
+    if isinstance(result, dict):
+        # Se conservan los nombres de campo y la confianza declarada
+        digest["fields"] = sorted(result.keys())
+        digest["confidence"] = result.get("confidence")
+    return digest
+
+
+def format_previous_results(
+    digests: Dict[str, Dict[str, Any]],
+    max_total_chars: int = RESULT_DIGEST_MAX_TOTAL_CHARS
+) -> str:
+    """
+    Texto de prompt con los digests de los agentes previos (uno por bloque).
+
+    El texto total no supera `max_total_chars`: se priorizan los digests más
+    recientes (los últimos del dict); el que no cabe entero se recorta y
+    los más antiguos se omiten.
+    """
+    blocks: List[str] = []
+    remaining = max_total_chars - _OMITTED_NOTE_CHARS
+    omitted = 0
+    for digest in reversed(list(digests.values())):
+        summary = digest["summary"]
+        truncated = digest.get("truncated", False)
+        room = remaining - len(digest["agent"]) - _BLOCK_OVERHEAD_CHARS
+        if room < min(_MIN_DIGEST_CHARS, len(summary)):
+            omitted += 1
+            continue
+        if len(summary) > room:
+            summary, truncated = _truncate(summary, room - 1), True
+        block = f"[{digest['agent']}{' (resumen)' if truncated else ''}]\n{summary}"
+        blocks.append(block)
+        remaining -= len(block) + 2
+    blocks.reverse()
+    if omitted:
+        blocks.insert(0, f"[{omitted} resultados anteriores omitidos por longitud]")
+    return "\n\n" + "\n\n".join(blocks)
+
+
+class ResultDigestStore:
+    """
+    Almacén de digests por conversación (LRU acotado por conversaciones).
+
+    Cada digest se guarda una vez; los mensajes A2A lo referencian por
+    el ID del agente que lo produjo.
+    """
+
+    def __init__(self, max_conversations: int = 256):
+        self.max_conversations = max(1, max_conversations)
+        self._conversations: "OrderedDict[str, Dict[str, Dict[str, Any]]]" = OrderedDict()
+        self.stats = {
+            "stored": 0,
+            "lookups": 0,
+            "evicted_conversations": 0,
+        }
+
+    def put(self, conversation_id: str, digest: Dict[str, Any]) -> None:
+        """Guarda el digest de un agente en su conversación"""
+        digests = self._conversations.get(conversation_id)
+        if digests is None:
+            digests = self._conversations[conversation_id] = {}
+            while len(self._conversations) > self.max_conversations:
+                self._conversations.popitem(last=False)
+                self.stats["evicted_conversations"] += 1
+        else:
+            self._conversations.move_to_end(conversation_id)
+        digests[digest["agent_id"]] = digest
+        self.stats["stored"] += 1
+
+    def get_many(self, conversation_id: str, agent_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Resuelve una lista de IDs a sus digests (ignora los desconocidos)"""
+        self.stats["lookups"] += 1
+        digests = self._conversations.get(conversation_id) or {}
+        return {
+            agent_id: digests[agent_id]
+            for agent_id in agent_ids
+            if agent_id in digests
+        }
+
+    def discard(self, conversation_id: str) -> None:
+        """Libera los digests de una conversación terminada"""
+        self._conversations.pop(conversation_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "conversations": len(self._conversations),
+            "max_conversations": self.max_conversations,
+        }
+
+
+# Almacén global de digests
+result_digests = ResultDigestStore(max_conversations=RESULT_DIGEST_MAX_CONVERSATIONS)
@@ -0,0 +1,80 @@
+"""
+Streaming de eventos - ATP
+Canal de eventos por request para enviar tokens y progreso vía SSE
+
+El canal activo se propaga con un `ContextVar`, de modo que
+`BaseAgent.call_llm` y el orquestador pueden emitir eventos sin que el
+canal tenga que atravesar todas las firmas intermedias.
+"""
+from typing import Dict, Any, Optional, Tuple, AsyncIterator
+from contextvars import ContextVar, Token
+import asyncio
+import json
+
+
+class EventChannel:
+    """
+    Canal de eventos de un request.
+
+    Los productores (agentes, orquestador) llaman a `emit` de forma
+    síncrona; el consumidor (endpoint SSE) itera `events()`.
+    """
+
+    # Si es False, los agentes no usan streaming LLM (solo eventos de progreso)
+    wants_tokens = True
+
+    def __init__(self):
+        self._queue: "asyncio.Queue[Optional[Tuple[str, Dict[str, Any]]]]" = asyncio.Queue()
+        self.closed = False
+
+    def emit(self, event: str, data: Dict[str, Any]) -> None:
+        """Encola un evento (ignorado si el canal ya se cerró)"""
+        if not self.closed:
+            self._queue.put_nowait((event, data))
+
+    def close(self) -> None:
+        """Marca el fin del stream"""
+        if not self.closed:
+            self.closed = True
+            self._queue.put_nowait(None)
+
+    async def events(self) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Itera los eventos hasta que el canal se cierra"""
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            yield item
+
+
+# Canal activo en el contexto actual (None fuera de un request streaming)
+_current_channel: ContextVar[Optional[EventChannel]] = ContextVar(
+    "atp_event_channel", default=None
+)
+
+
+def get_event_channel() -> Optional[EventChannel]:
+    """Obtiene el canal de eventos activo, si existe"""
+    return _current_channel.get()
+
+
+def bind_event_channel(channel: Optional[EventChannel]) -> Token:
+    """Activa un canal en el contexto actual"""
+    return _current_channel.set(channel)
+
+
+def reset_event_channel(token: Token) -> None:
+    """Restaura el canal anterior"""
+    _current_channel.reset(token)
+
+
+def emit_event(event: str, data: Dict[str, Any]) -> None:
+    """Emite un evento en el canal activo (no-op si no hay canal)"""
+    channel = _current_channel.get()
+    if channel is not None:
+        channel.emit(event, data)
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Serializa un evento en formato Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
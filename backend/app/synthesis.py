@@ -0,0 +1,270 @@
+"""
+Synthesis Engine - ATP
+Síntesis jerárquica (map-reduce) de los resultados de los agentes
+
+Sin `context.synthesis.strategy` (o con "concat") los resultados se
+concatenan por agente, sin llamadas LLM. Con una estrategia del editor de
+nodos (hierarchical, chronological, evidence, conflict) un LLM integra los
+resultados en como máximo `maxSections` secciones:
+
+1. Si todos los resultados caben en el presupuesto de tokens por llamada,
+   una única llamada de reducción.
+2. Si no, se agrupan en bloques que caben en el presupuesto, cada bloque
+   se resume en paralelo y se repite sobre los resúmenes hasta que caben
+   en la llamada final.
+
+Cada nivel divide el número de textos por el tamaño de los grupos: la
+latencia crece con log(agentes) y ninguna llamada excede el presupuesto.
+"""
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+
+from app.config import (
+    SYNTHESIS_TOKEN_BUDGET,
+    SYNTHESIS_SUMMARY_TOKENS,
+    SYNTHESIS_FINAL_TOKENS,
+)
+from app.llm_providers import chat_completion
+from app.rate_limiter import CHARS_PER_TOKEN
+
+
+# Instrucción de cada estrategia del nodo de síntesis
+STRATEGY_INSTRUCTIONS = {
+    "hierarchical": "Integra los aportes de mayor a menor relevancia y fusiona las ideas repetidas.",
+    "chronological": "Respeta el orden en que los agentes aportaron la información.",
+    "evidence": (
+        "Da más peso a las afirmaciones respaldadas por varios agentes o con evidencia "
+        "explícita y señala las que carecen de respaldo."
+    ),
+    "conflict": (
+        "Identifica las contradicciones entre agentes y resuélvelas explicando el criterio."
+    ),
+}
+
+TONE_INSTRUCTIONS = {
+    "executive": "ejecutivo y conciso",
+    "technical": "técnico y preciso",
+    "creative": "creativo y cercano",
+    "analytical": "analítico y estructurado",
+}
+
+# Tokens reservados para las instrucciones de cada llamada
+_PROMPT_OVERHEAD_TOKENS = 300
+
+_SYSTEM_PROMPT = (
+    "Eres el motor de síntesis de un sistema multi-agente. Integras los aportes "
+    "de agentes especializados sin inventar información que no aparezca en ellos."
+)
+
+Section = Tuple[str, str]
+
+
+def estimate_text_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def concatenate_sections(sections: List[Section]) -> str:
+    """Un bloque markdown por agente (síntesis sin LLM)"""
+    return "\n".join(f"**{title}:**\n{text}\n" for title, text in sections)
+
+
+class SynthesisEngine:
+    """
+    Motor de síntesis de los resultados de una ejecución.
+
+    - `get_config`: configuración de `context.synthesis` (None = concatenar)
+    - `synthesize`: concatena o ejecuta la síntesis map-reduce con el LLM
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 6000,
+        summary_tokens: int = 700,
+        final_tokens: int = 2000
+    ):
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.final_tokens = final_tokens
+        self.stats = {
+            "concatenated": 0,
+            "llm_syntheses": 0,
+            "llm_calls": 0,
+            "max_depth": 0,
+            "fallbacks": 0,
+        }
+
+    def get_config(self, context: Any) -> Optional[Dict[str, Any]]:
+        """
+        Normaliza `context.synthesis` del editor de nodos.
+
+        Retorna None si no hay estrategia (o es "concat"): se concatena.
+        """
+        synthesis_config = context.get("synthesis") if isinstance(context, dict) else None
+        if not isinstance(synthesis_config, dict):
+            return None
+        strategy = synthesis_config.get("strategy")
+        if not strategy or strategy == "concat":
+            return None
+
+        try:
+            max_sections = max(1, min(int(synthesis_config.get("maxSections") or 4), 12))
+        except (TypeError, ValueError):
+            max_sections = 4
+        try:
+            token_budget = int(synthesis_config.get("tokenBudget") or self.token_budget)
+        except (TypeError, ValueError):
+            token_budget = self.token_budget
+        # Mínimo para que cada nivel agrupe al menos dos resúmenes
+        token_budget = max(token_budget, _PROMPT_OVERHEAD_TOKENS + 4 * self.summary_tokens)
+
+        return {
+            "strategy": strategy,
+            "instruction": STRATEGY_INSTRUCTIONS.get(strategy, STRATEGY_INSTRUCTIONS["hierarchical"]),
+            "tone": TONE_INSTRUCTIONS.get(synthesis_config.get("tone"), TONE_INSTRUCTIONS["executive"]),
+            "max_sections": max_sections,
+            "include_trace": bool(synthesis_config.get("includeTrace", False)),
+            "token_budget": token_budget,
+        }
+
+    async def synthesize(
+        self,
+        query: str,
+        sections: List[Section],
+        context: Any,
+        model: Optional[str] = None,
+        api_config: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Sintetiza los resultados (título del agente, texto).
+
+        Si la síntesis con LLM falla, se recurre a la concatenación.
+        """
+        config = self.get_config(context)
+        if config is None or not sections:
+            self.stats["concatenated"] += 1
+            return concatenate_sections(sections)
+
+        try:
+            result = await self._map_reduce(query, sections, config, model, api_config)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["fallbacks"] += 1
+            print(f"⚠️ Síntesis LLM fallida, se concatenan los resultados: {e}")
+            return concatenate_sections(sections)
+
+        self.stats["llm_syntheses"] += 1
+        if config["include_trace"]:
+            result += f"\n\n📎 **Fuentes:** {', '.join(title for title, _ in sections)}"
+        return result
+
+    async def _map_reduce(
+        self,
+        query: str,
+        sections: List[Section],
+        config: Dict[str, Any],
+        model: Optional[str],
+        api_config: Optional[Dict[str, Any]]
+    ) -> str:
+        content_budget = config["token_budget"] - _PROMPT_OVERHEAD_TOKENS
+        texts = [self._fit(f"### {title}\n{text}", content_budget) for title, text in sections]
+
+        depth = 0
+        while len(texts) > 1 and sum(estimate_text_tokens(text) for text in texts) > content_budget:
+            groups = self._group(texts, content_budget)
+            texts = await asyncio.gather(*(
+                self._summarize_group(query, group, config, model, api_config)
+                for group in groups
+            ))
+            depth += 1
+            print(f"🧬 Síntesis nivel {depth}: {len(groups)} grupos resumidos en paralelo")
+        self.stats["max_depth"] = max(self.stats["max_depth"], depth)
+
+        return await self._call(
+            f"Consulta del usuario: {query}\n\n"
+            f"Redacta la respuesta final integrando los aportes siguientes en como máximo "
+            f"{config['max_sections']} secciones con encabezados markdown. "
+            f"Tono {config['tone']}. {config['instruction']}\n\n"
+            + "\n\n".join(texts),
+            self.final_tokens,
+            model,
+            api_config,
+        )
+
+    async def _summarize_group(
+        self,
+        query: str,
+        group: List[str],
+        config: Dict[str, Any],
+        model: Optional[str],
+        api_config: Optional[Dict[str, Any]]
+    ) -> str:
+        summary = await self._call(
+            f"Consulta del usuario: {query}\n\n"
+            f"Resume e integra los aportes siguientes en un máximo de {self.summary_tokens} "
+            f"tokens. Conserva datos concretos, conclusiones y desacuerdos, e indica entre "
+            f"corchetes el agente de origen. {config['instruction']}\n\n"
+            + "\n\n".join(group),
+            self.summary_tokens,
+            model,
+            api_config,
+        )
+        return self._fit(summary, self.summary_tokens)
+
+    async def _call(
+        self,
+        prompt: str,
+        max_tokens: int,
+        model: Optional[str],
+        api_config: Optional[Dict[str, Any]]
+    ) -> str:
+        self.stats["llm_calls"] += 1
+        return await chat_completion(
+            messages=[
+                {"role": "system", "content": _SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            model=model,
+            api_config=api_config,
+            temperature=0.3,
+            max_tokens=max_tokens,
+        )
+
+    @staticmethod
+    def _fit(text: str, max_tokens: int) -> str:
+        """Recorta un texto para que quepa en `max_tokens`"""
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        return text[:max_chars - 16].rstrip() + "\n…[truncado]"
+
+    @staticmethod
+    def _group(texts: List[str], max_tokens: int) -> List[List[str]]:
+        """Agrupa textos consecutivos en bloques de como máximo `max_tokens`"""
+        groups: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for text in texts:
+            tokens = estimate_text_tokens(text)
+            if current and current_tokens + tokens > max_tokens:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "token_budget": self.token_budget,
+        }
+
+
+# Motor global de síntesis
+synthesis_engine = SynthesisEngine(
+    token_budget=SYNTHESIS_TOKEN_BUDGET,
+    summary_tokens=SYNTHESIS_SUMMARY_TOKENS,
+    final_tokens=SYNTHESIS_FINAL_TOKENS,
+)
@@ -0,0 +1,106 @@
+"""
+Benchmark: codec A2A (msgpack / orjson) vs `model_dump_json` de pydantic
+
+Mide mensajes por segundo al codificar y decodificar un mensaje A2A con un
+payload anidado y un resultado de agente grande, y el tamaño resultante.
+Con el resultado grande, decodificar no es más rápido que pydantic: la
+ganancia del codec está en codificar (ver el docstring de app.a2a_codec).
+
+Uso (desde backend/):
+    python -m benchmarks.bench_a2a_codec
+"""
+import timeit
+
+from app.a2a_codec import decode_json, decode_msgpack, encode_json, encode_msgpack
+from app.a2a_protocol import (
+    A2AMessage,
+    A2AResponse,
+    A2AMessageRecord,
+    A2AResponseRecord,
+    AgentCapability,
+    MessageType,
+    Priority,
+)
+
+
+ITERATIONS = 5000
+
+AGENT_TEXT = "El análisis de mercado indica un crecimiento sostenido del sector. " * 300
+
+
+def build_message() -> A2AMessage:
+    return A2AMessage(
+        message_type=MessageType.REQUEST,
+        priority=Priority.HIGH,
+        sender_id="orchestrator",
+        sender_capability=AgentCapability.REASONING,
+        recipient_id="analysis_expert_001",
+        recipient_capabilities=[AgentCapability.ANALYSIS, AgentCapability.DATA_ANALYSIS],
+        subject="Task Execution Request for analysis_expert_001",
+        payload={
+            "task": "Analiza el mercado de energía solar en España",
+            "context": {
+                "agentsCluster": {"selectedAgents": ["analysis", "research", "planning"]},
+                "synthesis": {"strategy": "hierarchical", "maxSections": 4},
+                "history": [{"role": "user", "content": f"mensaje {i}"} for i in range(20)],
+            },
+            "previous_result_ids": ["research_senior_001", "planning_strategist_001"],
+        },
+        conversation_id="bench",
+    )
+
+
+def build_response(message: A2AMessage) -> A2AResponse:
+    return A2AResponse(
+        original_message_id=message.message_id,
+        conversation_id="bench",
+        responder_id="analysis_expert_001",
+        responder_capability=AgentCapability.ANALYSIS,
+        success=True,
+        result={"response": AGENT_TEXT, "confidence": 0.9, "sources": ["a", "b", "c"]},
+        processing_time_ms=1520.5,
+        confidence=0.9,
+    )
+
+
+def per_second(fn) -> float:
+    best = min(timeit.repeat(fn, number=ITERATIONS, repeat=3))
+    return ITERATIONS / best
+
+
+def bench(label: str, obj, record) -> None:
+    model = type(obj)
+    as_json = obj.model_dump_json().encode()
+    packed = encode_msgpack(obj)
+    encoded_json = encode_json(obj)
+
+    rows = [
+        ("pydantic", as_json,
+         lambda: obj.model_dump_json(), lambda: model.model_validate_json(as_json)),
+        ("orjson", encoded_json,
+         lambda: encode_json(obj), lambda: decode_json(encoded_json)),
+        ("msgpack", packed,
+         lambda: encode_msgpack(obj), lambda: decode_msgpack(packed)),
+        ("msgpack (record)", packed,
+         lambda: encode_msgpack(record), lambda: decode_msgpack(memoryview(packed), as_record=True)),
+    ]
+
+    print(f"\n📨 {label}")
+    print(f"{'formato':<16} {'bytes':>8} {'encode/s':>12} {'decode/s':>12}")
+    for name, data, encode, decode in rows:
+        print(f"{name:<16} {len(data):>8} {per_second(encode):>12,.0f} {per_second(decode):>12,.0f}")
+
+
+def main() -> None:
+    message = build_message()
+    response = build_response(message)
+    bench("A2AMessage (payload anidado)", message, A2AMessageRecord.from_pydantic(message))
+    bench(
+        f"A2AResponse (resultado de {len(AGENT_TEXT) // 1024} KB)",
+        response,
+        A2AResponseRecord.from_pydantic(response),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Tests del codec A2A (msgpack / orjson)
+"""
+import pytest
+
+from app.a2a_codec import (
+    CODEC_VERSION,
+    A2ACodecError,
+    decode_json,
+    decode_msgpack,
+    encode_json,
+    encode_msgpack,
+)
+from app.a2a_protocol import (
+    A2AMessage,
+    A2AMessageRecord,
+    A2AResponse,
+    A2AResponseRecord,
+    AgentCapability,
+    MessageType,
+    Priority,
+)
+
+pytest.importorskip("ormsgpack")
+orjson = pytest.importorskip("orjson")
+
+CODECS = [(encode_msgpack, decode_msgpack), (encode_json, decode_json)]
+
+
+def _message() -> A2AMessage:
+    return A2AMessage(
+        message_type=MessageType.REQUEST,
+        priority=Priority.HIGH,
+        sender_id="orchestrator",
+        sender_capability=AgentCapability.REASONING,
+        recipient_id="analysis_expert_001",
+        recipient_capabilities=[AgentCapability.ANALYSIS, AgentCapability.DATA_ANALYSIS],
+        subject="Task",
+        payload={"task": "Analiza el mercado", "context": {"history": [{"role": "user", "content": "hola"}]}},
+        conversation_id="c1",
+    )
+
+
+def _response(message: A2AMessage) -> A2AResponse:
+    return A2AResponse(
+        original_message_id=message.message_id,
+        conversation_id="c1",
+        responder_id="analysis_expert_001",
+        responder_capability=AgentCapability.ANALYSIS,
+        success=True,
+        result={"response": "ok", "sources": ["a", "b"]},
+        processing_time_ms=12.5,
+        confidence=0.9,
+    )
+
+
+@pytest.mark.parametrize("encode,decode", CODECS)
+def test_pydantic_round_trip(encode, decode):
+    message = _message()
+    response = _response(message)
+    assert decode(encode(message)) == message
+    assert decode(encode(response)) == response
+
+
+@pytest.mark.parametrize("encode,decode", CODECS)
+def test_record_round_trip_keeps_created_at(encode, decode):
+    record = A2AMessageRecord.from_pydantic(_message())
+    record.created_at = 1767261600.1234567
+    decoded = decode(encode(record), as_record=True)
+    assert isinstance(decoded, A2AMessageRecord)
+    assert decoded.created_at == record.created_at
+    assert decoded.priority is Priority.HIGH
+    assert decoded.recipient_capabilities == [AgentCapability.ANALYSIS, AgentCapability.DATA_ANALYSIS]
+    assert decoded.payload == record.payload
+
+    response = A2AResponseRecord.from_pydantic(_response(_message()))
+    response.created_at = 1767261600.9876543
+    decoded = decode(encode(response), as_record=True)
+    assert decoded.created_at == response.created_at
+    assert decoded.result == response.result
+
+
+@pytest.mark.parametrize("encode,decode", CODECS)
+def test_record_decodes_as_pydantic(encode, decode):
+    message = _message()
+    decoded = decode(encode(A2AMessageRecord.from_pydantic(message)))
+    assert isinstance(decoded, A2AMessage)
+    assert decoded.message_id == message.message_id
+    assert decoded.timestamp == message.timestamp
+
+
+def test_unsupported_documents():
+    with pytest.raises(A2ACodecError):
+        encode_json({"not": "a2a"})
+    with pytest.raises(A2ACodecError):
+        decode_json(b"{not json")
+    with pytest.raises(A2ACodecError):
+        decode_msgpack(b"\xc1")
+    with pytest.raises(A2ACodecError):
+        decode_json(orjson.dumps({"version": CODEC_VERSION}))
+    with pytest.raises(A2ACodecError, match="version"):
+        decode_json(orjson.dumps([CODEC_VERSION + 1, "message", {}]))
+    with pytest.raises(A2ACodecError, match="kind"):
+        decode_json(orjson.dumps([CODEC_VERSION, "event", {}]))
+
+
+@pytest.mark.parametrize("as_record", [False, True])
+def test_invalid_data_raises_codec_error(as_record):
+    document = orjson.loads(encode_json(_message()))
+    document[2]["priority"] = "urgentísima"
+    with pytest.raises(A2ACodecError):
+        decode_json(orjson.dumps(document), as_record=as_record)
+
+    document = orjson.loads(encode_json(_message()))
+    del document[2]["sender_id"]
+    with pytest.raises(A2ACodecError):
+        decode_json(orjson.dumps(document), as_record=as_record)
@@ -0,0 +1,27 @@
+"""
+Tests del plazo por agente (`a2aResponsesCollector.timeoutMs`)
+"""
+from app.config import AGENT_TIMEOUT_MIN_SECONDS, AGENT_TIMEOUT_SECONDS
+from app.orchestrator import AgentOrchestrator
+
+
+def _timeout(timeout_ms):
+    return AgentOrchestrator._get_agent_timeout({"a2aResponsesCollector": {"timeoutMs": timeout_ms}})
+
+
+def test_default_timeout_without_collector():
+    assert AgentOrchestrator._get_agent_timeout({}) == AGENT_TIMEOUT_SECONDS
+    assert _timeout(None) == AGENT_TIMEOUT_SECONDS
+    assert _timeout("rápido") == AGENT_TIMEOUT_SECONDS
+    assert _timeout(-5000) == AGENT_TIMEOUT_SECONDS
+
+
+def test_timeout_ms_can_tighten_and_extend():
+    tighter = (AGENT_TIMEOUT_MIN_SECONDS + 5) * 1000
+    assert tighter < AGENT_TIMEOUT_SECONDS * 1000
+    assert _timeout(tighter) == AGENT_TIMEOUT_MIN_SECONDS + 5
+    assert _timeout((AGENT_TIMEOUT_SECONDS + 60) * 1000) == AGENT_TIMEOUT_SECONDS + 60
+
+
+def test_timeout_ms_has_floor():
+    assert _timeout(8000) == AGENT_TIMEOUT_MIN_SECONDS
@@ -0,0 +1,77 @@
+"""
+Tests del endpoint de streaming
+"""
+import asyncio
+import json
+
+import app.agents.base_agent as base_agent
+import app.orchestrator as orchestrator_module
+from app.main import chat_stream
+from app.models import ChatRequest
+
+
+def test_stream_disconnect_waits_for_cancelled_run(monkeypatch):
+    cancelled = []
+
+    async def slow_stream(messages, **kwargs):
+        try:
+            await asyncio.sleep(30)
+            yield "tarde"
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    monkeypatch.setattr(base_agent, "chat_completion_stream", slow_stream)
+
+    async def run():
+        request = ChatRequest(message="hola", agents=["reasoning"], context={"incremental": False})
+        events = (await chat_stream(request)).body_iterator
+        first = await events.__anext__()
+        while "agent_started" not in first:
+            first = await events.__anext__()
+        # Cliente desconectado: Starlette cierra el generador de eventos
+        await events.aclose()
+        return list(cancelled)
+
+    assert asyncio.run(run()) == [True]
+
+
+def _parse_sse(chunk: str):
+    event_line, data_line = chunk.strip().split("\n", 1)
+    return event_line[len("event: "):], json.loads(data_line[len("data: "):])
+
+
+def test_retry_tells_the_client_to_discard_streamed_tokens(monkeypatch):
+    attempts = []
+
+    async def flaky_stream(messages, **kwargs):
+        attempts.append(True)
+        yield "parcial "
+        if len(attempts) == 1:
+            raise RuntimeError("conexión cortada")
+        yield "completo"
+
+    monkeypatch.setattr(base_agent, "chat_completion_stream", flaky_stream)
+    monkeypatch.setattr(orchestrator_module, "AGENT_RETRY_BASE_DELAY", 0)
+
+    async def run():
+        request = ChatRequest(message="hola", agents=["reasoning"], context={"incremental": False})
+        return [_parse_sse(chunk) async for chunk in (await chat_stream(request)).body_iterator]
+
+    events = asyncio.run(run())
+    names = [name for name, _ in events]
+
+    retry = next(data for name, data in events if name == "agent_retry")
+    assert retry["agent_id"] == "reasoning_master_001" and retry["attempt"] == 1
+    assert names.index("agent_retry") > names.index("token")
+
+    # Cliente: `agent_retry` reinicia el texto acumulado del agente
+    text = ""
+    for name, data in events:
+        if name == "token":
+            text += data["content"]
+        elif name == "agent_retry":
+            text = ""
+    completed = next(data for name, data in events if name == "agent_completed")
+    assert text == "parcial completo"
+    assert completed["success"] and completed["result"] == text
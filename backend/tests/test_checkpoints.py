@@ -0,0 +1,52 @@
+"""
+Tests de la propiedad de los checkpoints (conversation_id ligado a la API key)
+"""
+import asyncio
+
+import pytest
+
+import app.agents.base_agent as base_agent
+import app.orchestrator as orchestrator_module
+from app.agents.registry import agent_registry
+from app.checkpoints import CheckpointStore, checkpoint_owner
+from app.orchestrator import AgentOrchestrator
+
+
+def test_checkpoint_owner_hashes_api_key():
+    owner = checkpoint_owner({"type": "groq", "api_key": "secret"})
+    assert owner and "secret" not in owner
+    assert owner == checkpoint_owner({"type": "openai", "api_key": "secret"})
+    assert checkpoint_owner(None) == ""
+
+
+def test_other_owner_cannot_wipe_or_resume(monkeypatch, tmp_path):
+    async def fake_chat_completion(messages, **kwargs):
+        return "respuesta"
+
+    monkeypatch.setattr(base_agent, "chat_completion", fake_chat_completion)
+    agents = agent_registry.build(["reasoning"], model="m")
+    context = {"incremental": False}
+
+    async def scenario():
+        store = CheckpointStore(str(tmp_path / "ck.sqlite"), enabled=True)
+        await store.start()
+        monkeypatch.setattr(orchestrator_module, "checkpoint_store", store)
+        try:
+            await store.touch_thread("c1", owner="a")
+            orchestrator = AgentOrchestrator()
+
+            with pytest.raises(PermissionError):
+                await orchestrator.execute("Analiza", agents, context, conversation_id="c1", owner="b")
+            assert await store.thread_owner("c1") == "a"
+
+            with pytest.raises(LookupError):
+                await orchestrator.resume("c1", agents, owner="b")
+
+            result = await orchestrator.execute("Analiza", agents, context, conversation_id="c1", owner="a")
+            assert result["success"]
+            # Una ejecución completada no deja checkpoint
+            assert await store.thread_owner("c1") is None
+        finally:
+            await store.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,156 @@
+"""
+Tests del gobernador de concurrencia LLM (prioridad, reservas, reparto justo)
+"""
+import asyncio
+from types import SimpleNamespace
+
+import app.governor as governor_module
+from app.a2a_protocol import Priority
+from app.governor import ConcurrencyGovernor, KeyGovernor
+
+
+def _fake_clock(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(governor_module, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    return clock
+
+
+async def _queue(governor: KeyGovernor, order: list, request_id: str, priority: Priority):
+    """Encola una llamada que anota su orden de servicio"""
+    async def call():
+        await governor.acquire(request_id, priority)
+        order.append(request_id)
+
+    task = asyncio.create_task(call())
+    await asyncio.sleep(0)
+    return task
+
+
+def test_priority_then_fifo():
+    async def run():
+        governor = KeyGovernor("custom", limit=1)
+        await governor.acquire("holder")
+        order = []
+        tasks = [
+            await _queue(governor, order, "low", Priority.LOW),
+            await _queue(governor, order, "normal", Priority.NORMAL),
+            await _queue(governor, order, "critical", Priority.CRITICAL),
+            await _queue(governor, order, "normal-2", Priority.NORMAL),
+        ]
+        for request_id in ["holder", "critical", "normal", "normal-2"]:
+            governor.release(request_id)
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(run()) == ["critical", "normal", "normal-2", "low"]
+
+
+def test_aging_promotes_waiting_background(monkeypatch):
+    clock = _fake_clock(monkeypatch)
+
+    async def run():
+        governor = KeyGovernor("custom", limit=1, aging_seconds=10)
+        await governor.acquire("holder")
+        order = []
+        background = await _queue(governor, order, "background", Priority.BACKGROUND)
+        # 40 s en cola: BACKGROUND (rango 4) sube a CRITICAL (rango 0)
+        clock[0] += 40
+        high = await _queue(governor, order, "high", Priority.HIGH)
+        governor.release("holder")
+        await asyncio.sleep(0)
+        governor.release("background")
+        await asyncio.gather(background, high)
+        return order
+
+    assert asyncio.run(run()) == ["background", "high"]
+
+
+def test_reserved_slots_keep_capacity_for_interactive_work():
+    async def run():
+        governor = KeyGovernor("custom", limit=2, reserved_slots=1)
+        await governor.acquire("bg-1", Priority.BACKGROUND)
+        order = []
+        background = await _queue(governor, order, "bg-2", Priority.BACKGROUND)
+        # El hueco reservado va al trabajo interactivo aunque BACKGROUND llegó antes
+        normal = await _queue(governor, order, "normal", Priority.NORMAL)
+        await normal
+        # BACKGROUND solo usa la capacidad no reservada
+        governor.release("bg-1")
+        await asyncio.sleep(0)
+        still_queued = list(order)
+        governor.release("normal")
+        await background
+        return still_queued, order
+
+    still_queued, order = asyncio.run(run())
+    assert still_queued == ["normal"]
+    assert order == ["normal", "bg-2"]
+
+
+def test_fair_share_between_requests():
+    async def run():
+        governor = KeyGovernor("custom", limit=2)
+        await governor.acquire("a")
+        await governor.acquire("a")
+        order = []
+        # A encola antes, pero B no tiene llamadas en curso
+        a = await _queue(governor, order, "a", Priority.NORMAL)
+        b = await _queue(governor, order, "b", Priority.NORMAL)
+        governor.release("a")
+        await asyncio.sleep(0)
+        governor.release("a")
+        await asyncio.gather(a, b)
+        return order
+
+    assert asyncio.run(run()) == ["b", "a"]
+
+
+def test_cancelled_waiters_return_their_slot():
+    async def run():
+        governor = KeyGovernor("custom", limit=1)
+        await governor.acquire("holder")
+        queued = asyncio.create_task(governor.acquire("queued"))
+        granted = asyncio.create_task(governor.acquire("granted"))
+        await asyncio.sleep(0)
+
+        # Cancelada en cola: sale de la cola
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        assert governor.get_stats()["queue_depth"] == 1
+
+        # Cancelada justo después de recibir el hueco: lo devuelve
+        governor.release("holder")
+        granted.cancel()
+        await asyncio.gather(granted, return_exceptions=True)
+        return governor.active, governor.idle
+
+    assert asyncio.run(run()) == (0, True)
+
+
+def test_slot_releases_on_error():
+    governor = ConcurrencyGovernor({"default": 1})
+
+    async def run():
+        try:
+            async with governor.slot("custom", "k"):
+                raise RuntimeError("fallo")
+        except RuntimeError:
+            pass
+        return governor.get("custom", "k").idle
+
+    assert asyncio.run(run())
+    assert ConcurrencyGovernor({"default": None}).get("ollama", "k") is None
+
+
+def test_new_governor_survives_eviction_when_older_ones_are_busy():
+    governor = ConcurrencyGovernor({"default": 1}, max_keys=1)
+
+    async def run():
+        async with governor.slot("custom", "busy"):
+            created = governor.get("custom", "new")
+            return created, dict(governor._governors)
+
+    created, governors = asyncio.run(run())
+    assert governors[("custom", "new")] is created
+    assert ("custom", "busy") in governors
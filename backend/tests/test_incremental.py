@@ -0,0 +1,100 @@
+"""
+Tests de la ejecución incremental (reutilización de resultados de agentes)
+"""
+import asyncio
+
+import app.agents.base_agent as base_agent
+import app.orchestrator as orchestrator_module
+from app.agents.registry import agent_registry
+from app.incremental import AgentResultCache, fingerprint_agent_inputs
+from app.orchestrator import AgentOrchestrator
+
+
+CONTEXT = {"persona": "analista", "generatedAt": "2026-01-01T10:00:00Z"}
+
+
+def _fingerprint(api_key: str, context: dict = CONTEXT) -> str:
+    agent = agent_registry.build(["reasoning"], model="m", api_config={"type": "groq", "api_key": api_key})[0]
+    return fingerprint_agent_inputs("Analiza el mercado", context, agent, {})
+
+
+def test_fingerprint_depends_on_api_key():
+    assert _fingerprint("key-a") != _fingerprint("key-b")
+
+
+def test_fingerprint_uses_prompt_context():
+    rerun = {**CONTEXT, "generatedAt": "2026-01-01T10:05:00Z", "agentsCluster": {"selectedAgents": ["reasoning"]}}
+    assert _fingerprint("key-a") == _fingerprint("key-a", rerun)
+    assert _fingerprint("key-a") != _fingerprint("key-a", {**CONTEXT, "persona": "pm"})
+
+
+def test_creative_agent_opts_out():
+    cache = AgentResultCache(enabled=True)
+    creative, reasoning = agent_registry.build(["creative", "reasoning"], model="m")
+    assert not cache.is_enabled_for(CONTEXT, creative)
+    assert cache.is_enabled_for(CONTEXT, reasoning)
+
+
+def test_dag_agent_receives_declared_upstreams(monkeypatch):
+    async def fake_chat_completion(messages, **kwargs):
+        return "respuesta"
+
+    upstreams = {}
+    run_agent = AgentOrchestrator._run_agent
+
+    async def recording_run_agent(self, state, agent_id, previous_results):
+        upstreams[agent_id] = sorted(previous_results)
+        return await run_agent(self, state, agent_id, previous_results)
+
+    monkeypatch.setattr(base_agent, "chat_completion", fake_chat_completion)
+    monkeypatch.setattr(AgentOrchestrator, "_run_agent", recording_run_agent)
+    agents = agent_registry.build(["reasoning", "planning", "summary"], model="m")
+    context = {"incremental": False, "dependencies": {"summary": ["planning"]}}
+    result = asyncio.run(AgentOrchestrator().execute("Analiza el mercado", agents, context))
+
+    assert result["success"]
+    assert upstreams["planning_strategist_001"] == []
+    assert upstreams["summary_specialist_001"] == ["planning_strategist_001"]
+
+
+def test_sequential_agents_receive_and_fingerprint_level_upstreams(monkeypatch):
+    async def fake_chat_completion(messages, **kwargs):
+        return "respuesta"
+
+    async def no_dag(*args, **kwargs):
+        raise AssertionError("sequential run must not use the DAG executor")
+
+    upstreams = {}
+    fingerprinted = {}
+    run_agent = AgentOrchestrator._run_agent
+    fingerprint = orchestrator_module.fingerprint_agent_inputs
+
+    async def recording_run_agent(self, state, agent_id, previous_results):
+        upstreams[agent_id] = sorted(previous_results)
+        return await run_agent(self, state, agent_id, previous_results)
+
+    def recording_fingerprint(query, context, agent, previous_results):
+        fingerprinted[agent.profile.agent_id] = sorted(previous_results)
+        return fingerprint(query, context, agent, previous_results)
+
+    monkeypatch.setattr(base_agent, "chat_completion", fake_chat_completion)
+    monkeypatch.setattr(AgentOrchestrator, "_run_agent", recording_run_agent)
+    monkeypatch.setattr(AgentOrchestrator, "_execute_agents_dag", no_dag)
+    monkeypatch.setattr(orchestrator_module, "fingerprint_agent_inputs", recording_fingerprint)
+    monkeypatch.setattr(orchestrator_module, "agent_result_cache", AgentResultCache(enabled=True))
+
+    # Sin `dependencies` ni `maxParallel`: modo secuencial
+    agents = agent_registry.build(["reasoning", "planning", "coding", "summary"], model="m")
+    result = asyncio.run(AgentOrchestrator().execute("Analiza el mercado", agents, {"persona": "analista"}))
+
+    assert result["success"]
+    expected = {
+        "reasoning_master_001": [],
+        "planning_strategist_001": [],
+        "coding_senior_001": ["planning_strategist_001", "reasoning_master_001"],
+        "summary_specialist_001": [
+            "coding_senior_001", "planning_strategist_001", "reasoning_master_001",
+        ],
+    }
+    assert upstreams == expected
+    assert fingerprinted == expected
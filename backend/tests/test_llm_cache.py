@@ -0,0 +1,75 @@
+"""
+Tests de la caché de respuestas LLM
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import app.llm_providers as llm_providers
+from app.a2a_protocol import AgentCapability, MessageType, a2a_protocol
+from app.agents.registry import agent_registry
+from app.llm_cache import LLMResponseCache, make_cache_key
+
+
+API_CONFIG = {"type": "groq", "api_key": "test-key"}
+
+
+def _key(content: str, api_key_hash: str = "k1") -> str:
+    return make_cache_key([{"role": "user", "content": content}], "m", "https://x", api_key_hash, 0.3, 100)
+
+
+def test_cache_key_depends_on_api_key():
+    assert _key("hola", "k1") != _key("hola", "k2")
+
+
+def test_cache_key_keeps_inner_whitespace():
+    assert _key("  def f():\n    return 1\n") == _key("def f():\n    return 1")
+    assert _key("def f():\n    return 1") != _key("def f(): return 1")
+
+
+def _node_editor_context(generated_at: str, selected_agents: list) -> dict:
+    return {
+        "persona": "analista",
+        "langgraph": {"strategy": "sequential", "model": "m"},
+        "a2aMessage": {"priority": "normal", "subject": "Mercado"},
+        "agentsCluster": {"selectedAgents": selected_agents},
+        "synthesis": {"strategy": "hierarchical"},
+        "generatedAt": generated_at,
+    }
+
+
+def test_node_editor_rerun_hits_cache(monkeypatch):
+    cache = LLMResponseCache(enabled=True, memory_size=16)
+    monkeypatch.setattr(llm_providers, "llm_cache", cache)
+    calls = []
+
+    @asynccontextmanager
+    async def fake_completion(provider, base_url, api_key, key_hash, limiter, estimated_tokens, **params):
+        calls.append(params["messages"])
+        yield SimpleNamespace(
+            usage=None,
+            choices=[SimpleNamespace(message=SimpleNamespace(content="respuesta"))],
+        )
+
+    monkeypatch.setattr(llm_providers, "_completion", fake_completion)
+
+    async def run(context: dict):
+        agent = agent_registry.build(["reasoning"], model="m", api_config=API_CONFIG)[0]
+        a2a_protocol.register_agent(agent.profile)
+        message = a2a_protocol.create_message(
+            sender_id=agent.profile.agent_id,
+            sender_capability=AgentCapability.REASONING,
+            subject="Task",
+            payload={"task": "Analiza el mercado", "context": context},
+            message_type=MessageType.REQUEST,
+            recipient_id=agent.profile.agent_id,
+        )
+        return await agent.handle_message(message)
+
+    first = asyncio.run(run(_node_editor_context("2026-01-01T10:00:00Z", ["reasoning"])))
+    second = asyncio.run(run(_node_editor_context("2026-01-01T10:05:00Z", ["reasoning", "planning"])))
+
+    assert first.success and second.success
+    assert len(calls) == 1
+    assert cache.stats["memory_hits"] == 1
+    assert "generatedAt" not in calls[0][-1]["content"]
@@ -0,0 +1,135 @@
+"""
+Tests de los reintentos de llamadas LLM
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import httpx
+from openai import APIConnectionError
+
+import app.llm_providers as llm_providers
+from app.a2a_protocol import Priority
+from app.governor import ConcurrencyGovernor, bind_priority
+from app.rate_limiter import ProviderRateLimiter, RateLimiterRegistry
+
+
+def _fake_client(create):
+    return SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(with_raw_response=SimpleNamespace(create=create)))
+    )
+
+
+def test_backoff_releases_slot_and_client(monkeypatch):
+    governor = ConcurrencyGovernor({"default": 1})
+    leased = []
+    attempts = []
+    held_while_sleeping = []
+
+    async def create(**params):
+        attempts.append(params)
+        if len(attempts) == 1:
+            raise APIConnectionError(request=httpx.Request("POST", "https://x/chat/completions"))
+        return SimpleNamespace(headers={}, parse=lambda: "respuesta")
+
+    client = _fake_client(create)
+
+    @asynccontextmanager
+    async def lease(provider, base_url, api_key):
+        leased.append(True)
+        try:
+            yield client
+        finally:
+            leased.pop()
+
+    async def fake_sleep(delay):
+        held_while_sleeping.append((governor.get("groq", "k").active, len(leased)))
+
+    monkeypatch.setattr(llm_providers, "llm_governor", governor)
+    monkeypatch.setattr(llm_providers.client_pool, "lease", lease)
+    monkeypatch.setattr(llm_providers.asyncio, "sleep", fake_sleep)
+
+    async def run():
+        async with llm_providers._completion("groq", "https://x", "key", "k", None, 10, model="m") as response:
+            return response, governor.get("groq", "k").active
+
+    response, active = asyncio.run(run())
+
+    assert response == "respuesta"
+    assert len(attempts) == 2
+    assert held_while_sleeping == [(0, 0)]
+    assert active == 1
+    assert governor.get("groq", "k").active == 0
+
+
+def test_unknown_provider_type_uses_fixed_label():
+    provider, _, base_url, _ = llm_providers._resolve_provider({"type": "x" * 64, "api_key": "key"})
+    assert provider == llm_providers.CUSTOM_PROVIDER
+    assert base_url == llm_providers.PROVIDERS["openai"]["base_url"]
+    assert llm_providers._resolve_provider({"type": "groq", "api_key": "key"})[0] == "groq"
+
+
+def test_registries_evict_idle_keys():
+    governor = ConcurrencyGovernor({"default": 1}, max_keys=2)
+    limiters = RateLimiterRegistry({"default": {"rpm": 60, "tpm": 1000}}, max_keys=2)
+
+    async def run():
+        async with governor.slot("custom", "busy"):
+            for index in range(5):
+                governor.get("custom", f"k{index}")
+                limiters.get("custom", f"k{index}")
+            return len(governor._governors), ("custom", "busy") in governor._governors
+
+    size, busy_kept = asyncio.run(run())
+
+    assert size == 2 and busy_kept
+    assert list(limiters._limiters) == [("custom", "k3"), ("custom", "k4")]
+
+
+def test_critical_call_overtakes_background_while_limiter_is_saturated(monkeypatch):
+    governor = ConcurrencyGovernor({"default": 1})
+    # 10 peticiones/s con el bucket vacío: cada llamada espera cuota
+    limiter = ProviderRateLimiter(rpm=600, tpm=1_000_000)
+    limiter.requests.tokens = 0
+    order = []
+
+    async def create(**params):
+        order.append(params["model"])
+        return SimpleNamespace(headers={}, parse=lambda: params["model"])
+
+    @asynccontextmanager
+    async def lease(provider, base_url, api_key):
+        yield _fake_client(create)
+
+    monkeypatch.setattr(llm_providers, "llm_governor", governor)
+    monkeypatch.setattr(llm_providers.client_pool, "lease", lease)
+
+    async def call(name: str, priority: Priority):
+        bind_priority(priority)
+        async with llm_providers._completion("groq", "https://x", "key", "k", limiter, 10, model=name):
+            pass
+
+    async def run():
+        background = [
+            asyncio.create_task(call(f"bg{index}", Priority.BACKGROUND)) for index in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        critical = asyncio.create_task(call("critical", Priority.CRITICAL))
+        await asyncio.gather(*background, critical)
+
+    asyncio.run(run())
+
+    assert order == ["bg0", "critical", "bg1", "bg2"]
+
+
+def test_rate_limits_are_configurable_per_provider(monkeypatch):
+    from app.config import _rate_limit
+
+    assert _rate_limit("openai", 500, 200000) == {"rpm": 500, "tpm": 200000}
+    assert _rate_limit("ollama", None, None) is None
+
+    monkeypatch.setenv("RATE_LIMIT_OPENAI_RPM", "10000")
+    monkeypatch.setenv("RATE_LIMIT_OPENAI_TPM", "2000000")
+    monkeypatch.setenv("RATE_LIMIT_OLLAMA_RPM", "120")
+    assert _rate_limit("openai", 500, 200000) == {"rpm": 10000, "tpm": 2000000}
+    assert _rate_limit("ollama", None, None) == {"rpm": 120, "tpm": 100000}
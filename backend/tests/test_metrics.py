@@ -0,0 +1,62 @@
+"""
+Tests del endpoint de métricas
+"""
+from fastapi.testclient import TestClient
+
+import app.agents.base_agent as base_agent
+from app.a2a_protocol import (
+    AgentCapability,
+    ConversationStore,
+    MessageType,
+    _estimate_size,
+    a2a_protocol,
+)
+from app.main import app
+
+
+def test_metrics_expose_graph_cache(monkeypatch):
+    async def fake_chat_completion(messages, **kwargs):
+        return "respuesta"
+
+    monkeypatch.setattr(base_agent, "chat_completion", fake_chat_completion)
+    client = TestClient(app)
+    before = client.get("/api/metrics").json()["orchestration"]["graph_cache"]
+
+    for _ in range(2):
+        response = client.post("/api/chat", json={
+            "message": "hola", "agents": ["reasoning"], "context": {"incremental": False},
+        })
+        assert response.json()["success"]
+
+    after = client.get("/api/metrics").json()["orchestration"]["graph_cache"]
+    assert after["hits"] + after["misses"] == before["hits"] + before["misses"] + 2
+    assert after["hits"] >= before["hits"] + 1
+    assert "time_saved_ms" in after
+
+
+def test_metrics_expose_a2a_memory_counters():
+    stats = TestClient(app).get("/api/metrics").json()["a2a"]
+
+    assert stats["registered_agents"] > 0
+    conversations = stats["conversations"]
+    for key in ("conversations", "messages", "approx_bytes", "dropped_messages"):
+        assert key in conversations
+
+
+def test_conversation_store_tracks_approx_bytes():
+    store = ConversationStore(max_conversations=4, max_messages_per_conversation=2)
+    message = a2a_protocol.create_message(
+        sender_id="orchestrator",
+        sender_capability=AgentCapability.REASONING,
+        subject="Task",
+        payload={"task": "x" * 1000, "context": {"history": [{"content": "y" * 500}]}},
+        message_type=MessageType.REQUEST,
+        conversation_id="size",
+    )
+    for _ in range(3):
+        store.append("size", message)
+
+    stats = store.get_stats()
+    assert stats["messages"] == 2
+    assert stats["approx_bytes"] == 2 * _estimate_size(message)
+    assert _estimate_size(message) > 1000
@@ -0,0 +1,123 @@
+"""
+Tests del limitador de cuota por proveedor (token buckets, cabeceras, 429)
+"""
+import asyncio
+from types import SimpleNamespace
+
+import app.rate_limiter as rate_limiter_module
+from app.rate_limiter import (
+    ProviderRateLimiter,
+    RateLimiterRegistry,
+    TokenBucket,
+    _parse_duration,
+    get_retry_after,
+)
+
+
+def _fake_time(monkeypatch):
+    """Reloj y sleep simulados: dormir solo avanza el reloj"""
+    clock = [1000.0]
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(round(delay, 6))
+        clock[0] += delay
+
+    monkeypatch.setattr(rate_limiter_module, "time", SimpleNamespace(monotonic=lambda: clock[0]))
+    monkeypatch.setattr(
+        rate_limiter_module, "asyncio", SimpleNamespace(sleep=fake_sleep, Lock=asyncio.Lock)
+    )
+    return clock, sleeps
+
+
+def test_token_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(60, 1.0)
+    start = bucket.updated
+    bucket.consume(60)
+    assert bucket.wait_time(5, start) == 5.0
+    assert bucket.wait_time(5, start + 5) == 0.0
+    assert bucket.wait_time(1, start + 3600) == 0.0
+    assert bucket.tokens == 60.0
+    # Más de la capacidad espera solo hasta llenar el bucket
+    bucket.consume(60)
+    assert bucket.wait_time(500, start + 3600) == 60.0
+
+
+def test_acquire_waits_for_quota(monkeypatch):
+    clock, sleeps = _fake_time(monkeypatch)
+    limiter = ProviderRateLimiter(rpm=60, tpm=1000)
+
+    async def run():
+        await limiter.acquire(600)
+        await limiter.acquire(600)
+
+    asyncio.run(run())
+    # El segundo espera 200 tokens a 1000/60 por segundo
+    assert sleeps == [12.0]
+    assert limiter.stats["requests"] == 2
+    assert limiter.stats["waits"] == 1
+
+
+def test_record_usage_reconciles_estimate(monkeypatch):
+    _fake_time(monkeypatch)
+    limiter = ProviderRateLimiter(rpm=60, tpm=1000)
+    asyncio.run(limiter.acquire(100))
+    limiter.record_usage(100, 400)
+    assert limiter.tokens.tokens == 600
+    limiter.record_usage(100, None)
+    assert limiter.tokens.tokens == 600
+
+
+def test_headers_sync_buckets_and_block(monkeypatch):
+    clock, sleeps = _fake_time(monkeypatch)
+    limiter = ProviderRateLimiter(rpm=60, tpm=1000)
+    limiter.update_from_headers({
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "2m30s",
+        "x-ratelimit-remaining-tokens": "250",
+        "x-ratelimit-reset-tokens": "7.5s",
+    })
+
+    assert limiter.requests.tokens == 0
+    assert limiter.tokens.tokens == 250
+    assert limiter.blocked_until == clock[0] + 150
+
+    asyncio.run(limiter.acquire(10))
+    assert sleeps == [150.0]
+
+
+def test_rate_limited_blocks_until_retry_after(monkeypatch):
+    clock, sleeps = _fake_time(monkeypatch)
+    limiter = ProviderRateLimiter(rpm=60, tpm=1000)
+
+    assert limiter.on_rate_limited(5.0, attempt=0) == 5.0
+    assert not limiter.idle
+    asyncio.run(limiter.acquire(10))
+    assert sleeps == [5.0]
+    assert limiter.idle
+
+    # Sin Retry-After: backoff exponencial acotado
+    assert limiter.on_rate_limited(None, attempt=3) == 8
+    assert limiter.on_rate_limited(None, attempt=10) == 30
+    assert limiter.stats["rate_limited"] == 3
+
+
+def test_parse_headers():
+    assert _parse_duration("12") == 12.0
+    assert _parse_duration("250ms") == 0.25
+    assert _parse_duration("2m59.5s") == 179.5
+    assert _parse_duration("1h2m") == 3720.0
+    assert _parse_duration("pronto") is None
+    assert get_retry_after({"retry-after-ms": "1500", "retry-after": "9"}) == 1.5
+    assert get_retry_after({"retry-after": "9"}) == 9.0
+    assert get_retry_after(None) is None
+
+
+def test_new_limiter_survives_eviction_when_older_ones_are_busy(monkeypatch):
+    _fake_time(monkeypatch)
+    registry = RateLimiterRegistry({"default": {"rpm": 60, "tpm": 1000}}, max_keys=1)
+    registry.get("custom", "busy").on_rate_limited(30.0, attempt=0)
+
+    created = registry.get("custom", "new")
+    assert registry._limiters[("custom", "new")] is created
+    assert ("custom", "busy") in registry._limiters
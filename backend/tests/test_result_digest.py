@@ -0,0 +1,84 @@
+"""
+Tests de los digests de resultados previos
+"""
+import asyncio
+
+import app.agents.base_agent as base_agent
+from app.agents.registry import agent_registry
+from app.config import RESULT_DIGEST_MAX_TOTAL_CHARS
+from app.orchestrator import AgentOrchestrator
+from app.result_digest import build_digest, format_previous_results
+
+
+def test_downstream_prompt_uses_upstream_digest(monkeypatch):
+    agents = agent_registry.build(["reasoning", "planning", "summary"], model="m")
+    by_system_prompt = {agent.get_system_prompt(): agent.agent_key for agent in agents}
+    outputs = {"reasoning": "RAZONAMIENTO previo", "planning": "PLAN: fase uno, fase dos", "summary": "resumen"}
+    prompts = {}
+
+    async def fake_chat_completion(messages, **kwargs):
+        agent_key = by_system_prompt[messages[0]["content"]]
+        prompts[agent_key] = messages[-1]["content"]
+        return outputs[agent_key]
+
+    monkeypatch.setattr(base_agent, "chat_completion", fake_chat_completion)
+    context = {"incremental": False, "dependencies": {"summary": ["planning"]}}
+    result = asyncio.run(AgentOrchestrator().execute("Prepara el lanzamiento", agents, context))
+
+    assert result["success"]
+    assert "PLAN: fase uno, fase dos" in prompts["summary"]
+    assert "RAZONAMIENTO previo" not in prompts["summary"]
+    assert "previous_results" not in prompts["planning"]
+
+
+def test_dag_passes_only_direct_dependencies(monkeypatch):
+    agents = agent_registry.build(["reasoning", "planning", "summary"], model="m")
+    by_system_prompt = {agent.get_system_prompt(): agent.agent_key for agent in agents}
+    prompts = {}
+
+    async def fake_chat_completion(messages, **kwargs):
+        agent_key = by_system_prompt[messages[0]["content"]]
+        prompts[agent_key] = messages[-1]["content"]
+        return f"SALIDA de {agent_key}"
+
+    monkeypatch.setattr(base_agent, "chat_completion", fake_chat_completion)
+    context = {"incremental": False, "dependencies": {"planning": ["reasoning"], "summary": ["planning"]}}
+    asyncio.run(AgentOrchestrator().execute("Prepara el lanzamiento", agents, context))
+
+    assert "SALIDA de reasoning" in prompts["planning"]
+    assert "SALIDA de planning" in prompts["summary"]
+    assert "SALIDA de reasoning" not in prompts["summary"]
+
+
+def test_previous_results_respect_total_budget():
+    digests = {
+        f"agent_{index}": build_digest(f"agent_{index}", f"resultado {index} " + "dato " * 600, agent_name=f"Agente {index}")
+        for index in range(24)
+    }
+
+    text = format_previous_results(digests, max_total_chars=6000)
+
+    assert len(text) <= 6000
+    assert "Agente 23" in text
+    assert "Agente 0]" not in text
+    assert "omitidos por longitud" in text
+
+
+def test_downstream_prompt_size_is_bounded(monkeypatch):
+    upstream_keys = ["reasoning", "planning", "research", "analysis", "coding", "data", "writing", "legal"]
+    agents = agent_registry.build([*upstream_keys, "summary"], model="m")
+    by_system_prompt = {agent.get_system_prompt(): agent.agent_key for agent in agents}
+    prompts = {}
+
+    async def fake_chat_completion(messages, **kwargs):
+        agent_key = by_system_prompt[messages[0]["content"]]
+        prompts[agent_key] = messages[-1]["content"]
+        return f"{agent_key} " + "detalle " * 500
+
+    monkeypatch.setattr(base_agent, "chat_completion", fake_chat_completion)
+    context = {"incremental": False, "dependencies": {"summary": upstream_keys}}
+    asyncio.run(AgentOrchestrator().execute("Prepara el lanzamiento", agents, context))
+
+    section = prompts["summary"].split("previous_results: ", 1)[1].split("\n\nMEMORIA RECIENTE", 1)[0]
+    assert len(section) <= RESULT_DIGEST_MAX_TOTAL_CHARS
+    assert "legal " in section
@@ -0,0 +1,31 @@
+"""
+Tests del enrutado automático de agentes
+"""
+import asyncio
+
+import app.agents.base_agent as base_agent
+from app.agents.registry import agent_registry
+from app.config import ROUTER_MIN_SCORE, ROUTER_TOP_K
+from app.orchestrator import AgentOrchestrator
+
+
+def test_routing_limits_fall_back_on_invalid_values():
+    limits = AgentOrchestrator._get_routing_limits
+    assert limits({"top_k": None, "min_score": None}) == (ROUTER_TOP_K, ROUTER_MIN_SCORE)
+    assert limits({"top_k": "tres", "min_score": "alto"}) == (ROUTER_TOP_K, ROUTER_MIN_SCORE)
+    assert limits({"top_k": float("inf"), "min_score": float("nan")}) == (ROUTER_TOP_K, ROUTER_MIN_SCORE)
+    assert limits({"top_k": -2, "min_score": 7}) == (1, 1.0)
+    assert limits({"top_k": "2", "min_score": "0.5"}) == (2, 0.5)
+
+
+def test_run_survives_null_top_k(monkeypatch):
+    async def fake_chat_completion(messages, **kwargs):
+        return "respuesta"
+
+    monkeypatch.setattr(base_agent, "chat_completion", fake_chat_completion)
+    agents = agent_registry.build(["reasoning", "planning", "security", "translation"], model="m")
+    context = {"incremental": False, "routing": {"mode": "auto", "top_k": None}}
+    result = asyncio.run(AgentOrchestrator().execute("Revisa la seguridad de mi API", agents, context))
+
+    assert result["success"]
+    assert result["routing"]["top_k"] == ROUTER_TOP_K
@@ -0,0 +1,87 @@
+"""
+Tests de la síntesis map-reduce de resultados (LLM simulado)
+"""
+import asyncio
+
+import app.synthesis as synthesis
+from app.rate_limiter import CHARS_PER_TOKEN
+from app.synthesis import SynthesisEngine, concatenate_sections
+
+
+CONTEXT = {"synthesis": {"strategy": "hierarchical", "maxSections": 3, "tokenBudget": 1000}}
+
+
+def _fake_llm(monkeypatch, fail_on_max_tokens=None):
+    """LLM simulado que anota (tamaño del prompt en tokens, max_tokens) de cada llamada"""
+    calls = []
+
+    async def fake_chat_completion(messages, model=None, api_config=None, temperature=0.7, max_tokens=100):
+        calls.append((len(messages[1]["content"]) // CHARS_PER_TOKEN, max_tokens))
+        if max_tokens == fail_on_max_tokens:
+            raise RuntimeError("proveedor caído")
+        return f"síntesis {len(calls)}"
+
+    monkeypatch.setattr(synthesis, "chat_completion", fake_chat_completion)
+    return calls
+
+
+def _engine() -> SynthesisEngine:
+    return SynthesisEngine(token_budget=1000, summary_tokens=100, final_tokens=200)
+
+
+def _sections(count: int, chars: int):
+    return [(f"Agente {index}", "x" * chars) for index in range(count)]
+
+
+def test_without_strategy_concatenates_without_llm(monkeypatch):
+    calls = _fake_llm(monkeypatch)
+    engine = _engine()
+    sections = _sections(2, 50)
+
+    result = asyncio.run(engine.synthesize("q", sections, {"synthesis": {"strategy": "concat"}}))
+
+    assert result == concatenate_sections(sections)
+    assert calls == []
+    assert engine.stats["concatenated"] == 1
+
+
+def test_single_batch_uses_one_call(monkeypatch):
+    calls = _fake_llm(monkeypatch)
+    engine = _engine()
+    context = {"synthesis": {**CONTEXT["synthesis"], "includeTrace": True}}
+
+    result = asyncio.run(engine.synthesize("q", _sections(3, 200), context))
+
+    assert calls == [(calls[0][0], 200)]
+    assert result.startswith("síntesis 1")
+    assert "Agente 0, Agente 1, Agente 2" in result
+    assert engine.stats["llm_syntheses"] == 1
+    assert engine.stats["max_depth"] == 0
+
+
+def test_multiple_batches_are_summarized_within_budget(monkeypatch):
+    calls = _fake_llm(monkeypatch)
+    engine = _engine()
+
+    result = asyncio.run(engine.synthesize("q", _sections(10, 400), CONTEXT))
+
+    summaries = [call for call in calls if call[1] == 100]
+    assert len(summaries) >= 2
+    assert calls[-1][1] == 200
+    assert len(calls) == len(summaries) + 1
+    assert all(prompt_tokens <= 1000 for prompt_tokens, _ in calls)
+    assert result == f"síntesis {len(calls)}"
+    assert engine.stats["max_depth"] == 1
+
+
+def test_failed_map_step_falls_back_to_concatenation(monkeypatch):
+    calls = _fake_llm(monkeypatch, fail_on_max_tokens=100)
+    engine = _engine()
+    sections = _sections(10, 400)
+
+    result = asyncio.run(engine.synthesize("q", sections, CONTEXT))
+
+    assert result == concatenate_sections(sections)
+    assert all(max_tokens == 100 for _, max_tokens in calls)
+    assert engine.stats["fallbacks"] == 1
+    assert engine.stats["llm_syntheses"] == 0